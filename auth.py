@@ -6,18 +6,39 @@ from fastapi import Depends, HTTPException, status
 import datetime
 
 from models import User  # Assuming you have a models.py with Pydantic models
+import config
 import db
 import jwt
 import os
+from executors import BoundedExecutor, ExecutorSaturated
+from token_cache import PrincipalCache
+import metrics
+import secrets
+import time
 
-# Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Configuration; token lifetimes are read from config.current() per token
+SECRET_KEY = config.SECRET_KEY
+ALGORITHM = config.ALGORITHM
+# bcrypt cost factor. Stored hashes with any other cost are rehashed on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt takes ~250 ms per call, so it runs on its own bounded pool instead of the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "16"))
+password_hash_executor = BoundedExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_DEPTH, thread_name_prefix="bcrypt")
+
+# Verified token -> User cache; entries live until token exp, at most PRINCIPAL_CACHE_TTL seconds
+principal_cache = PrincipalCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    max_ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
 
 # Utility functions
 def verify_password(plain_password, hashed_password):
@@ -26,6 +47,39 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def verify_and_update(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    return func(*args), time.perf_counter() - start
+
+async def _run_password_hashing(func, *args):
+    try:
+        # Timed on the worker thread, recorded back on the event loop
+        result, elapsed = await password_hash_executor.submit(_timed, func, *args)
+        metrics.BCRYPT_LATENCY.labels(func.__name__).observe(elapsed)
+        return result
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password on the bcrypt executor; raises 503 with Retry-After when saturated."""
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """get_password_hash on the bcrypt executor; raises 503 with Retry-After when saturated."""
+    return await _run_password_hashing(get_password_hash, password)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    """verify_and_update on the bcrypt executor; raises 503 with Retry-After when saturated."""
+    return await _run_password_hashing(verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,17 +90,52 @@ def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def create_refresh_token(username: str, family: Optional[str] = None) -> str:
+    """
+    Issue a single-use refresh token for ``username``.
+
+    Every token has its own ``jti``. ``fam`` names the chain of tokens
+    rotated from one login, so reuse of any of them can revoke the chain.
+    """
+    days = config.current().get_int("auth.refresh.token.expire.days")
+    expire = datetime.datetime.utcnow() + datetime.timedelta(days=days)
+    claims = {
+        "sub": username,
+        "typ": "refresh",
+        "jti": secrets.token_urlsafe(16),
+        "fam": family or secrets.token_urlsafe(16),
+        "exp": expire,
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_refresh_token(token: str) -> dict:
+    """Verify a refresh token's signature, expiry and type; raises 401 otherwise."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        payload = {}
+    if payload.get("typ") != "refresh" or not all(payload.get(claim) for claim in ("sub", "jti", "fam")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        start = time.perf_counter()
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        metrics.JWT_DECODE_LATENCY.labels().observe(time.perf_counter() - start)
         username: str = payload.get("sub")
-        if username is None:
+        # Refresh tokens are signed with the same key but are not bearer credentials
+        if username is None or payload.get("typ") == "refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return username
+        return payload
     except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,14 +143,25 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(username: str = Depends(verify_token)):
-    user = db.fake_users_db.get(username)
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return decode_token(credentials.credentials)["sub"]
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # Repeat requests with the same token skip jwt.decode, the user lookup and User(...)
+    current_user = principal_cache.get(credentials.credentials)
+    if current_user is not None:
+        return current_user
+
+    payload = decode_token(credentials.credentials)
+    user = await db.users.get_by_username(payload["sub"])
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    return User(**user)
+    current_user = User(**user)
+    principal_cache.put(credentials.credentials, current_user.username, current_user, payload.get("exp", float("inf")))
+    return current_user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
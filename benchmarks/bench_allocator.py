@@ -0,0 +1,107 @@
+"""
+Benchmark: filling a /8 with mixed prefix lengths using the buddy allocator.
+
+Repeatedly asks for the next free subnet of a random length (/16 to /30,
+smaller subnets more likely) until the block is completely full, reporting
+the allocation rate as the block fills. A naive allocator that walks the
+sorted list of used ranges looking for the first aligned gap (what client
+code does with the raw child CIDRs) is timed over the first allocations for
+comparison. Finally a /16 network is filled with host addresses.
+
+Run from the repo root:
+    python -m benchmarks.bench_allocator [--block 10.0.0.0/8] [--naive-allocations 20000]
+"""
+import argparse
+import bisect
+import ipaddress
+import random
+import time
+
+from ipam.allocator import AddressSpaceFull, PrefixAllocator, host_allocator
+
+# Relative weight of each prefix length in the request mix
+LENGTH_WEIGHTS = {16: 1, 18: 2, 20: 4, 22: 16, 24: 64, 26: 64, 28: 64, 29: 32, 30: 32}
+
+
+class NaiveAllocator:
+    """First-fit over a sorted list of used (start, end) ranges: O(n) per allocation."""
+
+    def __init__(self, network):
+        self.start = int(network.network_address)
+        self.end = self.start + network.num_addresses
+        self.used = []
+
+    def allocate(self, prefixlen):
+        size = 1 << (32 - prefixlen)
+        candidate = self.start
+        for used_start, used_end in self.used:
+            if candidate + size <= used_start:
+                break
+            if used_end > candidate:
+                candidate = -(-used_end // size) * size  # next aligned address
+        if candidate + size > self.end:
+            raise AddressSpaceFull()
+        bisect.insort(self.used, (candidate, candidate + size))
+        return candidate
+
+
+def fill(allocator, rng, limit=None):
+    """Allocate random lengths until every length is exhausted (or ``limit`` allocations)."""
+    lengths = list(LENGTH_WEIGHTS)
+    weights = [LENGTH_WEIGHTS[length] for length in lengths]
+    count, checkpoints, start = 0, [], time.perf_counter()
+    last = (start, 0)
+    while lengths and (limit is None or count < limit):
+        length = rng.choices(lengths, weights)[0]
+        try:
+            allocator.allocate(length)
+        except AddressSpaceFull:
+            index = lengths.index(length)
+            del lengths[index], weights[index]
+            continue
+        count += 1
+        if count % 10000 == 0:
+            now = time.perf_counter()
+            checkpoints.append((count, (now - last[0]) / (count - last[1])))
+            last = (now, count)
+    return count, time.perf_counter() - start, checkpoints
+
+
+def main(block, naive_allocations, seed):
+    network = ipaddress.ip_network(block)
+
+    allocator = PrefixAllocator(network)
+    count, elapsed, checkpoints = fill(allocator, random.Random(seed))
+    print(f"buddy allocator: filled {network} with {count} subnets in {elapsed:.2f} s "
+          f"({count / elapsed:,.0f} allocations/s), free addresses left: {allocator.free_addresses}")
+    for done, per_alloc in checkpoints[::max(1, len(checkpoints) // 8)]:
+        print(f"  after {done:>8} allocations: {per_alloc * 1e6:7.2f} us/allocation")
+
+    naive = NaiveAllocator(network)
+    count, elapsed, checkpoints = fill(naive, random.Random(seed), naive_allocations)
+    print(f"naive first-fit: {count} subnets in {elapsed:.2f} s ({count / elapsed:,.0f} allocations/s)")
+    for done, per_alloc in checkpoints:
+        print(f"  after {done:>8} allocations: {per_alloc * 1e6:7.2f} us/allocation")
+
+    hosts_network = ipaddress.ip_network("172.16.0.0/16")
+    hosts = host_allocator(hosts_network)
+    start = time.perf_counter()
+    count = 0
+    while True:
+        try:
+            hosts.allocate(32)
+        except AddressSpaceFull:
+            break
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"host addresses: filled {hosts_network} with {count} hosts in {elapsed:.2f} s "
+          f"({count / elapsed:,.0f} allocations/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--block", default="10.0.0.0/8")
+    parser.add_argument("--naive-allocations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    main(args.block, args.naive_allocations, args.seed)
@@ -0,0 +1,320 @@
+"""
+Benchmark and regression check: the whole API driven in process, per-route throughput and latency.
+
+Runs main.app (with its lifespan, on the configured STORAGE_BACKEND) over
+httpx's ASGI transport, so there is no network and every request shares one
+event loop like a single uvicorn worker. ``--concurrency`` clients issue
+requests from a workload until ``--requests`` have completed, and throughput,
+p50/p95/p99 latency and status codes are reported per route.
+
+A workload is JSON Lines, one request per line::
+
+    {"method": "GET", "path": "/items/{item_id}", "user": "testuser"}
+    {"method": "POST", "path": "/items/", "json": {"name": "x", "price": 1.0, "owner_id": 0}, "weight": 5}
+
+``user`` is the account whose bearer token is sent (default ``testuser``,
+null for anonymous). ``{item_id}`` in the path, or as a JSON string value,
+is replaced by one of that user's items; a DELETE consumes the id, and
+items created through POST /items/ or /items/bulk join the pool. If any
+line has a ``weight`` the workload is sampled by weight, otherwise it is
+replayed in order and wrapped around. Routes are reported by the path as
+written, so ``/items/{item_id}`` is one route. ``--mix`` selects a built-in
+synthetic workload instead of a file.
+
+``--warmup`` requests are issued first and not recorded. ``--save`` writes
+the results as a JSON baseline. ``--check`` compares them with a baseline
+and exits with status 1 if any route's ``--metric`` latency grew by more
+than ``--threshold`` (and by at least ``--min-delta-ms``, so sub-millisecond
+noise does not fail the check). Routes with fewer than ``--min-samples``
+requests in either run are not checked, their tail percentiles being noise.
+``--budget`` checks absolute limits instead, from a JSON file committed with
+the workload (``benchmarks/workloads/ci_budget.json``): the ``metric``
+latency of each route must stay under its entry in ``routes`` or
+``default_ms``, and no route may answer more than ``max_server_errors``
+5xx responses; exits with status 1 otherwise. Budgets are loose enough to
+hold on any reasonable machine, so CI can run the check without recording
+a baseline first. Logins run bcrypt on worker threads, which slows every other route while
+they run, so keep them out of workloads used for regression checks.
+
+Run from the repo root:
+    python -m benchmarks.bench_api [--workload benchmarks/workloads/sample.jsonl | --mix crud]
+        [--concurrency 8] [--requests 2000] [--warmup 200] [--save FILE] [--check FILE] [--threshold 0.25]
+        [--budget benchmarks/workloads/ci_budget.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+# All clients share one address in process; keep the rate limiter out of the numbers
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from main import app, lifespan
+
+PASSWORD = "testpassword"
+USERS = ("testuser", "admin")
+ITEM = {"name": "bench item", "description": "created by bench_api", "price": 9.99, "owner_id": 0}
+
+# Built-in synthetic workloads, in the workload line format
+MIXES = {
+    "login": [
+        {"method": "POST", "path": "/auth/login", "user": None, "json": {"username": "testuser", "password": PASSWORD}},
+    ],
+    "crud": [
+        {"method": "GET", "path": "/items/", "weight": 30},
+        {"method": "GET", "path": "/items/{item_id}", "weight": 30},
+        {"method": "POST", "path": "/items/", "json": ITEM, "weight": 15},
+        {"method": "PUT", "path": "/items/{item_id}", "json": ITEM, "weight": 15},
+        {"method": "DELETE", "path": "/items/{item_id}", "weight": 10},
+    ],
+    "admin": [
+        {"method": "GET", "path": "/admin/users", "user": "admin", "weight": 60},
+        {"method": "GET", "path": "/admin/users?limit=1", "user": "admin", "weight": 20},
+        {"method": "GET", "path": "/admin/auth-cache", "user": "admin", "weight": 10},
+        {"method": "GET", "path": "/admin/item-cache", "user": "admin", "weight": 10},
+    ],
+    "mixed": [
+        {"method": "POST", "path": "/auth/login", "user": None, "json": {"username": "testuser", "password": PASSWORD},
+         "weight": 1},
+        {"method": "GET", "path": "/users/profile", "weight": 10},
+        {"method": "GET", "path": "/items/?limit=50", "weight": 25},
+        {"method": "GET", "path": "/items/{item_id}", "weight": 25},
+        {"method": "POST", "path": "/items/", "json": ITEM, "weight": 10},
+        {"method": "PUT", "path": "/items/{item_id}", "json": ITEM, "weight": 8},
+        {"method": "DELETE", "path": "/items/{item_id}", "weight": 6},
+        {"method": "GET", "path": "/admin/users", "user": "admin", "weight": 5},
+        {"method": "GET", "path": "/health", "user": None, "weight": 10},
+    ],
+}
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def load_workload(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _fill(value, item_id):
+    """Substitute ``{item_id}`` in a JSON body (a whole-string placeholder becomes the integer id)."""
+    if value == "{item_id}":
+        return item_id
+    if isinstance(value, dict):
+        return {k: _fill(v, item_id) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, item_id) for v in value]
+    return value
+
+
+class Runner:
+    """Issues workload requests from concurrent clients and records latency per route."""
+
+    def __init__(self, client: httpx.AsyncClient, workload: List[dict], tokens: Dict[str, str],
+                 items: Dict[str, List[int]], total: int, seed: int):
+        self.client = client
+        self.workload = workload
+        self.weights = [entry.get("weight", 1) for entry in workload]
+        self.sampled = any("weight" in entry for entry in workload)
+        self.tokens = tokens
+        self.items = items
+        self.remaining = total
+        self.issued = 0
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+
+    def _next_entry(self) -> Optional[dict]:
+        if self.remaining == 0:
+            return None
+        self.remaining -= 1
+        if self.sampled:
+            return self.rng.choices(self.workload, self.weights)[0]
+        entry = self.workload[self.issued % len(self.workload)]
+        self.issued += 1
+        return entry
+
+    async def client_loop(self):
+        while (entry := self._next_entry()) is not None:
+            await self.issue(entry)
+
+    async def issue(self, entry: dict):
+        method, template = entry["method"].upper(), entry["path"]
+        user = entry.get("user", "testuser")
+        pool = self.items.get(user, [])
+        item_id = None
+        if "{item_id}" in template or "{item_id}" in json.dumps(entry.get("json")):
+            if not pool:
+                item_id = 0
+            elif method == "DELETE":
+                item_id = pool.pop(self.rng.randrange(len(pool)))
+            else:
+                item_id = self.rng.choice(pool)
+        headers = dict(entry.get("headers", {}))
+        if user is not None:
+            headers["Authorization"] = f"Bearer {self.tokens[user]}"
+        body = _fill(entry.get("json"), item_id)
+
+        start = time.perf_counter()
+        response = await self.client.request(
+            method, template.replace("{item_id}", str(item_id)), json=body, headers=headers,
+        )
+        elapsed = time.perf_counter() - start
+
+        route = f"{method} {template}"
+        self.latencies.setdefault(route, []).append(elapsed)
+        statuses = self.statuses.setdefault(route, {})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if method == "POST" and response.status_code == 200 and user is not None:
+            if template == "/items/":
+                pool.append(response.json()["id"])
+            elif template == "/items/bulk":
+                pool.extend(result["id"] for result in response.json())
+
+
+async def run(workload: List[dict], concurrency: int, total: int, warmup: int, seed_items: int, seed: int) -> dict:
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tokens, items = {}, {}
+            for user in USERS:
+                response = await client.post("/auth/login", json={"username": user, "password": PASSWORD})
+                tokens[user] = response.json()["access_token"]
+                headers = {"Authorization": f"Bearer {tokens[user]}"}
+                response = await client.post("/items/bulk", json=[ITEM] * seed_items, headers=headers)
+                items[user] = [result["id"] for result in response.json()]
+
+            if warmup:
+                runner = Runner(client, workload, tokens, items, warmup, seed)
+                await asyncio.gather(*(runner.client_loop() for _ in range(concurrency)))
+            runner = Runner(client, workload, tokens, items, total, seed + 1)
+            start = time.perf_counter()
+            await asyncio.gather(*(runner.client_loop() for _ in range(concurrency)))
+            wall = time.perf_counter() - start
+
+    routes = {}
+    for route, samples in sorted(runner.latencies.items()):
+        routes[route] = {
+            "count": len(samples),
+            "rps": round(len(samples) / wall, 1),
+            "p50_ms": round(percentile(samples, 50) * 1e3, 3),
+            "p95_ms": round(percentile(samples, 95) * 1e3, 3),
+            "p99_ms": round(percentile(samples, 99) * 1e3, 3),
+            "statuses": {str(code): n for code, n in sorted(runner.statuses[route].items())},
+        }
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(total / wall, 1),
+        "backend": os.getenv("STORAGE_BACKEND", "memory"),
+        "python": platform.python_version(),
+        "routes": routes,
+    }
+
+
+def report(results: dict):
+    print(f"{results['requests']} requests, concurrency {results['concurrency']}, backend {results['backend']}: "
+          f"{results['wall_s']:.2f} s, {results['rps']:.0f} req/s")
+    print(f"{'route':<36} {'count':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for route, stats in results["routes"].items():
+        print(f"{route:<36} {stats['count']:>6} {stats['rps']:>8.0f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}  {stats['statuses']}")
+
+
+def regressions(results: dict, baseline: dict, metric: str, threshold: float, min_delta_ms: float,
+                min_samples: int) -> List[str]:
+    """Routes whose ``metric`` grew by more than ``threshold`` (a fraction) and ``min_delta_ms`` over the baseline."""
+    failures = []
+    for route, before in baseline["routes"].items():
+        after = results["routes"].get(route)
+        if after is None or min(before["count"], after["count"]) < min_samples:
+            continue
+        old, new = before[metric], after[metric]
+        if new > old * (1 + threshold) and new - old >= min_delta_ms:
+            failures.append(f"{route}: {metric} {old:.2f} -> {new:.2f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return failures
+
+
+def over_budget(results: dict, budget: dict, min_samples: int) -> List[str]:
+    """Routes over their latency budget or answering more 5xx responses than the budget allows."""
+    metric = budget.get("metric", "p95_ms")
+    max_server_errors = budget.get("max_server_errors", 0)
+    failures = []
+    for route, stats in results["routes"].items():
+        server_errors = sum(n for code, n in stats["statuses"].items() if code.startswith("5"))
+        if server_errors > max_server_errors:
+            failures.append(f"{route}: {server_errors} 5xx responses")
+        limit = budget.get("routes", {}).get(route, budget.get("default_ms"))
+        if limit is not None and stats["count"] >= min_samples and stats[metric] > limit:
+            failures.append(f"{route}: {metric} {stats[metric]:.2f} ms over the {limit:g} ms budget")
+    return failures
+
+
+def main(args):
+    if args.workload:
+        workload, name = load_workload(args.workload), args.workload
+    else:
+        workload, name = MIXES[args.mix], f"mix:{args.mix}"
+    results = asyncio.run(run(workload, args.concurrency, args.requests, args.warmup, args.seed_items, args.seed))
+    results["workload"] = name
+    report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.save}")
+
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        failures = regressions(results, baseline, args.metric, args.threshold, args.min_delta_ms, args.min_samples)
+        if failures:
+            print(f"REGRESSION against {args.check} (threshold {args.threshold:.0%} on {args.metric}):")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"no route regressed more than {args.threshold:.0%} on {args.metric} against {args.check}")
+
+    if args.budget:
+        with open(args.budget) as f:
+            budget = json.load(f)
+        failures = over_budget(results, budget, args.min_samples)
+        if failures:
+            print(f"OVER BUDGET ({args.budget}):")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"every route within {args.budget}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--workload", help="JSON Lines workload file")
+    source.add_argument("--mix", choices=sorted(MIXES), default="mixed", help="built-in synthetic workload")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests to issue")
+    parser.add_argument("--warmup", type=int, default=200, help="unrecorded requests issued first")
+    parser.add_argument("--seed-items", type=int, default=200, help="items created per user before the run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--check", metavar="FILE", help="fail if a route regressed against this baseline")
+    parser.add_argument("--budget", metavar="FILE", help="fail if a route is over the latency budgets in this file")
+    parser.add_argument("--metric", choices=LATENCY_METRICS, default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--min-samples", type=int, default=50, help="skip routes with fewer requests than this")
+    main(parser.parse_args())
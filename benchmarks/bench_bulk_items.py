@@ -0,0 +1,93 @@
+"""
+Throughput: single-item vs. bulk item create/update/delete.
+
+Drives main.app in process over httpx's ASGI transport with the configured
+storage backend (STORAGE_BACKEND) and reports items/sec for each operation.
+
+Run from the repo root:
+    python -m benchmarks.bench_bulk_items [--items 10000] [--batch 1000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+# All clients share one address in process; keep the rate limiter out of the numbers
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from main import app, lifespan
+
+LOGIN = {"username": "testuser", "password": "testpassword"}
+
+
+async def timed(label, count, coro):
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {count:>7} items  {elapsed:8.2f} s  {count / elapsed:>10.0f} items/s")
+
+
+async def single(client, headers, n):
+    ids = []
+
+    async def create():
+        for i in range(n):
+            response = await client.post("/items/", json={"name": f"item-{i}", "price": 1.0, "owner_id": 0}, headers=headers)
+            ids.append(response.json()["id"])
+
+    async def update():
+        for item_id in ids:
+            await client.put(f"/items/{item_id}", json={"name": "renamed", "price": 2.0, "owner_id": 0}, headers=headers)
+
+    async def delete():
+        for item_id in ids:
+            await client.delete(f"/items/{item_id}", headers=headers)
+
+    await timed("single create", n, create())
+    await timed("single update", n, update())
+    await timed("single delete", n, delete())
+
+
+async def bulk(client, headers, n, batch):
+    ids = []
+
+    async def create():
+        for start in range(0, n, batch):
+            body = [{"name": f"item-{i}", "price": 1.0, "owner_id": 0} for i in range(start, min(n, start + batch))]
+            response = await client.post("/items/bulk", json=body, headers=headers)
+            ids.extend(result["id"] for result in response.json())
+
+    async def update():
+        for start in range(0, n, batch):
+            body = [{"id": item_id, "name": "renamed", "price": 2.0} for item_id in ids[start:start + batch]]
+            response = await client.patch("/items/bulk", json=body, headers=headers)
+            assert response.status_code == 200, response.text
+
+    async def delete():
+        for start in range(0, n, batch):
+            response = await client.request("DELETE", "/items/bulk", json={"ids": ids[start:start + batch]}, headers=headers)
+            assert response.status_code == 200, response.text
+
+    await timed(f"bulk create/{batch}", n, create())
+    await timed(f"bulk update/{batch}", n, update())
+    await timed(f"bulk delete/{batch}", n, delete())
+
+
+async def main(n, batch):
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            token = (await client.post("/auth/login", json=LOGIN)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            await single(client, headers, n)
+            await bulk(client, headers, n, batch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.batch))
@@ -0,0 +1,89 @@
+"""
+Benchmark: fan-out of one item write to many clients waiting on GET /items/changes.
+
+First at the notifier level: ``--waiters`` tasks wait on one owner, the
+process CPU time spent while they sit idle is measured, then one publish
+wakes them all and the time until the last one has resumed is reported.
+Then end to end: ``--clients`` long-polls are parked on /items/changes
+through main.app (in process, over httpx's ASGI transport, like one
+uvicorn worker), one item is created, and the time until every poll has
+returned with the change is reported.
+
+Run from the repo root:
+    python -m benchmarks.bench_change_feed [--waiters 10000] [--clients 1000] [--idle 1]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+# All clients share one address in process; keep the rate limiter out of the numbers
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from change_feed import ChangeNotifier
+from main import app, lifespan
+
+LOGIN = {"username": "testuser", "password": "testpassword"}
+
+
+async def notifier_fan_out(waiters: int, idle: float):
+    async def no_changes(after_seq):
+        return after_seq, set()
+
+    notifier = ChangeNotifier(no_changes)
+    woken = []
+
+    async def waiter():
+        await notifier.wait(1, 0, 0, 60)
+        woken.append(time.perf_counter())
+
+    tasks = [asyncio.create_task(waiter()) for _ in range(waiters)]
+    await asyncio.sleep(0.1)
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    idle_cpu_ms = (time.process_time() - cpu) * 1e3
+
+    published = time.perf_counter()
+    notifier.publish(1)
+    await asyncio.gather(*tasks)
+    print(f"notifier: {waiters} waiters idle for {idle:.1f} s used {idle_cpu_ms:.1f} ms CPU; "
+          f"one publish woke all of them in {(max(woken) - published) * 1e3:.1f} ms")
+
+
+async def api_fan_out(clients: int):
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        token = (await client.post("/auth/login", json=LOGIN)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        since = (await client.get("/items/changes", headers=headers)).json()["last_seq"]
+        returned = []
+
+        async def long_poll():
+            response = await client.get(f"/items/changes?since={since}&wait=60", headers=headers)
+            assert response.status_code == 200 and response.json()["changes"], response.text
+            returned.append(time.perf_counter())
+
+        polls = [asyncio.create_task(long_poll()) for _ in range(clients)]
+        await asyncio.sleep(1.0)
+        written = time.perf_counter()
+        await client.post("/items/", json={"name": "fan-out", "price": 1.0, "owner_id": 0}, headers=headers)
+        await asyncio.gather(*polls)
+    elapsed = max(returned) - written
+    print(f"api: one create answered {clients} parked long-polls in {elapsed * 1e3:.0f} ms "
+          f"({elapsed / clients * 1e6:.0f} us per client, including the response)")
+
+
+async def main(waiters: int, clients: int, idle: float):
+    await notifier_fan_out(waiters, idle)
+    await api_fan_out(clients)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--waiters", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--idle", type=float, default=1.0, help="seconds the notifier's waiters sit idle")
+    args = parser.parse_args()
+    asyncio.run(main(args.waiters, args.clients, args.idle))
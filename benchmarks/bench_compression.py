@@ -0,0 +1,136 @@
+"""
+Benchmark: bytes saved vs. added latency of response compression, by payload size.
+
+Two payload shapes are built at several sizes: an item listing (short
+names, repeated keys) and an IPAM node listing (ids, addresses, UUID-like
+config ids, utilization figures), both as the API encodes them. For each
+encoding this process can produce (gzip always; br and zstd when brotli /
+zstandard are installed) it reports the compressed size and the CPU time
+to compress the whole body. Then every payload is served through a
+throwaway app, without and with CompressionMiddleware, in process over
+httpx's ASGI transport, and the added time per request is reported (the
+client's decompression included). A streamed NDJSON listing is timed the
+same way, to show the chunk-by-chunk path.
+
+Run from the repo root:
+    python -m benchmarks.bench_compression [--requests 200] [--seed 42]
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from compression import COMPRESSION_MIN_SIZE, ENCODERS, CompressionMiddleware
+from serialization import dumps
+
+# Record counts per payload; roughly 0.5 KB to 2 MB of JSON
+SIZES = (5, 50, 500, 5000, 20000)
+STATUSES = ["Active", "Inactive", "Maintenance", "Error", "Pending"]
+
+
+def item_records(rng, count):
+    return [
+        {"id": i, "name": f"item-{rng.randrange(10**6)}",
+         "description": None if i % 3 else f"description of item {i}",
+         "price": round(rng.uniform(0.5, 500.0), 2), "owner_id": rng.randrange(1, 50)}
+        for i in range(1, count + 1)
+    ]
+
+
+def ipam_records(rng, count):
+    return [
+        {"object_id": f"host-{i}", "object_type": "host", "parent_id": f"network-{i // 100}",
+         "sec_zone": f"zone-{i // 10000}", "config_id": str(uuid.UUID(int=rng.getrandbits(128))),
+         "ip_address": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}", "status": rng.choice(STATUSES),
+         "percent_utilized": round(rng.uniform(0.0, 100.0), 2), "immediate_children": []}
+        for i in range(1, count + 1)
+    ]
+
+
+def compress_whole(encoding, body, repeat):
+    """(compressed bytes, microseconds per call) for one-shot compression of ``body``."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressed = ENCODERS[encoding]().compress(body, True)
+    return compressed, (time.perf_counter() - start) / repeat * 1e6
+
+
+def make_app(body, ndjson_lines, compressed):
+    app = FastAPI()
+
+    @app.get("/body")
+    async def get_body():
+        return Response(body, media_type="application/json")
+
+    @app.get("/stream")
+    async def get_stream():
+        async def lines():
+            for line in ndjson_lines:
+                yield line
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if compressed:
+        app.add_middleware(CompressionMiddleware)
+    return app
+
+
+async def time_requests(app, path, encoding, requests):
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept-Encoding": encoding or "identity"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for _ in range(5):
+            response = await client.get(path)
+        assert response.headers.get("content-encoding") == encoding or encoding is None or \
+            len(response.content) < COMPRESSION_MIN_SIZE, response.headers
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get(path)
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests, seed):
+    rng = random.Random(seed)
+    encodings = list(ENCODERS)
+    print(f"encodings: {', '.join(encodings)}; bodies under {COMPRESSION_MIN_SIZE} B are not compressed\n")
+
+    print(f"{'payload':<20} {'bytes':>10} " + " ".join(f"{e + ' bytes':>11} {e + ' us':>9}" for e in encodings))
+    payloads = []
+    for shape, make in (("items", item_records), ("ipam", ipam_records)):
+        for count in SIZES:
+            records = make(rng, count)
+            body = dumps(records)
+            payloads.append((f"{shape} x{count}", body, [dumps(record) + b"\n" for record in records]))
+            repeat = max(3, 2000000 // len(body))
+            cells = []
+            for encoding in encodings:
+                compressed, us = compress_whole(encoding, body, min(repeat, 200))
+                cells.append(f"{len(compressed):11,} {us:9.1f}")
+            print(f"{payloads[-1][0]:<20} {len(body):10,} " + " ".join(cells))
+
+    print(f"\nper-request latency through the middleware (us; added over identity without it)")
+    print(f"{'payload':<20} {'identity':>10} " + " ".join(f"{e:>16}" for e in encodings))
+    for label, body, lines in payloads:
+        plain = make_app(body, lines, compressed=False)
+        compressing = make_app(body, lines, compressed=True)
+        count = max(5, requests * 20000 // max(len(body), 20000))
+        for path in ("/body", "/stream") if label.endswith(f"x{SIZES[-2]}") else ("/body",):
+            base = await time_requests(plain, path, None, count)
+            cells = []
+            for encoding in encodings:
+                us = await time_requests(compressing, path, encoding, count)
+                cells.append(f"{us:9.0f} ({us - base:+5.0f})")
+            name = label + (" ndjson" if path == "/stream" else "")
+            print(f"{name:<20} {base:10.0f} " + " ".join(f"{cell:>16}" for cell in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per small payload (fewer for large ones)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.seed))
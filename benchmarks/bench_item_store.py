@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: ItemStore vs. the old list-of-dicts item table.
+
+Run from the repo root:
+    python -m benchmarks.bench_item_store [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+
+from store import ItemStore
+
+NUM_OWNERS = 1000
+
+
+def make_item(i: int) -> dict:
+    return {"name": f"item-{i}", "description": None, "price": 1.0, "owner_id": i % NUM_OWNERS}
+
+
+# The pre-ItemStore access patterns from routers/itemRoutes.py
+def list_get(items, item_id):
+    return next((item for item in items if item["id"] == item_id), None)
+
+def list_by_owner(items, owner_id):
+    return [item for item in items if item["owner_id"] == owner_id]
+
+def list_delete(items, item_id):
+    index = next((i for i, item in enumerate(items) if item["id"] == item_id), None)
+    del items[index]
+
+
+def time_ops(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def run(size: int, ops: int):
+    items = []
+    for i in range(size):
+        item = make_item(i)
+        item["id"] = i + 1
+        items.append(item)
+
+    store = ItemStore()
+    for i in range(size):
+        store.add(make_item(i))
+
+    ids = random.sample(range(1, size + 1), ops)
+    owners = [random.randrange(NUM_OWNERS) for _ in range(ops)]
+
+    results = {
+        "get": (time_ops(list_get, [(items, i) for i in ids]),
+                time_ops(store.get, [(i,) for i in ids])),
+        "list_by_owner": (time_ops(list_by_owner, [(items, o) for o in owners]),
+                          time_ops(store.list_by_owner, [(o,) for o in owners])),
+        "delete": (time_ops(list_delete, [(items, i) for i in ids]),
+                   time_ops(store.delete, [(i,) for i in ids])),
+    }
+    for op, (list_time, store_time) in results.items():
+        print(f"{size:>9} {op:<14} list {list_time * 1e6:>12.1f} us   "
+              f"store {store_time * 1e6:>8.2f} us   x{list_time / store_time:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=20, help="operations timed per size")
+    args = parser.parse_args()
+
+    random.seed(0)
+    for size in args.sizes:
+        run(size, args.ops)
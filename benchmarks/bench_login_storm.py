@@ -0,0 +1,110 @@
+"""
+Load test: /items latency while a login storm runs on the same worker.
+
+Drives main.app in process over httpx's ASGI transport, so everything shares a
+single event loop exactly like one uvicorn worker. Measures GET /items/ latency
+alone, then again while --logins concurrent clients hammer /auth/login.
+
+Exits non-zero, so CI can run it, unless /items p99 under the storm stays
+within --max-p99-ms and logins still succeed. The budget is well under the
+cost of one bcrypt call (~250-300 ms): a hash run on the event loop again
+would stall the polling requests behind it and blow it at once.
+
+Run from the repo root:
+    python -m benchmarks.bench_login_storm [--duration 5] [--logins 50] [--max-p99-ms 150]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+# All clients share one address in process; keep the rate limiter out of the numbers
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from main import app
+
+LOGIN = {"username": "testuser", "password": "testpassword"}
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def poll_items(client, headers, stop_at):
+    latencies = []
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.get("/items/", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def login_storm(client, stop_at, counts):
+    while time.perf_counter() < stop_at:
+        response = await client.post("/auth/login", json=LOGIN)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            # Well-behaved clients honour Retry-After
+            await asyncio.sleep(int(response.headers["Retry-After"]))
+
+
+def report(label, latencies):
+    print(f"{label:<14} n={len(latencies):>5}  p50={statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p99={percentile(latencies, 99) * 1000:7.2f} ms  max={max(latencies) * 1000:7.2f} ms")
+
+
+def check(under_storm, counts, max_p99_ms: float) -> list:
+    """Failures of the storm run, empty if it passed."""
+    failures = []
+    p99_ms = percentile(under_storm, 99) * 1000
+    if max_p99_ms and p99_ms > max_p99_ms:
+        failures.append(f"/items p99 under the login storm is {p99_ms:.1f} ms, over the {max_p99_ms:g} ms budget")
+    if not counts.get(200):
+        failures.append("no login succeeded during the storm")
+    if set(counts) - {200, 503}:
+        failures.append(f"unexpected login statuses: {sorted(set(counts) - {200, 503})}")
+    return failures
+
+
+async def main(duration: float, logins: int, max_p99_ms: float) -> int:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = (await client.post("/auth/login", json=LOGIN)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(20):
+            await client.post("/items/", json={"name": f"item-{i}", "price": 1.0, "owner_id": 0}, headers=headers)
+
+        baseline = await poll_items(client, headers, time.perf_counter() + duration)
+
+        counts = {}
+        stop_at = time.perf_counter() + duration
+        storm = [asyncio.create_task(login_storm(client, stop_at, counts)) for _ in range(logins)]
+        under_storm = await poll_items(client, headers, stop_at)
+        await asyncio.gather(*storm)
+
+    report("baseline", baseline)
+    report("login storm", under_storm)
+    print(f"login responses by status: {dict(sorted(counts.items()))}")
+    failures = check(under_storm, counts, max_p99_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--logins", type=int, default=50, help="concurrent login clients")
+    parser.add_argument("--max-p99-ms", type=float, default=150.0,
+                        help="fail when /items p99 under the storm exceeds this (0: report only)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.duration, args.logins, args.max_p99_ms)))
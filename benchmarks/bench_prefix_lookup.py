@@ -0,0 +1,94 @@
+"""
+Benchmark: longest-prefix match with the Patricia trie vs. a naive ipaddress scan.
+
+Builds random IPv4 prefixes (lengths /8 to /30, nested as real allocations
+are), then times trie construction, trie lookups and a linear scan over
+``ipaddress.ip_network`` objects that keeps the longest containing prefix.
+The scan is only run for a handful of addresses since each one touches every
+prefix; its answers are checked against the trie.
+
+Run from the repo root:
+    python -m benchmarks.bench_prefix_lookup [--prefixes 1000000] [--lookups 100000]
+"""
+import argparse
+import ipaddress
+import random
+import time
+
+from ipam.prefix_trie import PrefixTrie
+
+
+def random_prefixes(n, rng):
+    """Random prefixes; most are carved out of earlier ones so matches nest."""
+    prefixes = {(10 << 24, 8)}
+    pool = [(10 << 24, 8)]
+    while len(prefixes) < n:
+        if rng.random() < 0.9:
+            key, length = rng.choice(pool)
+            new_length = min(30, length + rng.randint(1, 8))
+            key |= rng.getrandbits(new_length - length) << (32 - new_length)
+        else:
+            new_length = rng.randint(8, 30)
+            key = rng.getrandbits(new_length) << (32 - new_length)
+        if (key, new_length) not in prefixes:
+            prefixes.add((key, new_length))
+            pool.append((key, new_length))
+    return list(prefixes)
+
+
+def main(n, lookups, naive_lookups, seed):
+    rng = random.Random(seed)
+    prefixes = random_prefixes(n, rng)
+    # Half the addresses fall inside a stored prefix, half are uniform
+    addresses = []
+    for _ in range(lookups):
+        if rng.random() < 0.5:
+            key, length = rng.choice(prefixes)
+            addresses.append(key | rng.getrandbits(32 - length))
+        else:
+            addresses.append(rng.getrandbits(32))
+
+    start = time.perf_counter()
+    trie = PrefixTrie(32)
+    for key, length in prefixes:
+        trie.insert(key, length, (key, length))
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie_results = [trie.longest_match(address) for address in addresses]
+    trie_time = time.perf_counter() - start
+
+    strings = [str(ipaddress.IPv4Address(address)) for address in addresses]
+    start = time.perf_counter()
+    for string in strings:
+        int(ipaddress.ip_address(string))
+    parse_time = time.perf_counter() - start
+
+    networks = [(ipaddress.IPv4Network((key, length)), (key, length)) for key, length in prefixes]
+    start = time.perf_counter()
+    for address, expected in zip(addresses[:naive_lookups], trie_results):
+        ip = ipaddress.IPv4Address(address)
+        best = None
+        for network, value in networks:
+            if ip in network and (best is None or network.prefixlen > best[1]):
+                best = value
+        assert best == expected, (ip, best, expected)
+    naive_time = time.perf_counter() - start
+
+    trie_us = trie_time / lookups * 1e6
+    naive_us = naive_time / naive_lookups * 1e6
+    print(f"prefixes: {len(prefixes)}  trie nodes: {len(trie._key)}  build: {build:.2f} s")
+    print(f"trie lookup:   {trie_us:10.2f} us/lookup  ({lookups / trie_time:,.0f} lookups/s)")
+    print(f"  + parsing:   {parse_time / lookups * 1e6:10.2f} us/address (ipaddress string parsing)")
+    print(f"naive scan:    {naive_us:10.0f} us/lookup  ({naive_lookups} lookups, answers match the trie)")
+    print(f"speedup:       {naive_us / trie_us:10.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prefixes", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--naive-lookups", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.prefixes, args.lookups, args.naive_lookups, args.seed)
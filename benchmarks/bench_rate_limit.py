@@ -0,0 +1,72 @@
+"""
+Benchmark: cost of one rate-limit check, per process and shared across worker processes.
+
+Times ``BucketTable.take`` over ``--keys`` distinct clients for the
+in-process table and for the mmap-backed table shared through a directory.
+Then ``--workers`` processes hammer one key of the shared table for
+``--duration`` seconds; the total number of tokens granted across all of
+them must be the burst plus rate x elapsed time, as it would be for a
+single process.
+
+Run from the repo root:
+    python -m benchmarks.bench_rate_limit [--checks 200000] [--keys 10000] [--workers 4] [--duration 2]
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+
+import db  # noqa: F401  db has to be imported before auth (which ratelimit imports), as in main
+from ratelimit import BucketTable, Limit
+
+LIMIT = Limit(rate=1000.0, burst=100.0)
+
+
+def per_check_us(table, checks, keys):
+    names = [f"items:user:{i}" for i in range(keys)]
+    start = time.perf_counter()
+    for i in range(checks):
+        table.take(names[i % keys], LIMIT)
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def hammer(directory, duration, results):
+    table = BucketTable(directory)
+    granted = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if not table.take("auth:ip:10.0.0.1", LIMIT):
+            granted += 1
+    results.put(granted)
+
+
+def main(checks, keys, workers, duration):
+    print(f"in-process table: {per_check_us(BucketTable(), checks, keys):6.2f} us per check")
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"shared table:     {per_check_us(BucketTable(directory), checks, keys):6.2f} us per check")
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=hammer, args=(directory, duration, results))
+                     for _ in range(workers)]
+        start = time.monotonic()
+        for process in processes:
+            process.start()
+        granted = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.monotonic() - start
+    # Workers start at slightly different times, so the window is bounded by the parent's timing
+    expected = LIMIT.burst + LIMIT.rate * elapsed
+    print(f"{workers} workers, one key, {elapsed:.2f} s: granted {sum(granted)} {granted}, "
+          f"at most {expected:.0f} expected ({LIMIT.rate:.0f}/s, burst {LIMIT.burst:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=2.0)
+    args = parser.parse_args()
+    main(args.checks, args.keys, args.workers, args.duration)
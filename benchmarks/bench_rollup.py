@@ -0,0 +1,141 @@
+"""
+Benchmark: incremental utilization rollups vs. recomputing them from the subtree.
+
+Builds a datacenter -> sec_zone -> network -> host tree (about 1M nodes with
+the defaults) shaped like the generator's records, loads it into a
+HierarchyIndex and a RollupIndex, then times single-node writes: utilization
+and status changes on hosts and networks, and moving a network to another
+zone. Each write is timed as the incremental rollup update and, for
+comparison, as recomputing its datacenter's rollup from scratch, which is
+what answering the rollup without materializing it costs. Afterwards every
+zone and datacenter rollup is checked against a full recomputation.
+
+Run from the repo root:
+    python -m benchmarks.bench_rollup [--datacenters 10] [--zones 10] [--networks 100] [--hosts 100] [--writes 2000]
+"""
+import argparse
+import math
+import random
+import time
+
+from ipam.hierarchy import HierarchyIndex
+from ipam.rollup import RollupIndex
+
+STATUSES = ["Active", "Inactive", "Maintenance", "Error", "Pending"]
+
+
+def build_records(rng, datacenters, zones, networks, hosts):
+    records = []
+
+    def add(object_type, parent_id):
+        object_id = f"{object_type}-{len(records)}"
+        leaf = object_type == "host"
+        records.append({
+            "object_id": object_id, "object_type": object_type, "parent_id": parent_id,
+            "status": "" if leaf else rng.choice(STATUSES),
+            "percent_utilized": 0.0 if leaf else round(rng.uniform(0.0, 100.0), 2),
+        })
+        return object_id
+
+    for _ in range(datacenters):
+        dc = add("datacenter", None)
+        for _ in range(zones):
+            zone = add("sec_zone", dc)
+            for _ in range(networks):
+                network = add("network", zone)
+                for _ in range(hosts):
+                    add("host", network)
+    return records
+
+
+def timed(operations):
+    start = time.perf_counter()
+    for operation in operations:
+        operation()
+    return (time.perf_counter() - start) / len(operations) * 1e6
+
+
+def same(rollup, expected):
+    return (rollup["count"] == expected["count"] and rollup["max"] == expected["max"]
+            and rollup["by_status"] == expected["by_status"] and rollup["by_type"] == expected["by_type"]
+            and math.isclose(rollup["sum"], expected["sum"], rel_tol=1e-9, abs_tol=1e-6))
+
+
+def main(datacenters, zones, networks, hosts, writes, seed):
+    rng = random.Random(seed)
+    records = build_records(rng, datacenters, zones, networks, hosts)
+    by_type = {}
+    for record in records:
+        by_type.setdefault(record["object_type"], []).append(record["object_id"])
+
+    hierarchy = HierarchyIndex()
+    start = time.perf_counter()
+    hierarchy.load(records)
+    load_s = time.perf_counter() - start
+    rollups = RollupIndex(hierarchy)
+    start = time.perf_counter()
+    rollups.load()
+    rollup_s = time.perf_counter() - start
+    print(f"{len(hierarchy)} nodes: hierarchy load {load_s:.2f} s, rollup load {rollup_s:.2f} s")
+
+    def datacenter_of(object_id):
+        return hierarchy.ancestors(object_id)[0]["object_id"]
+
+    def host_utilization():
+        object_id = rng.choice(by_type["host"])
+        return lambda: rollups.update(object_id, percent_utilized=round(rng.uniform(0.0, 100.0), 2))
+
+    def network_status():
+        object_id = rng.choice(by_type["network"])
+        return lambda: rollups.update(object_id, status=rng.choice(STATUSES))
+
+    def network_utilization_drop():
+        # Lowering a value that may be the max makes every level re-read its children's maxima
+        object_id = rng.choice(by_type["network"])
+        record = hierarchy.get(object_id)
+        return lambda: rollups.update(object_id, percent_utilized=round(record["percent_utilized"] / 2, 2))
+
+    def network_move():
+        """Move a random network to a random zone; returns the seconds spent updating rollups."""
+        object_id, zone_id = rng.choice(by_type["network"]), rng.choice(by_type["sec_zone"])
+        old_parent_id = hierarchy.get(object_id)["parent_id"]
+        if old_parent_id == zone_id:
+            return 0.0
+        hierarchy.move(object_id, zone_id)
+        start = time.perf_counter()
+        rollups.moved(object_id, old_parent_id)
+        return time.perf_counter() - start
+
+    recompute_targets = [datacenter_of(rng.choice(by_type["host"])) for _ in range(max(1, writes // 200))]
+    recompute_us = timed([lambda object_id=object_id: rollups.recompute(object_id) for object_id in recompute_targets])
+
+    print(f"recompute one datacenter's rollup: {recompute_us / 1e3:10.1f} ms")
+    for label, make in (("host utilization change", host_utilization), ("network status change", network_status),
+                        ("network utilization drop", network_utilization_drop)):
+        update_us = timed([make() for _ in range(writes)])
+        print(f"{label:34} {update_us:8.1f} us incremental ({recompute_us / update_us:,.0f}x less than recomputing)")
+    move_count = max(1, writes // 10)
+    move_us = sum(network_move() for _ in range(move_count)) / move_count * 1e6
+    print(f"{f'network move ({hosts} hosts)':34} {move_us:8.1f} us incremental "
+          f"({recompute_us / move_us:,.0f}x less than recomputing)")
+
+    for _ in range(writes):
+        host_utilization()()
+        network_utilization_drop()()
+        network_move()
+    checked = by_type["datacenter"] + by_type["sec_zone"]
+    mismatched = [object_id for object_id in checked if not same(rollups.get(object_id), rollups.recompute(object_id))]
+    print(f"checked {len(checked)} rollups against recomputation after {3 * writes} more writes: "
+          f"{'OK' if not mismatched else f'{len(mismatched)} MISMATCHED'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--datacenters", type=int, default=10)
+    parser.add_argument("--zones", type=int, default=10)
+    parser.add_argument("--networks", type=int, default=100)
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.datacenters, args.zones, args.networks, args.hosts, args.writes, args.seed)
@@ -0,0 +1,96 @@
+"""
+Benchmark: per-endpoint response serialization, pydantic round trip vs. trusted projection.
+
+For each endpoint shape the old path is what the handler and FastAPI did
+before: build the model instances in the handler, then validate the return
+value against the route's response_model and dump it with pydantic
+(FastAPI's own ``serialize_response``, fed the real route's response field).
+The new path is ``trusted_response``: a precompiled projection of the store
+records encoded with orjson. Both bodies are decoded and compared, so the
+projection is checked to produce the same JSON as the model.
+
+Run from the repo root:
+    python -m benchmarks.bench_serialization [--repeat 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.routing import APIRoute, serialize_response
+
+from models import BulkItemResult, Item, User
+from routers import adminRoutes, itemRoutes
+from serialization import orjson, trusted_response
+
+
+def item_records(count):
+    return [
+        {"id": i, "name": f"item-{i}", "description": None if i % 3 else f"description of item {i}",
+         "price": float(i % 500) + 0.99, "owner_id": 1}
+        for i in range(1, count + 1)
+    ]
+
+
+def user_records(count):
+    return [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com",
+         "hashed_password": "$2b$12$" + "x" * 53, "is_active": True}
+        for i in range(1, count + 1)
+    ]
+
+
+def response_field(router, method, path):
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route.response_field
+    raise LookupError(f"{method} {path}")
+
+
+def endpoints():
+    items_100, items_1000, users = item_records(100), item_records(1000), user_records(100)
+    return [
+        # (label, route, old handler return value, new handler return value)
+        ("GET /items/{item_id}", (itemRoutes.router, "GET", "/{item_id}"),
+         lambda: Item(**items_100[0]), lambda: trusted_response(items_100[0], Item)),
+        ("GET /items/ (100)", (itemRoutes.router, "GET", "/"),
+         lambda: items_100, lambda: trusted_response(items_100, Item)),
+        ("GET /items/ (1000)", (itemRoutes.router, "GET", "/"),
+         lambda: items_1000, lambda: trusted_response(items_1000, Item)),
+        ("GET /admin/users (100)", (adminRoutes.router, "GET", "/users"),
+         lambda: [User(**user) for user in users], lambda: trusted_response(users, User)),
+        ("POST /items/bulk (1000)", (itemRoutes.router, "POST", "/bulk"),
+         lambda: [BulkItemResult(index=i, id=item["id"], status=200, item=Item(**item))
+                  for i, item in enumerate(items_1000)],
+         lambda: trusted_response([{"index": i, "id": item["id"], "status": 200, "item": item}
+                                   for i, item in enumerate(items_1000)], BulkItemResult)),
+    ]
+
+
+async def old_body(field, handler):
+    return await serialize_response(field=field, response_content=handler(), dump_json=True)
+
+
+async def main(repeat):
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    for label, route, old, new in endpoints():
+        field = response_field(*route)
+        assert json.loads(await old_body(field, old)) == json.loads(new().body), label
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await old_body(field, old)
+        old_us = (time.perf_counter() - start) / repeat * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            new()
+        new_us = (time.perf_counter() - start) / repeat * 1e6
+        print(f"{label:26} pydantic: {old_us:9.1f} us  trusted: {new_us:9.1f} us  ({old_us / new_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
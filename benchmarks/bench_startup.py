@@ -0,0 +1,109 @@
+"""
+Benchmark and budget check: worker cold start, from process spawn to the first response.
+
+Each run spawns a fresh interpreter, as a uvicorn worker or an autoscaled
+replica would, which imports main, runs the app's lifespan startup (storage
+and IPAM indexes, on the configured STORAGE_BACKEND) and serves GET /health
+over httpx's ASGI transport. The child reports how long each phase took, and
+the parent measures the wall time from spawn to that first response.
+Medians over ``--runs`` are compared with the budgets; the script exits with
+status 1 if one is exceeded. ``--importtime N`` also lists the N slowest
+imports (cumulative, from ``python -X importtime``) of one extra run.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 500] [--total-budget-ms 650]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Default budgets, about 1.5x a single core today (import ~0.34 s, spawn to first
+# response ~0.41 s). Hashing the seed passwords at import used to add ~0.55 s.
+IMPORT_BUDGET_MS = 500
+TOTAL_BUDGET_MS = 650
+
+CHILD = """
+import asyncio, json, time
+started = time.time()
+t0 = time.perf_counter()
+import httpx
+import main
+t1 = time.perf_counter()
+
+async def first_response():
+    async with main.lifespan(main.app):
+        t2 = time.perf_counter()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/health")
+        assert response.status_code == 200, response.text
+        return t2, time.perf_counter()
+
+t2, t3 = asyncio.run(first_response())
+print(json.dumps({"started": started, "import_ms": (t1 - t0) * 1e3, "lifespan_ms": (t2 - t1) * 1e3,
+                  "request_ms": (t3 - t2) * 1e3, "finished": time.time()}))
+"""
+
+PHASES = ("interpreter_ms", "import_ms", "lifespan_ms", "request_ms", "total_ms")
+
+
+def run_once(repo_root: str) -> dict:
+    spawned = time.time()
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD], cwd=repo_root, check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["interpreter_ms"] = (result["started"] - spawned) * 1e3
+    result["total_ms"] = (result["finished"] - spawned) * 1e3
+    return result
+
+
+def slowest_imports(repo_root: str, count: int):
+    stderr = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import main"],
+        cwd=repo_root, check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    print("slowest imports (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:count]:
+        print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+
+
+def main(runs, import_budget_ms, total_budget_ms, importtime):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = [run_once(repo_root) for _ in range(runs)]
+    medians = {phase: statistics.median(result[phase] for result in results) for phase in PHASES}
+    print(f"backend {os.getenv('STORAGE_BACKEND', 'memory')}, median of {runs} cold starts:")
+    for phase in PHASES:
+        print(f"  {phase[:-3]:<12} {medians[phase]:8.1f} ms")
+    if importtime:
+        slowest_imports(repo_root, importtime)
+
+    over = [
+        f"{phase[:-3]} {medians[phase]:.0f} ms > budget {budget} ms"
+        for phase, budget in (("import_ms", import_budget_ms), ("total_ms", total_budget_ms))
+        if medians[phase] > budget
+    ]
+    if over:
+        print("OVER BUDGET: " + "; ".join(over))
+        sys.exit(1)
+    print(f"within budget (import {import_budget_ms} ms, spawn to first response {total_budget_ms} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--total-budget-ms", type=float, default=TOTAL_BUDGET_MS)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="list the N slowest imports")
+    args = parser.parse_args()
+    main(args.runs, args.import_budget_ms, args.total_budget_ms, args.importtime)
@@ -0,0 +1,86 @@
+"""
+Benchmark: boolean tag queries with the bitmap tag index vs. SQL over the junction table.
+
+Tags a population of hosts at random (each tag has its own frequency), loads
+the (host_id, tag_id) links into an in-memory SQLite ``host_tags`` table with
+the schema's primary-key index, and into a TagIndex. Each expression is then
+counted both ways: the index with bitmap set operations, SQLite with one
+EXISTS / NOT EXISTS probe per tag, as the junction-table schema implies. The
+counts are checked against each other.
+
+Run from the repo root:
+    python -m benchmarks.bench_tag_search [--hosts 1000000] [--repeat 5]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from ipam.tag_index import TagIndex
+
+# name -> fraction of hosts carrying the tag
+TAGS = {"Production": 0.5, "Staging": 0.2, "DMZ": 0.1, "PCI Compliant": 0.05, "Database": 0.02}
+
+EXPRESSIONS = [
+    ("Production AND \"PCI Compliant\" AND NOT DMZ", ["Production", "PCI Compliant"], ["DMZ"]),
+    ("Production AND Staging", ["Production", "Staging"], []),
+    ("Database AND NOT Production", ["Database"], ["Production"]),
+    ("NOT DMZ", [], ["DMZ"]),
+]
+
+
+def sql_count(conn, tag_ids, included, excluded):
+    clauses = ["EXISTS (SELECT 1 FROM host_tags t WHERE t.host_id = h.host_id AND t.tag_id = ?)"] * len(included)
+    clauses += ["NOT EXISTS (SELECT 1 FROM host_tags t WHERE t.host_id = h.host_id AND t.tag_id = ?)"] * len(excluded)
+    params = [tag_ids[name] for name in included + excluded]
+    return conn.execute(f"SELECT COUNT(*) FROM hosts h WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+
+
+def main(hosts, repeat, seed):
+    rng = random.Random(seed)
+    tag_ids = {name: i for i, name in enumerate(TAGS, 1)}
+    links = [
+        (host_id, tag_ids[name])
+        for host_id in range(1, hosts + 1)
+        for name, frequency in TAGS.items()
+        if rng.random() < frequency
+    ]
+    print(f"hosts: {hosts}  tag links: {len(links)}")
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE hosts (host_id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TABLE host_tags (host_id INTEGER NOT NULL, tag_id INTEGER NOT NULL, PRIMARY KEY (host_id, tag_id))")
+    conn.executemany("INSERT INTO hosts VALUES (?)", ((i,) for i in range(1, hosts + 1)))
+    conn.executemany("INSERT INTO host_tags VALUES (?, ?)", links)
+    conn.commit()
+
+    start = time.perf_counter()
+    index = TagIndex()
+    for name, tag_id in tag_ids.items():
+        index.add_tag({"tag_id": tag_id, "name": name, "tag_group_id": 1, "group": "Benchmark"})
+    for host_id in range(1, hosts + 1):
+        index.add_object("hosts", host_id)
+    index.attach_many("hosts", links)
+    print(f"index build: {time.perf_counter() - start:.2f} s")
+
+    for expression, included, excluded in EXPRESSIONS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            count = len(index.search("hosts", expression))
+        bitmap_ms = (time.perf_counter() - start) / repeat * 1e3
+
+        start = time.perf_counter()
+        expected = sql_count(conn, tag_ids, included, excluded)
+        sql_ms = (time.perf_counter() - start) * 1e3
+        assert count == expected, (expression, count, expected)
+        print(f"{expression:45} {count:>8} matches  bitmap: {bitmap_ms:8.2f} ms  "
+              f"sqlite: {sql_ms:8.1f} ms  ({sql_ms / bitmap_ms:,.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    main(args.hosts, args.repeat, args.seed)
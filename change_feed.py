@@ -0,0 +1,119 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi import Request
+
+from serialization import dumps
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def wants_event_stream(request: Request) -> bool:
+    """True if the client asked for Server-Sent Events with ``Accept: text/event-stream``."""
+    return SSE_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def sse_event(data, event: Optional[str] = None, event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Event; ``data`` is sent as a single line of JSON."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}\n".encode())
+    if event is not None:
+        lines.append(f"event: {event}\n".encode())
+    lines.append(b"data: " + dumps(data) + b"\n\n")
+    return b"".join(lines)
+
+
+class ChangeNotifier:
+    """
+    Wakes the clients waiting for changes to an owner's items.
+
+    Every owner has a generation number, bumped by ``publish``. A client
+    reads the generation, reads the change log, and if it found nothing
+    waits for the generation to move on; a write landing between the two
+    steps is therefore never missed. All clients waiting on one owner
+    share a single future, replaced each time it is resolved, so a waiting
+    client costs no CPU (only the timer for its timeout), and a write wakes
+    thousands of waiters with one ``set_result``.
+
+    Writes made in this process are published by the item repository's
+    listener. With several workers on one database, writes made by other
+    workers are picked up by one poll task per process, which runs only
+    while someone is waiting and asks for the owners changed since the
+    last poll every ``poll_interval`` seconds (0 disables it).
+    """
+
+    def __init__(self, changed_owners: Callable[[int], Awaitable[Tuple[int, Set[int]]]],
+                 poll_interval: float = 0.0):
+        """
+        Args:
+            changed_owners: ``async (after_seq) -> (last_seq, owner_ids)`` over the shared change log.
+            poll_interval: Seconds between polls for other processes' writes (0 for none).
+        """
+        self._changed_owners = changed_owners
+        self.poll_interval = poll_interval
+        self._generations: Dict[int, int] = {}
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._waiting: Dict[int, int] = {}
+        self._seen: Optional[int] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def generation(self, owner_id: int) -> int:
+        return self._generations.get(owner_id, 0)
+
+    def publish(self, owner_id: int):
+        """Record that the owner's items changed and wake everyone waiting on them."""
+        self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+        future = self._futures.pop(owner_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def waiters(self) -> int:
+        return sum(self._waiting.values())
+
+    async def wait(self, owner_id: int, generation: int, since: int, timeout: float) -> bool:
+        """
+        Wait up to ``timeout`` seconds for the owner's generation to move past
+        ``generation``, read before the caller last read changes up to seq ``since``.
+
+        Returns:
+            True if the owner's items changed, False on timeout.
+        """
+        if self.generation(owner_id) != generation:
+            return True
+        future = self._futures.get(owner_id)
+        if future is None:
+            future = self._futures[owner_id] = asyncio.get_running_loop().create_future()
+        self._waiting[owner_id] = self._waiting.get(owner_id, 0) + 1
+        if self.poll_interval:
+            if self._seen is None or since < self._seen:
+                self._seen = since
+            if self._poller is None:
+                self._poller = asyncio.create_task(self._poll())
+        try:
+            # shield: a waiter that times out or disconnects must not cancel the shared future
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiting[owner_id] -= 1
+            if not self._waiting[owner_id]:
+                del self._waiting[owner_id]
+                if self._futures.get(owner_id) is future:
+                    del self._futures[owner_id]
+
+    async def _poll(self):
+        try:
+            while self._waiting:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    self._seen, owners = await self._changed_owners(self._seen)
+                except Exception:
+                    # e.g. the database is busy; the next poll covers the same range
+                    continue
+                for owner_id in owners:
+                    self.publish(owner_id)
+        finally:
+            self._poller = None
+            self._seen = None
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+logger = logging.getLogger("FastAPI_Boilerplate")
+
+# ==================================================
+# STARTUP SETTINGS (environment only)
+# ==================================================
+
+# Signing settings are never read from app_configuration: anyone able to edit
+# the table could otherwise mint tokens or downgrade verification
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+# Applied when the middleware and log handlers are built, so a change needs a restart
+CORS_ALLOW_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if origin.strip()]
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "WARNING").upper()
+
+# Seconds between checks of app_configuration for changes, and the age at which
+# a snapshot is reloaded even if nothing appears to have changed
+CONFIG_CHECK_INTERVAL = float(os.getenv("CONFIG_CHECK_INTERVAL", "5"))
+CONFIG_TTL = float(os.getenv("CONFIG_TTL", "300"))
+
+
+# ==================================================
+# RELOADABLE SETTINGS (app_configuration)
+# ==================================================
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def parse_list(value) -> List[str]:
+    """A JSON array, or a comma-separated string."""
+    if isinstance(value, list):
+        return [str(entry) for entry in value]
+    return [entry.strip() for entry in str(value).split(",") if entry.strip()]
+
+
+def parse_log_level(value) -> int:
+    """A level name such as ``"INFO"``, or its number."""
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"not a log level: {value!r}")
+    return level
+
+
+class Setting(NamedTuple):
+    key: str
+    parse: Callable[[Any], Any]  # raw (JSON-decoded) value -> typed value; raises ValueError if invalid
+    default: Any
+    description: str
+
+
+# Settings the code reads; any other app_configuration row is available untyped
+SETTINGS: Dict[str, Setting] = {setting.key: setting for setting in (
+    Setting("auth.access.token.expire.minutes", int, int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")),
+            "Lifetime of access tokens in minutes"),
+    Setting("auth.refresh.token.expire.days", int, int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14")),
+            "Lifetime of refresh tokens in days"),
+    Setting("log.level", parse_log_level, parse_log_level(os.getenv("LOG_LEVEL", "DEBUG")),
+            "Level of the application logger (file log)"),
+)}
+
+
+def decode_value(text: Optional[str]):
+    """config_value as stored: JSON where it parses (numbers, booleans, arrays...), else the plain string."""
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def encode_value(value) -> str:
+    """Inverse of ``decode_value``; strings are stored as they are, like the seed rows."""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class ConfigSnapshot:
+    """
+    One immutable, fully parsed view of the configuration.
+
+    Known settings hold their typed value (the default if the row is absent
+    or invalid), other rows their JSON-decoded value. A snapshot is never
+    changed after it is built; a reload builds a new one and swaps it in.
+    """
+
+    __slots__ = ("values", "version", "loaded_at")
+
+    def __init__(self, values: Mapping[str, Any], version=None, loaded_at: float = 0.0):
+        self.values: Mapping[str, Any] = MappingProxyType(dict(values))
+        self.version = version
+        self.loaded_at = loaded_at
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], version=None) -> "ConfigSnapshot":
+        values = {key: setting.default for key, setting in SETTINGS.items()}
+        for row in rows:
+            key, value = row["config_key"], decode_value(row["config_value"])
+            setting = SETTINGS.get(key)
+            if setting is None:
+                values[key] = value
+                continue
+            try:
+                values[key] = setting.parse(value)
+            except (TypeError, ValueError):
+                logger.warning("Ignoring invalid value %r for setting %s", row["config_value"], key)
+        return cls(values, version, time.time())
+
+    def get(self, key: str, default=None):
+        return self.values.get(key, default)
+
+    def get_int(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        value = self.values.get(key)
+        return default if value is None else int(value)
+
+    def get_float(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        value = self.values.get(key)
+        return default if value is None else float(value)
+
+    def get_bool(self, key: str, default: Optional[bool] = None) -> Optional[bool]:
+        value = self.values.get(key)
+        return default if value is None else parse_bool(value)
+
+    def get_str(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        value = self.values.get(key)
+        return default if value is None else encode_value(value)
+
+    def get_list(self, key: str, default: Optional[List[str]] = None) -> Optional[List[str]]:
+        value = self.values.get(key)
+        return default if value is None else parse_list(value)
+
+    def as_dict(self) -> dict:
+        return {"version": self.version, "loaded_at": self.loaded_at, "values": dict(self.values)}
+
+
+class ConfigService:
+    """
+    Holds the current ConfigSnapshot and keeps it up to date.
+
+    Readers take ``snapshot`` (one attribute read: no lock, no I/O). A
+    background task asks the repository for the table's version, a cheap
+    high-water mark of ``updated_at``, every ``check_interval`` seconds and
+    reloads when it moved, or when the snapshot is older than ``ttl``. The
+    new snapshot replaces the old one in a single assignment, so a reader
+    sees either the old or the new configuration, never a mix. Listeners
+    are called with each snapshot whose values differ from the last.
+    """
+
+    def __init__(self, check_interval: float = CONFIG_CHECK_INTERVAL, ttl: float = CONFIG_TTL):
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self.snapshot = ConfigSnapshot({key: setting.default for key, setting in SETTINGS.items()})
+        self._repository = None
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._watcher: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]):
+        self._listeners.append(callback)
+
+    async def start(self, repository):
+        """Load from ``repository`` (a ConfigRepository) and start watching it for changes."""
+        self._repository = repository
+        await self.reload()
+        if self.check_interval > 0:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def reload(self) -> ConfigSnapshot:
+        """Load every row and swap in the new snapshot."""
+        # Version first: a write landing before the rows are read only causes one more reload
+        version = await self._repository.version()
+        snapshot = ConfigSnapshot.from_rows(await self._repository.load(), version)
+        previous, self.snapshot = self.snapshot, snapshot
+        if snapshot.values != previous.values:
+            for callback in self._listeners:
+                callback(snapshot)
+        return snapshot
+
+    async def refresh(self) -> bool:
+        """Reload if the table changed or the snapshot expired; True if it reloaded."""
+        version = await self._repository.version()
+        # None: the repository cannot tell whether something changed
+        if version is None or version != self.snapshot.version or time.time() - self.snapshot.loaded_at >= self.ttl:
+            await self.reload()
+            return True
+        return False
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # e.g. the database is busy; keep serving the current snapshot
+                logger.warning("Configuration refresh failed", exc_info=True)
+
+
+settings = ConfigService()
+
+
+def current() -> ConfigSnapshot:
+    """The current configuration snapshot."""
+    return settings.snapshot
@@ -1,4 +1,49 @@
-from auth import pwd_context
+from auth import principal_cache
+from store import ItemStore
+from repository import (
+    address_key, DuplicateKeyError, MemoryConfigRepository, MemoryIpamRepository, MemoryItemRepository,
+    MemoryRevokedTokenRepository, MemoryUserRepository, SQLiteConfigRepository, SQLiteIpamRepository,
+    SQLiteItemRepository, SQLiteRevokedTokenRepository, SQLiteUserRepository,
+)
+from sqlite_pool import SQLitePool
+import ipaddress
+import logging
+import metrics
+import os
+import re
+import sqlite3
+
+# Storage configuration: "memory" (default, for tests/dev) or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "fastapi_boilerplate.db")
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils", "ipam_database_schema_sqlite.sql")
+# Columns added to the schema after databases were first created: (table, column, definition)
+SQLITE_ADDED_COLUMNS = [("hosts", "ip_address", "TEXT NULL"), ("networks", "range_key", "TEXT NULL")]
+# Indexes on those columns, or that older files may hold duplicates for: (name, unique, definition)
+SQLITE_ADDED_INDEXES = [
+    ("IX_networks_range_key", False, "networks(block_id, range_key)"),
+    ("IX_networks_range_key_missing", False, "networks(network_id) WHERE range_key IS NULL"),
+    ("UX_networks_block_cidr", True, "networks(block_id, cidr)"),
+    ("UX_hosts_network_ip", True, "hosts(network_id, ip_address)"),
+]
+# Networks given a range_key per transaction when filling in older files
+RANGE_KEY_BATCH_SIZE = 10000
+# "CREATE TRIGGER IF NOT EXISTS name ... END;" in the schema file: the name and the definition after it
+SQLITE_TRIGGER_PATTERN = re.compile(r"^CREATE TRIGGER IF NOT EXISTS (\w+)(.*?\bEND);", re.MULTILINE | re.DOTALL)
+# Item writes kept for GET /items/changes, across all owners
+ITEM_CHANGE_LOG_SIZE = int(os.getenv("ITEM_CHANGE_LOG_SIZE", "100000"))
+# IPAM writes kept for other workers to apply; one that falls further behind reloads its indexes
+IPAM_CHANGE_LOG_SIZE = int(os.getenv("IPAM_CHANGE_LOG_SIZE", "100000"))
+
+logger = logging.getLogger("FastAPI_Boilerplate")
+
+# bcrypt hashes of the seed users' password "testpassword", precomputed because
+# hashing at import costs ~250 ms each on every worker start
+SEED_PASSWORD_HASHES = (
+    "$2b$12$j5KmGnHPb/pYK.KhyYL9Ae2ZOcAYdbj3.WJK7CHndAQqib21sdkru",
+    "$2b$12$VQ9w/nrwuVChsSqmALybD.l2/DIUVf65b3UcfDG/ZCSkq5b8SWKwi",
+)
 
 # Mock database (replace with real database in production)
 fake_users_db = {
@@ -6,16 +51,155 @@ fake_users_db = {
         "id": 1,
         "username": "testuser",
         "email": "test@example.com",
-        "hashed_password": pwd_context.hash("testpassword"),
+        "hashed_password": SEED_PASSWORD_HASHES[0],
         "is_active": True
     },
     "admin": {
         "id": 2,
         "username": "admin",
         "email": "test2@example.com",
-        "hashed_password": pwd_context.hash("testpassword"),
+        "hashed_password": SEED_PASSWORD_HASHES[1],
         "is_active": True
     }
 }
 
-fake_items_db = []
\ No newline at end of file
+fake_items_db = ItemStore(change_log_size=ITEM_CHANGE_LOG_SIZE)
+
+# Repositories used by auth and the routers
+pool = None
+if STORAGE_BACKEND == "sqlite":
+    pool = SQLitePool(SQLITE_PATH, size=SQLITE_POOL_SIZE)
+    users = SQLiteUserRepository(pool)
+    items = SQLiteItemRepository(pool, change_log_size=ITEM_CHANGE_LOG_SIZE)
+    ipam = SQLiteIpamRepository(pool, change_log_size=IPAM_CHANGE_LOG_SIZE)
+    revoked_tokens = SQLiteRevokedTokenRepository(pool)
+    app_config = SQLiteConfigRepository(pool)
+elif STORAGE_BACKEND == "memory":
+    users = MemoryUserRepository(fake_users_db)
+    items = MemoryItemRepository(fake_items_db)
+    ipam = MemoryIpamRepository()
+    revoked_tokens = MemoryRevokedTokenRepository()
+    app_config = MemoryConfigRepository()
+else:
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND!r} (expected 'memory' or 'sqlite')")
+
+metrics.instrument(users, "users", ("get_by_username", "list", "create", "update"))
+metrics.instrument(items, "items", (
+    "get", "list_by_owner", "owner_version", "changes", "last_change_seq", "changed_owners",
+    "create", "update", "delete", "create_many", "update_many", "delete_many",
+))
+metrics.instrument(ipam, "ipam", (
+    "get", "list", "create", "delete", "get_many", "list_children", "changes", "last_change_seq",
+    "attach_tag", "detach_tag",
+))
+metrics.instrument(revoked_tokens, "revoked_tokens", ("consume", "revoke", "is_revoked"))
+metrics.instrument(app_config, "app_config", ("load", "version", "set"))
+
+# Cached principals must not outlive a change to the user (e.g. deactivation)
+users.subscribe(principal_cache.invalidate_user)
+
+
+def _add_missing_columns(conn):
+    """CREATE TABLE IF NOT EXISTS leaves existing tables alone, so add newer columns by hand."""
+    for table, column, definition in SQLITE_ADDED_COLUMNS:
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_added_indexes(conn):
+    """
+    Create SQLITE_ADDED_INDEXES. A unique index that existing duplicate rows
+    prevent is skipped with a warning; inserts are still checked against
+    stored rows, the index only backs that check up.
+    """
+    for name, unique, definition in SQLITE_ADDED_INDEXES:
+        try:
+            conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {definition}")
+        except sqlite3.IntegrityError as e:
+            logger.warning("Index %s not created, the rows already break it: %s", name, e)
+
+
+def _fill_range_keys(conn):
+    """Set networks.range_key on rows written before the column existed, a batch per transaction."""
+    after_id = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT network_id, cidr FROM networks WHERE range_key IS NULL AND network_id > ? "
+                "ORDER BY network_id LIMIT ?",
+                (after_id, RANGE_KEY_BATCH_SIZE),
+            ).fetchall()
+            keys = []
+            for network_id, cidr in rows:
+                try:
+                    network = ipaddress.ip_network(cidr)
+                    keys.append((address_key(network.version, int(network.network_address)), network_id))
+                except (TypeError, ValueError):
+                    # Never matches a range, and is not picked up again
+                    keys.append(("", network_id))
+            conn.executemany("UPDATE networks SET range_key = ? WHERE network_id = ?", keys)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if len(rows) < RANGE_KEY_BATCH_SIZE:
+            return
+        after_id = rows[-1][0]
+
+
+def _replace_changed_triggers(conn, schema: str):
+    """
+    CREATE TRIGGER IF NOT EXISTS keeps an older definition, so replace triggers
+    whose stored SQL differs from the schema file's.
+
+    Drop and create happen in one write transaction, checked again inside it:
+    workers starting together replace each trigger once, and no write ever
+    runs without it.
+    """
+    wanted = {name: f"CREATE TRIGGER {name}{body}" for name, body in SQLITE_TRIGGER_PATTERN.findall(schema)}
+
+    def changed():
+        stored = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+        return [name for name, sql in wanted.items() if stored.get(name) != sql]
+
+    if not changed():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for name in changed():
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(wanted[name])
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def create_schema(conn):
+    """Create the SQLite schema on ``conn`` (idempotent), migrating columns and triggers of older files."""
+    with open(SQLITE_SCHEMA_FILE) as f:
+        schema = f.read()
+    conn.executescript(schema)
+    _add_missing_columns(conn)
+    _create_added_indexes(conn)
+    _fill_range_keys(conn)
+    _replace_changed_triggers(conn, schema)
+
+
+async def init_storage():
+    """Create the SQLite schema and seed the default users. No-op for the memory backend."""
+    if pool is None:
+        return
+    await pool.run(create_schema)
+    for user in fake_users_db.values():
+        try:
+            await users.create(user["username"], user["email"], user["hashed_password"])
+        except DuplicateKeyError:
+            pass
+
+
+async def close_storage():
+    if pool is not None:
+        await pool.close()
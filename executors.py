@@ -0,0 +1,72 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a BoundedExecutor's queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"executor saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Fixed-size thread pool with admission control for CPU-heavy calls.
+
+    At most ``max_workers`` calls run at once and at most ``queue_depth`` more
+    wait for a worker. Anything beyond that is rejected immediately with
+    ExecutorSaturated instead of piling up, carrying a Retry-After estimate
+    derived from the recent average call duration.
+    """
+
+    def __init__(self, max_workers: int, queue_depth: int, thread_name_prefix: str = "bounded"):
+        """
+        Args:
+            max_workers: Number of worker threads.
+            queue_depth: Calls allowed to wait when all workers are busy.
+            thread_name_prefix: Prefix for worker thread names.
+        """
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._pending = 0
+        self._avg_duration = 0.0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        """Calls currently running or queued."""
+        return self._pending
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained (at least 1)."""
+        backlog = self._pending / self.max_workers
+        return max(1, math.ceil(backlog * self._avg_duration))
+
+    async def submit(self, func: Callable, *args) -> Any:
+        """
+        Run ``func(*args)`` on a worker thread and await its result.
+
+        Raises:
+            ExecutorSaturated: If the running + queued limit is reached.
+        """
+        if self._pending >= self.max_workers + self.queue_depth:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after())
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            result = await loop.run_in_executor(self._executor, func, *args)
+            # Exponentially weighted average, good enough for a Retry-After hint
+            self._avg_duration += 0.2 * ((time.perf_counter() - start) - self._avg_duration)
+            return result
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,338 @@
+import bisect
+import ipaddress
+from typing import Dict, List, Optional, Tuple, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class AddressSpaceFull(Exception):
+    """Raised when no free range of the requested size is left."""
+
+
+class PrefixAllocator:
+    """
+    Free-space tracker for one CIDR range, in the style of a buddy allocator.
+
+    Free space is kept as aligned power-of-two ranges, one sorted list of
+    start addresses per prefix length. Allocating a /n takes the lowest-
+    addressed free range of length <= n and splits it, returning the unused
+    halves to the lists; releasing merges a range with its free buddy again.
+    Both are O(width) list operations, independent of how much of the range
+    is in use, so next-free-subnet and next-free-host queries stay fast on
+    a full /8. Host addresses are simply /32 (or /128) allocations.
+
+    Overlapping records loaded from storage are reference counted: a
+    non-strict reserve of space that is already used records one more
+    holder of that space, and a release only frees addresses that no other
+    holder still covers. The counts are kept per aligned range, disjoint,
+    and only where records overlap, so the usual case pays nothing for them.
+    """
+
+    def __init__(self, network: IPNetwork):
+        self.network = network
+        self.width = network.max_prefixlen
+        self._base = int(network.network_address)
+        self._base_len = network.prefixlen
+        self._free: Dict[int, List[int]] = {length: [] for length in range(self._base_len, self.width + 1)}
+        self._free[self._base_len].append(self._base)
+        self._free_addresses = network.num_addresses
+        self._network_class = type(network)
+        # (start, length) -> holders beyond the first of every address in that range; ranges are disjoint
+        self._shared: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def free_addresses(self) -> int:
+        return self._free_addresses
+
+    def _size(self, length: int) -> int:
+        return 1 << (self.width - length)
+
+    def _network(self, start: int, length: int) -> IPNetwork:
+        return self._network_class((start, length))
+
+    def _add_free(self, start: int, length: int):
+        bisect.insort(self._free[length], start)
+
+    def _remove_free(self, start: int, length: int) -> bool:
+        free = self._free[length]
+        i = bisect.bisect_left(free, start)
+        if i < len(free) and free[i] == start:
+            del free[i]
+            return True
+        return False
+
+    def _split(self, start: int, length: int, target: int, target_length: int):
+        """Carve ``target/target_length`` out of the free range ``start/length``, freeing the rest."""
+        while length < target_length:
+            length += 1
+            half = self._size(length)
+            # Keep the half that holds the target, free the other one
+            if target >= start + half:
+                self._add_free(start, length)
+                start += half
+            else:
+                self._add_free(start + half, length)
+
+    def next_free(self, prefixlen: int) -> Optional[IPNetwork]:
+        """Lowest-addressed free /prefixlen, without allocating it."""
+        found = self._find(prefixlen)
+        return None if found is None else self._network(found[0], prefixlen)
+
+    def _find(self, prefixlen: int):
+        if not self._base_len <= prefixlen <= self.width:
+            raise ValueError(f"/{prefixlen} does not fit in {self.network}")
+        best = None
+        for length in range(self._base_len, prefixlen + 1):
+            free = self._free[length]
+            if free and (best is None or free[0] < best[0]):
+                best = (free[0], length)
+        return best
+
+    def allocate(self, prefixlen: int) -> IPNetwork:
+        """
+        Allocate the lowest-addressed free /prefixlen.
+
+        Raises:
+            AddressSpaceFull: If no free range of that size is left.
+            ValueError: If the prefix length does not fit in this range.
+        """
+        found = self._find(prefixlen)
+        if found is None:
+            raise AddressSpaceFull(f"No free /{prefixlen} in {self.network}")
+        start, length = found
+        self._remove_free(start, length)
+        self._split(start, length, start, prefixlen)
+        self._free_addresses -= self._size(prefixlen)
+        return self._network(start, prefixlen)
+
+    def reserve(self, network: IPNetwork, strict: bool = True) -> bool:
+        """
+        Mark ``network`` as used.
+
+        With ``strict``, nothing changes and False is returned when any part of
+        it is already used. Otherwise whatever part is still free is taken and
+        the parts already used get one more holder (False is returned too),
+        which is how overlapping records already in storage are loaded.
+
+        Raises:
+            ValueError: If ``network`` is not inside this range.
+        """
+        if network.version != self.network.version or not network.subnet_of(self.network):
+            raise ValueError(f"{network} is not inside {self.network}")
+        start, prefixlen = int(network.network_address), network.prefixlen
+        for length in range(prefixlen, self._base_len - 1, -1):
+            container = start & ~(self._size(length) - 1)
+            if self._remove_free(container, length):
+                self._split(container, length, start, prefixlen)
+                self._free_addresses -= self._size(prefixlen)
+                return True
+        if strict:
+            return False
+        self._reserve_used(start, prefixlen)
+        return False
+
+    def _reserve_used(self, start: int, length: int):
+        """Take the free parts of ``start/length``, none of whose containing ranges is free, and share the rest."""
+        if self._remove_free(start, length):
+            self._free_addresses -= self._size(length)
+        elif length == self.width or not self._has_free_inside(start, length):
+            self._share(start, length, 1)
+        else:
+            self._reserve_used(start, length + 1)
+            self._reserve_used(start + self._size(length + 1), length + 1)
+
+    def _has_free_inside(self, start: int, length: int) -> bool:
+        end = start + self._size(length)
+        for inner in range(length + 1, self.width + 1):
+            free = self._free[inner]
+            i = bisect.bisect_left(free, start)
+            if i < len(free) and free[i] < end:
+                return True
+        return False
+
+    def _has_shared_inside(self, start: int, length: int) -> bool:
+        end = start + self._size(length)
+        return any(length < inner and start <= other < end for other, inner in self._shared)
+
+    def _split_shared(self, start: int, length: int):
+        """If a larger shared range covers ``start/length``, split it so that this range has its own count."""
+        for outer in range(length - 1, self._base_len - 1, -1):
+            container = start & ~(self._size(outer) - 1)
+            count = self._shared.pop((container, outer), None)
+            if count is None:
+                continue
+            # Same walk as _split: the halves not holding the range keep the count
+            while outer < length:
+                outer += 1
+                half = self._size(outer)
+                if start >= container + half:
+                    self._shared[(container, outer)] = count
+                    container += half
+                else:
+                    self._shared[(container + half, outer)] = count
+            self._shared[(start, length)] = count
+            return
+
+    def _share(self, start: int, length: int, delta: int):
+        """Add ``delta`` holders to the used range ``start/length``."""
+        self._split_shared(start, length)
+        count = self._shared.get((start, length))
+        if count is None and self._has_shared_inside(start, length):
+            half = self._size(length + 1)
+            self._share(start, length + 1, delta)
+            self._share(start + half, length + 1, delta)
+            return
+        count = (count or 0) + delta
+        if count:
+            self._shared[(start, length)] = count
+        else:
+            del self._shared[(start, length)]
+
+    def release(self, network: IPNetwork):
+        """
+        Return a previously allocated or reserved ``network`` to the free space, except where it is shared.
+
+        Raises:
+            ValueError: If ``network`` is not inside this range.
+        """
+        if network.version != self.network.version or not network.subnet_of(self.network):
+            raise ValueError(f"{network} is not inside {self.network}")
+        start, length = int(network.network_address), network.prefixlen
+        if self._shared:
+            self._release_shared(start, length)
+        else:
+            self._release(start, length)
+
+    def _release_shared(self, start: int, length: int):
+        self._split_shared(start, length)
+        if (start, length) in self._shared:
+            # Another holder keeps it used
+            self._share(start, length, -1)
+        elif self._has_shared_inside(start, length):
+            half = self._size(length + 1)
+            self._release_shared(start, length + 1)
+            self._release_shared(start + half, length + 1)
+        else:
+            self._release(start, length)
+
+    def _release(self, start: int, length: int):
+        self._free_addresses += self._size(length)
+        # Merge with the buddy for as long as it is free too
+        while length > self._base_len:
+            buddy = start ^ self._size(length)
+            if not self._remove_free(buddy, length):
+                break
+            start = min(start, buddy)
+            length -= 1
+        self._add_free(start, length)
+
+
+def _single(address) -> IPNetwork:
+    return ipaddress.ip_network((address, address.max_prefixlen))
+
+
+def host_allocator(network: IPNetwork) -> PrefixAllocator:
+    """
+    Allocator for host addresses in ``network``, with the addresses that
+    ``ipaddress.hosts()`` excludes (network/broadcast, IPv6 subnet-router
+    anycast) reserved up front.
+    """
+    allocator = PrefixAllocator(network)
+    if network.num_addresses > 2 or (network.version == 6 and network.num_addresses > 1):
+        allocator.reserve(_single(network.network_address))
+        if network.version == 4:
+            allocator.reserve(_single(network.broadcast_address))
+    return allocator
+
+
+class AllocationIndex:
+    """
+    Free-space allocators for every block (subnets) and network (host
+    addresses), keyed by block_id / network_id.
+
+    Each method runs without awaiting, so on the event loop a pick-and-mark
+    is atomic: two concurrent requests can never be handed the same range.
+    Callers reserve or allocate first, write to storage, and release again
+    if the write fails. Storage checks the range once more, since other
+    workers allocate from their own copies; when it was taken, the block's or
+    network's allocator is rebuilt from the stored records with ``reload_*``.
+    """
+
+    def __init__(self):
+        self.blocks: Dict[int, PrefixAllocator] = {}
+        self.networks: Dict[int, PrefixAllocator] = {}
+
+    def clear(self):
+        self.blocks.clear()
+        self.networks.clear()
+
+    def add_block(self, block: dict):
+        self.blocks[block["block_id"]] = PrefixAllocator(ipaddress.ip_network(block["cidr"]))
+
+    def remove_block(self, block: dict):
+        self.blocks.pop(block["block_id"], None)
+
+    def add_network(self, network: dict):
+        """Start tracking host addresses in ``network`` (its range must already be reserved)."""
+        self.networks[network["network_id"]] = host_allocator(ipaddress.ip_network(network["cidr"]))
+
+    def remove_network(self, network: dict, release: bool = True):
+        self.networks.pop(network["network_id"], None)
+        if release:
+            self.release_subnet(network["block_id"], network["cidr"])
+
+    def reload_block(self, block_id: int, networks: List[dict]):
+        """Replace a block's free space with what its stored ``networks`` leave."""
+        block = self.blocks.get(block_id)
+        if block is None:
+            return
+        block = self.blocks[block_id] = PrefixAllocator(block.network)
+        for network in networks:
+            try:
+                block.reserve(ipaddress.ip_network(network["cidr"]), strict=False)
+            except ValueError:
+                pass
+
+    def reload_network(self, network_id: int, hosts: List[dict]):
+        """Replace a network's free addresses with what its stored ``hosts`` leave."""
+        allocator = self.networks.get(network_id)
+        if allocator is None:
+            return
+        allocator = self.networks[network_id] = host_allocator(allocator.network)
+        for host in hosts:
+            if host["ip_address"]:
+                try:
+                    allocator.reserve(_single(ipaddress.ip_address(host["ip_address"])), strict=False)
+                except ValueError:
+                    pass
+
+    def reserve_subnet(self, block_id: int, cidr: str, strict: bool = True) -> bool:
+        """Mark ``cidr`` used in its block; False if ``strict`` and it overlaps another network."""
+        block = self.blocks.get(block_id)
+        if block is None:
+            return True
+        return block.reserve(ipaddress.ip_network(cidr), strict) or not strict
+
+    def release_subnet(self, block_id: int, cidr: str):
+        block = self.blocks.get(block_id)
+        if block is not None:
+            try:
+                block.release(ipaddress.ip_network(cidr))
+            except ValueError:
+                # Stored outside its block, so it was never reserved
+                pass
+
+    def reserve_host(self, network_id: int, ip_address: str, strict: bool = True) -> bool:
+        """Mark ``ip_address`` used in its network; False if ``strict`` and it is taken or reserved."""
+        allocator = self.networks.get(network_id)
+        if allocator is None:
+            return True
+        return allocator.reserve(_single(ipaddress.ip_address(ip_address)), strict) or not strict
+
+    def release_host(self, network_id: int, ip_address: str):
+        allocator = self.networks.get(network_id)
+        if allocator is not None:
+            try:
+                allocator.release(_single(ipaddress.ip_address(ip_address)))
+            except ValueError:
+                pass
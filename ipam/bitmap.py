@@ -0,0 +1,221 @@
+import bisect
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+# Containers with more values than this are stored as bitmasks. Roaring uses 4096 (where
+# a 2-byte array outgrows the 8 KiB mask); lower is faster here because mask operations
+# run in C while array containers are walked value by value in Python.
+ARRAY_MAX = 1024
+_CONTAINER_BITS = 1 << 16
+_CONTAINER_BYTES = _CONTAINER_BITS // 8
+
+# Set-bit offsets of every byte value, for decoding bitmask containers
+_BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+Container = Union[array, int]
+
+
+def _array(values: Iterable[int]) -> array:
+    return array("H", values)
+
+
+def _to_mask(values: Iterable[int]) -> int:
+    buffer = bytearray(_CONTAINER_BYTES)
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _to_list(mask: int, start: int = 0) -> List[int]:
+    """Sorted set bits of ``mask`` that are >= ``start``."""
+    mask >>= start
+    values = []
+    for i, byte in enumerate(mask.to_bytes(_CONTAINER_BYTES, "little")):
+        if byte:
+            base = start + (i << 3)
+            values.extend(base + bit for bit in _BYTE_BITS[byte])
+    return values
+
+
+def _select(values: array, mask: int, keep: bool) -> List[int]:
+    """Values whose bit in ``mask`` is set (``keep``) or clear; tests go through bytes, not big-int shifts."""
+    bits = mask.to_bytes(_CONTAINER_BYTES, "little")
+    return [value for value in values if bool(bits[value >> 3] >> (value & 7) & 1) is keep]
+
+
+def _count(container: Container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+def _normalize(container: Union[Container, List[int]]) -> Optional[Container]:
+    """
+    Store a value list as an array, or a mask once it is large; None when empty.
+    Masks are kept as they are: set-operation results are short-lived and
+    decoding them to arrays would cost more than the operations themselves.
+    """
+    if not container:
+        return None
+    if isinstance(container, int):
+        return container
+    if len(container) > ARRAY_MAX:
+        return _to_mask(container)
+    return container if isinstance(container, array) else _array(container)
+
+
+class RoaringBitmap:
+    """
+    Compressed set of non-negative integers in the style of Roaring bitmaps.
+
+    Values are split by their high 16 bits into containers. Sparse containers
+    are sorted ``array("H")`` of the low 16 bits; dense ones (more than ARRAY_MAX
+    values) are Python ints used as 65536-bit masks, so AND / OR / AND NOT of
+    dense containers run as word-at-a-time operations in C. Set operations
+    only visit containers present in both operands.
+    """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._containers: Dict[int, Container] = {}
+        self.update(values)
+
+    @classmethod
+    def _from(cls, containers: Dict[int, Container]) -> "RoaringBitmap":
+        bitmap = cls()
+        bitmap._containers = containers
+        return bitmap
+
+    def add(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = _array((low,))
+        elif isinstance(container, int):
+            self._containers[high] = container | (1 << low)
+        else:
+            i = bisect.bisect_left(container, low)
+            if i == len(container) or container[i] != low:
+                container.insert(i, low)
+                if len(container) > ARRAY_MAX:
+                    self._containers[high] = _to_mask(container)
+
+    def update(self, values: Iterable[int]):
+        """Add many values at once, rebuilding each touched container only once."""
+        groups: Dict[int, List[int]] = {}
+        for value in values:
+            groups.setdefault(value >> 16, []).append(value & 0xFFFF)
+        for high, lows in groups.items():
+            container = self._containers.get(high)
+            if isinstance(container, int):
+                self._containers[high] = container | _to_mask(lows)
+            else:
+                self._containers[high] = _normalize(sorted(set(lows).union(container or ())))
+
+    def discard(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container &= ~(1 << low)
+            # Convert back well below the threshold so add/discard cannot thrash
+            if container.bit_count() <= ARRAY_MAX // 2:
+                container = _array(_to_list(container))
+        else:
+            i = bisect.bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                del container[i]
+        if container:
+            self._containers[high] = container
+        else:
+            del self._containers[high]
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        i = bisect.bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def __len__(self) -> int:
+        return sum(_count(container) for container in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[int]:
+        """Yield values >= ``start`` in ascending order, decoding one container at a time."""
+        start_high = start >> 16
+        for high in sorted(h for h in self._containers if h >= start_high):
+            container = self._containers[high]
+            low = start & 0xFFFF if high == start_high else 0
+            if isinstance(container, int):
+                lows = _to_list(container, low)
+            else:
+                lows = container[bisect.bisect_left(container, low):]
+            base = high << 16
+            for value in lows:
+                yield base + value
+
+    def copy(self) -> "RoaringBitmap":
+        return self._from({high: c if isinstance(c, int) else c[:] for high, c in self._containers.items()})
+
+    # ==================================================
+    # SET OPERATIONS
+    # ==================================================
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        result = {}
+        small, large = sorted((self._containers, other._containers), key=len)
+        for high, a in small.items():
+            b = large.get(high)
+            if b is None:
+                continue
+            if isinstance(a, int) and isinstance(b, int):
+                c = a & b
+            elif isinstance(a, int) or isinstance(b, int):
+                values, mask = (b, a) if isinstance(a, int) else (a, b)
+                c = _select(values, mask, True)
+            else:
+                c = sorted(set(a).intersection(b))
+            c = _normalize(c)
+            if c is not None:
+                result[high] = c
+        return self._from(result)
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        result = {high: c if isinstance(c, int) else c[:] for high, c in self._containers.items()}
+        for high, b in other._containers.items():
+            a = result.get(high)
+            if a is None:
+                result[high] = b if isinstance(b, int) else b[:]
+            elif isinstance(a, int) or isinstance(b, int):
+                a = a if isinstance(a, int) else _to_mask(a)
+                result[high] = a | (b if isinstance(b, int) else _to_mask(b))
+            else:
+                result[high] = _normalize(sorted(set(a).union(b)))
+        return self._from(result)
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        result = {}
+        for high, a in self._containers.items():
+            b = other._containers.get(high)
+            if b is None:
+                result[high] = a if isinstance(a, int) else a[:]
+                continue
+            if isinstance(a, int):
+                c = a & ~(b if isinstance(b, int) else _to_mask(b))
+            elif isinstance(b, int):
+                c = _select(a, b, False)
+            else:
+                c = sorted(set(a).difference(b))
+            c = _normalize(c)
+            if c is not None:
+                result[high] = c
+        return self._from(result)
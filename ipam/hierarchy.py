@@ -0,0 +1,317 @@
+import bisect
+import heapq
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Label spacing used by a full relabel
+GAP = 1 << 20
+# Smallest spacing a partial relabel may leave between consecutive labels
+MIN_STEP = 1 << 6
+# Label width given to each newly appended node, so appends use space linearly
+NODE_SPAN = 4 * MIN_STEP
+
+
+class HierarchyIndex:
+    """
+    Index over the IPAM object tree (datacenter -> sec_zone -> network -> host).
+
+    Every node gets a nested-set interval ``(left, right)`` from a preorder
+    walk: a node's descendants are exactly the nodes whose ``left`` lies inside
+    its interval. Sorted lists of ``left`` labels - overall, per object_type and
+    per depth - turn subtree, count and depth-limited queries into a couple of
+    binary searches plus the output, i.e. O(log n + k).
+
+    Labels are spaced apart so nodes can be added or moved in place; when an
+    interval runs out of room, the smallest enclosing subtree that has room is
+    relabelled (amortised), falling back to a full relabel.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, dict] = {}
+        self._children: Dict[Optional[str], List[str]] = {None: []}
+        self._left: Dict[str, int] = {}
+        self._right: Dict[str, int] = {}
+        self._depth: Dict[str, int] = {}
+        self._by_left: Dict[int, str] = {}
+        self._lefts: List[int] = []
+        self._type_lefts: Dict[str, List[int]] = {}
+        self._depth_lefts: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._records
+
+    # ==================================================
+    # BUILD AND UPDATE
+    # ==================================================
+
+    def load(self, records: Iterable[dict]):
+        """
+        Replace the index contents with ``records`` in one O(n) pass.
+
+        Records whose parent is not present are treated as roots. Each record's
+        ``immediate_children`` is rebuilt from the ``parent_id`` links.
+        """
+        self.__init__()
+        for record in records:
+            if record["object_id"] in self._records:
+                raise ValueError(f"Duplicate object_id: {record['object_id']}")
+            record["immediate_children"] = []
+            self._records[record["object_id"]] = record
+        for object_id, record in self._records.items():
+            parent_id = record.get("parent_id")
+            if parent_id not in self._records:
+                parent_id = None
+            self._children_of(parent_id).append(object_id)
+        self._relabel(None)
+
+    def add(self, record: dict) -> dict:
+        """
+        Insert a new leaf node under ``record["parent_id"]`` (None for a root).
+
+        Raises:
+            KeyError: If the parent does not exist.
+            ValueError: If the object_id is already present.
+        """
+        object_id, parent_id = record["object_id"], record.get("parent_id")
+        if object_id in self._records:
+            raise ValueError(f"Duplicate object_id: {object_id}")
+        if parent_id is not None and parent_id not in self._records:
+            raise KeyError(parent_id)
+        record["immediate_children"] = []
+        self._records[object_id] = record
+        lo, hi = self._make_room(parent_id, 1)
+        self._children_of(parent_id).append(object_id)
+        self._insert_subtree(object_id, lo, hi, self._depth_of(parent_id) + 1)
+        return record
+
+    def move(self, object_id: str, new_parent_id: Optional[str]) -> dict:
+        """
+        Re-parent ``object_id`` (and its whole subtree) under ``new_parent_id``.
+
+        Raises:
+            KeyError: If either node does not exist.
+            ValueError: If the new parent is the node itself or one of its descendants.
+        """
+        record = self._records[object_id]
+        if new_parent_id is not None:
+            if new_parent_id not in self._records:
+                raise KeyError(new_parent_id)
+            if self._left[object_id] <= self._left[new_parent_id] < self._right[object_id]:
+                raise ValueError("Cannot move a node under itself or one of its descendants")
+
+        count = self.subtree_size(object_id) + 1
+        self._remove_range(self._left[object_id], self._right[object_id] + 1)
+        old_parent_id = record.get("parent_id")
+        if old_parent_id not in self._records:
+            old_parent_id = None
+        self._children_of(old_parent_id).remove(object_id)
+
+        record["parent_id"] = new_parent_id
+        lo, hi = self._make_room(new_parent_id, count)
+        self._children_of(new_parent_id).append(object_id)
+        self._insert_subtree(object_id, lo, hi, self._depth_of(new_parent_id) + 1)
+        return record
+
+    # ==================================================
+    # QUERIES
+    # ==================================================
+
+    def get(self, object_id: str) -> Optional[dict]:
+        return self._records.get(object_id)
+
+    def depth(self, object_id: str) -> int:
+        """Depth of a node; roots are at depth 0."""
+        return self._depth[object_id]
+
+    def roots(self) -> List[dict]:
+        return [self._records[object_id] for object_id in self._children[None]]
+
+    def subtree_size(self, object_id: str) -> int:
+        """Number of descendants of ``object_id`` (excluding itself)."""
+        i, j = self._range(self._lefts, object_id)
+        return j - i
+
+    def subtree(self, object_id: str, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """
+        Return ``object_id`` and its descendants in preorder, sliced by offset/limit.
+
+        Raises:
+            KeyError: If the node does not exist.
+        """
+        left = self._left[object_id]
+        i = bisect.bisect_left(self._lefts, left) + offset
+        j = bisect.bisect_right(self._lefts, self._right[object_id])
+        if limit is not None:
+            j = min(j, i + limit)
+        return [self._records[self._by_left[label]] for label in self._lefts[i:j]]
+
+    def ancestors(self, object_id: str) -> List[dict]:
+        """Return the path from the root down to (excluding) ``object_id``."""
+        path = []
+        parent_id = self._records[object_id].get("parent_id")
+        while parent_id in self._records:
+            path.append(self._records[parent_id])
+            parent_id = self._records[parent_id].get("parent_id")
+        path.reverse()
+        return path
+
+    def descendant_counts(self, object_id: str) -> Dict[str, int]:
+        """Count descendants of ``object_id`` by object_type."""
+        counts = {}
+        for object_type, lefts in self._type_lefts.items():
+            i, j = self._range(lefts, object_id)
+            if j > i:
+                counts[object_type] = j - i
+        return counts
+
+    def walk(self, object_id: str, max_depth: int) -> Iterator[Tuple[int, dict]]:
+        """
+        Yield ``(relative_depth, record)`` for descendants at most ``max_depth``
+        levels below ``object_id``, in preorder.
+        """
+        base = self._depth[object_id]
+        slices = []
+        for depth in range(base + 1, base + max_depth + 1):
+            lefts = self._depth_lefts.get(depth)
+            if not lefts:
+                break
+            i, j = self._range(lefts, object_id)
+            slices.append(lefts[i:j])
+        for label in heapq.merge(*slices):
+            node_id = self._by_left[label]
+            yield self._depth[node_id] - base, self._records[node_id]
+
+    # ==================================================
+    # LABELLING INTERNALS
+    # ==================================================
+
+    def _children_of(self, object_id: Optional[str]) -> List[str]:
+        if object_id is None:
+            return self._children[None]
+        return self._records[object_id]["immediate_children"]
+
+    def _depth_of(self, object_id: Optional[str]) -> int:
+        return -1 if object_id is None else self._depth[object_id]
+
+    def _range(self, lefts: List[int], object_id: str) -> Tuple[int, int]:
+        """Index range in ``lefts`` holding the strict descendants of ``object_id``."""
+        return (bisect.bisect_right(lefts, self._left[object_id]),
+                bisect.bisect_left(lefts, self._right[object_id]))
+
+    def _free_gap(self, parent_id: Optional[str]) -> Tuple[int, Optional[int]]:
+        """Open label interval after the parent's last child (hi is None if unbounded)."""
+        children = self._children_of(parent_id)
+        if children:
+            lo = self._right[children[-1]]
+        else:
+            lo = 0 if parent_id is None else self._left[parent_id]
+        return lo, None if parent_id is None else self._right[parent_id]
+
+    def _make_room(self, parent_id: Optional[str], count: int) -> Tuple[int, int]:
+        """Return an open interval after ``parent_id``'s last child for ``count`` new nodes."""
+        lo, hi = self._free_gap(parent_id)
+        span = (2 * count + 1) * NODE_SPAN
+        if hi is None:
+            return lo, lo + (2 * count + 1) * GAP
+        if hi - lo > 4 * count * MIN_STEP:
+            return lo, lo + min(hi - lo, span)
+        # Relabel the lowest ancestor with room for its subtree plus a reserve at the end of
+        # the parent that grows with the parent, so repeated appends relabel rarely
+        reserve = count + self.subtree_size(parent_id) + 1
+        node_id = parent_id
+        while node_id is not None:
+            needed = 4 * (self.subtree_size(node_id) + reserve + 1) * MIN_STEP
+            if self._right[node_id] - self._left[node_id] > needed:
+                break
+            node_id = self._records[node_id].get("parent_id")
+            if node_id not in self._records:
+                node_id = None
+        self._relabel(node_id, parent_id, reserve)
+        lo, hi = self._free_gap(parent_id)
+        return lo, lo + min(hi - lo, span)
+
+    def _relabel(self, object_id: Optional[str], pad_id: Optional[str] = None, reserve: int = 0):
+        """
+        Respread labels evenly below ``object_id`` (None: the whole forest),
+        leaving room for ``reserve`` more nodes after ``pad_id``'s last child.
+        """
+        if object_id is None:
+            self._left.clear(), self._right.clear(), self._depth.clear(), self._by_left.clear()
+            self._lefts, self._type_lefts, self._depth_lefts = [], {}, {}
+            label = 0
+            for root_id in self._children[None]:
+                label = self._insert_subtree(root_id, label, None, 0, GAP, pad_id, 2 * reserve * GAP)
+            return
+        lo, hi = self._left[object_id], self._right[object_id]
+        size = self.subtree_size(object_id)
+        self._remove_range(lo + 1, hi)
+        # When object_id is the padded node itself, the leftover space is already at its end
+        step = (hi - lo) // (2 * (size + reserve) + 2)
+        label = lo
+        for child_id in self._children_of(object_id):
+            label = self._insert_subtree(child_id, label, None, self._depth[object_id] + 1,
+                                         step, pad_id, 2 * reserve * step)
+
+    def _insert_subtree(self, object_id: str, lo: int, hi: Optional[int], depth: int,
+                        step: Optional[int] = None, pad_id: Optional[str] = None, pad: int = 0) -> int:
+        """
+        Assign labels to ``object_id``'s subtree inside the open interval ``(lo, hi)``
+        and add them to the sorted lists, leaving ``pad`` spare labels before
+        ``pad_id``'s right label. Returns the last label used.
+        """
+        if step is None:
+            size = sum(1 for _ in self._iter_preorder(object_id))
+            step = (hi - lo) // (2 * size + 1)
+        entries = []
+        label = lo
+        # Iterative preorder; the stack holds (node, depth, closing)
+        stack = [(object_id, depth, False)]
+        while stack:
+            node_id, node_depth, closing = stack.pop()
+            label += step
+            if closing:
+                if node_id == pad_id:
+                    label += pad
+                self._right[node_id] = label
+                continue
+            self._left[node_id] = label
+            self._depth[node_id] = node_depth
+            self._by_left[label] = node_id
+            entries.append((label, node_id))
+            stack.append((node_id, node_depth, True))
+            for child_id in reversed(self._records[node_id]["immediate_children"]):
+                stack.append((child_id, node_depth + 1, False))
+
+        # New labels are contiguous in global order, so each list takes one slice insert
+        labels = [label for label, _ in entries]
+        i = bisect.bisect_left(self._lefts, labels[0])
+        self._lefts[i:i] = labels
+        by_type, by_depth = {}, {}
+        for label_, node_id in entries:
+            by_type.setdefault(self._records[node_id]["object_type"], []).append(label_)
+            by_depth.setdefault(self._depth[node_id], []).append(label_)
+        for groups, index in ((by_type, self._type_lefts), (by_depth, self._depth_lefts)):
+            for key, group in groups.items():
+                lefts = index.setdefault(key, [])
+                i = bisect.bisect_left(lefts, group[0])
+                lefts[i:i] = group
+        return label
+
+    def _iter_preorder(self, object_id: str) -> Iterator[str]:
+        stack = [object_id]
+        while stack:
+            node_id = stack.pop()
+            yield node_id
+            stack.extend(reversed(self._records[node_id]["immediate_children"]))
+
+    def _remove_range(self, lo: int, hi: int):
+        """Drop every label in ``[lo, hi)`` from the sorted lists."""
+        i, j = bisect.bisect_left(self._lefts, lo), bisect.bisect_left(self._lefts, hi)
+        for label in self._lefts[i:j]:
+            del self._by_left[label]
+        del self._lefts[i:j]
+        for index in (self._type_lefts, self._depth_lefts):
+            for lefts in index.values():
+                del lefts[bisect.bisect_left(lefts, lo):bisect.bisect_left(lefts, hi)]
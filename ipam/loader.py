@@ -0,0 +1,368 @@
+"""
+Stream HierarchicalDataGenerator output into the SQLite IPAM tables.
+
+Records are mapped onto the schema by object_type:
+
+    datacenter -> locations (location_code = object_id)
+    sec_zone   -> blocks    (in the location of its datacenter, name = sec_zone)
+    network    -> networks  (under its sec_zone's block; networks hung directly off a
+                             datacenter go into a per-datacenter "<object_id>/default" block)
+    host       -> hosts     (under its network, keeping its ip_address)
+
+The generator has no prefixes, so block and network CIDRs are the record's
+ip_address widened to --block-prefix / --network-prefix. Records whose parent
+has not been loaded (or cannot own them) are counted as skipped, and so are
+networks whose CIDR their block already has (their hosts go into that
+network) and hosts whose address their network already has.
+
+Run from the repo root:
+    python -m ipam.loader generated_data.jsonl [--db fastapi_boilerplate.db] [--batch-size 20000]
+"""
+import argparse
+import collections
+import ipaddress
+import itertools
+import os
+import socket
+import sqlite3
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import db
+from ipam.records import iter_records
+from repository import SQLITE_MAX_PARAMS, address_key
+
+# Records mapped and inserted per transaction
+DEFAULT_BATCH_SIZE = 20000
+# object_id -> primary key entries kept for parent resolution; misses fall back to the database
+DEFAULT_CACHE_SIZE = 200000
+# Seconds between progress lines
+REPORT_INTERVAL = 5.0
+# SQLite page cache of the loader's connection; keeps the object_id indexes' hot pages in memory
+PAGE_CACHE_KIB = 65536
+
+# Target table, primary key and inserted columns per mapped table, in foreign-key order
+LOAD_TABLES = {
+    "locations": ("location_id", ("location_code", "location_name")),
+    "blocks": ("block_id", ("object_id", "config_path", "cidr", "name", "description", "location_id")),
+    "networks": ("network_id", (
+        "object_id", "config_path", "cidr", "vlan_id", "name", "description", "block_id", "range_key",
+    )),
+    "hosts": ("host_id", (
+        "object_id", "config_path", "name", "description", "status", "pending_change", "network_id", "ip_address",
+    )),
+}
+# Generator statuses that map onto a host status other than "active"
+HOST_STATUSES = {"Pending": "pending_change"}
+# Tables whose rows are skipped, not fatal, when they repeat an address (UX_hosts_network_ip)
+IGNORED_DUPLICATES = {"hosts"}
+
+
+class BulkLoader:
+    """
+    Single-pass, batched loader from generator records into SQLite.
+
+    Each batch runs in one ``BEGIN IMMEDIATE`` transaction: primary keys are
+    assigned from the current table maxima, so a child can reference a parent
+    from the same batch, and rows go in with one ``executemany`` per table.
+    The checkpoint row for the source file is written in the same transaction,
+    so after a crash the load resumes exactly after the last committed batch.
+
+    Parents are resolved through a bounded LRU of object_id -> primary key;
+    the parents a batch misses are fetched in bulk with ``IN (...)`` queries
+    before the batch is mapped. Memory is therefore bounded by the batch size
+    and the cache size, not by the size of the input.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, source: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache_size: int = DEFAULT_CACHE_SIZE, block_prefix: int = 16, network_prefix: int = 24):
+        self.conn = conn
+        self.source = source
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.block_prefix = block_prefix
+        self.network_prefix = network_prefix
+        # object_id -> (object_type, primary key); default blocks are keyed "<datacenter>/default"
+        self._parents: "collections.OrderedDict[str, Tuple[str, int]]" = collections.OrderedDict()
+        # (block_id, cidr) -> network_id of the networks the current batch may repeat
+        self._networks: Dict[Tuple[int, str], int] = {}
+        self.records_done = 0
+        self.rows_inserted = 0
+        self.records_skipped = 0
+
+    def checkpoint(self) -> int:
+        """Restore the counters of an earlier run over the same source; returns records to skip."""
+        row = self.conn.execute(
+            "SELECT records_done, rows_inserted, records_skipped FROM bulk_load_checkpoints WHERE source = ?",
+            (self.source,),
+        ).fetchone()
+        if row is not None:
+            self.records_done, self.rows_inserted, self.records_skipped = row
+        return self.records_done
+
+    def run(self, records: Iterator[dict], report: Optional[Callable[[str], None]] = print):
+        """Load ``records`` (already positioned after the checkpoint) batch by batch."""
+        start = last_report = time.perf_counter()
+        start_rows = self.rows_inserted
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                break
+            self._load_batch(batch)
+            now = time.perf_counter()
+            if report is not None and now - last_report >= REPORT_INTERVAL:
+                report(self._progress(now - start, start_rows))
+                last_report = now
+        if report is not None:
+            report(self._progress(time.perf_counter() - start, start_rows) + " (done)")
+
+    def _progress(self, elapsed: float, start_rows: int) -> str:
+        rate = (self.rows_inserted - start_rows) / elapsed if elapsed else 0.0
+        return (f"{self.records_done:,} records, {self.rows_inserted:,} rows inserted, "
+                f"{self.records_skipped:,} skipped, {rate:,.0f} rows/s")
+
+    # ==================================================
+    # BATCHES
+    # ==================================================
+
+    def _load_batch(self, batch: List[dict]):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_ids = {
+                table: conn.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}").fetchone()[0]
+                for table, (key, _) in LOAD_TABLES.items()
+            }
+            self._prefetch(batch)
+            rows: Dict[str, list] = {table: [] for table in LOAD_TABLES}
+            skipped = 0
+            for record in batch:
+                if not self._map(record, rows, next_ids):
+                    skipped += 1
+            inserted = 0
+            for table, (key, columns) in LOAD_TABLES.items():
+                if rows[table]:
+                    cursor = conn.executemany(
+                        f"INSERT {'OR IGNORE ' if table in IGNORED_DUPLICATES else ''}INTO {table} "
+                        f"({key}, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))})",
+                        rows[table],
+                    )
+                    inserted += cursor.rowcount
+                    skipped += len(rows[table]) - cursor.rowcount
+            conn.execute(
+                "INSERT INTO bulk_load_checkpoints (source, records_done, rows_inserted, records_skipped) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (source) DO UPDATE SET records_done = excluded.records_done, "
+                "rows_inserted = excluded.rows_inserted, records_skipped = excluded.records_skipped, "
+                "updated_at = CURRENT_TIMESTAMP",
+                (self.source, self.records_done + len(batch), self.rows_inserted + inserted,
+                 self.records_skipped + skipped),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # Keys assigned in the failed batch were never written
+            self._parents.clear()
+            raise
+        conn.execute("COMMIT")
+        self.records_done += len(batch)
+        self.rows_inserted += inserted
+        self.records_skipped += skipped
+        while len(self._parents) > self.cache_size:
+            self._parents.popitem(last=False)
+
+    def _prefetch(self, batch: List[dict]):
+        """Look up, in bulk, the parents this batch needs that are neither cached nor in the batch."""
+        in_batch = {record["object_id"] for record in batch}
+        missing = sorted({
+            record["parent_id"] for record in batch
+            if record.get("parent_id") and record["parent_id"] not in self._parents
+            and record["parent_id"] not in in_batch
+        })
+        # A network may sit directly under a cached datacenter whose default block was evicted
+        defaults = sorted({
+            f"{record['parent_id']}/default" for record in batch
+            if record.get("object_type") == "network" and record.get("parent_id")
+            and f"{record['parent_id']}/default" not in self._parents
+        })
+        for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+            chunk = missing[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            for code, location_id in self.conn.execute(
+                f"SELECT location_code, location_id FROM locations WHERE location_code IN ({placeholders})", chunk
+            ):
+                self._cache(code, "datacenter", location_id)
+            for object_id, network_id in self.conn.execute(
+                f"SELECT object_id, network_id FROM networks WHERE object_id IN ({placeholders})", chunk
+            ):
+                self._cache(object_id, "network", network_id)
+        blocks = missing + defaults
+        for start in range(0, len(blocks), SQLITE_MAX_PARAMS):
+            chunk = blocks[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            for object_id, block_id in self.conn.execute(
+                f"SELECT object_id, block_id FROM blocks WHERE object_id IN ({placeholders})", chunk
+            ):
+                self._cache(object_id, "sec_zone", block_id)
+        self._prefetch_networks(batch, in_batch)
+
+    def _prefetch_networks(self, batch: List[dict], in_batch: set):
+        """Look up the stored networks that networks of this batch would repeat in already stored blocks."""
+        self._networks = {}
+        pairs = set()
+        for record in batch:
+            if record.get("object_type") != "network" or record.get("parent_id") in in_batch:
+                continue
+            parent = self._parents.get(record.get("parent_id"))
+            if parent is not None and parent[0] == "datacenter":
+                parent = self._parents.get(f"{record['parent_id']}/default")
+            elif parent is not None and parent[0] != "sec_zone":
+                parent = None
+            found = self._cidr(record.get("ip_address"), self.network_prefix)
+            if parent is not None and found is not None:
+                pairs.add((parent[1], found[0]))
+        pairs = sorted(pairs)
+        for start in range(0, len(pairs), SQLITE_MAX_PARAMS // 2):
+            chunk = pairs[start:start + SQLITE_MAX_PARAMS // 2]
+            for block_id, cidr, network_id in self.conn.execute(
+                f"SELECT block_id, cidr, network_id FROM networks "
+                f"WHERE (block_id, cidr) IN (VALUES {', '.join(['(?, ?)'] * len(chunk))})",
+                [value for pair in chunk for value in pair],
+            ):
+                self._networks[(block_id, cidr)] = network_id
+
+    def _cache(self, object_id: str, object_type: str, key: int):
+        self._parents[object_id] = (object_type, key)
+        self._parents.move_to_end(object_id)
+
+    def _parent(self, record: dict) -> Tuple[Optional[str], Optional[int]]:
+        found = self._parents.get(record.get("parent_id"))
+        if found is None:
+            return None, None
+        self._parents.move_to_end(record["parent_id"])
+        return found
+
+    # ==================================================
+    # RECORD MAPPING
+    # ==================================================
+
+    def _cidr(self, ip: Optional[str], prefix: int) -> Optional[Tuple[str, str]]:
+        """The /prefix around ``ip`` and its range_key, or None if ``ip`` is not an address."""
+        try:
+            # Dotted-quad fast path; ipaddress costs ~10 us per call
+            packed = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+        except (OSError, TypeError):
+            try:
+                address = ipaddress.ip_address(ip)
+            except ValueError:
+                return None
+            network = ipaddress.ip_network((address, min(prefix, address.max_prefixlen)), strict=False)
+            return str(network), address_key(network.version, int(network.network_address))
+        prefix = min(prefix, 32)
+        network = packed & (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+        return f"{socket.inet_ntoa(network.to_bytes(4, 'big'))}/{prefix}", address_key(4, network)
+
+    def _new_id(self, table: str, next_ids: Dict[str, int]) -> int:
+        next_ids[table] += 1
+        return next_ids[table]
+
+    def _map(self, record: dict, rows: Dict[str, list], next_ids: Dict[str, int]) -> bool:
+        """Append the row(s) for ``record``; False if it cannot be placed."""
+        object_type, object_id = record.get("object_type"), record.get("object_id")
+        config_path = record.get("config_id") or ""
+        parent_type, parent_key = self._parent(record)
+
+        if object_type == "datacenter":
+            location_id = self._new_id("locations", next_ids)
+            rows["locations"].append((location_id, object_id, None))
+            self._cache(object_id, "datacenter", location_id)
+            return True
+
+        if object_type == "sec_zone":
+            found = self._cidr(record.get("ip_address"), self.block_prefix)
+            if parent_type != "datacenter" or found is None:
+                return False
+            block_id = self._new_id("blocks", next_ids)
+            rows["blocks"].append((block_id, object_id, config_path, found[0], record.get("sec_zone"), None, parent_key))
+            self._cache(object_id, "sec_zone", block_id)
+            return True
+
+        if object_type == "network":
+            found = self._cidr(record.get("ip_address"), self.network_prefix)
+            if found is None:
+                return False
+            if parent_type == "datacenter":
+                parent_key = self._default_block(record, parent_key, rows, next_ids)
+            elif parent_type != "sec_zone":
+                return False
+            cidr, range_key = found
+            network_id = self._networks.get((parent_key, cidr))
+            if network_id is not None:
+                # A block holds each CIDR once: the record's hosts go into the network already there
+                self._cache(object_id, "network", network_id)
+                return False
+            network_id = self._new_id("networks", next_ids)
+            self._networks[(parent_key, cidr)] = network_id
+            rows["networks"].append((network_id, object_id, config_path, cidr, None, None, None, parent_key, range_key))
+            self._cache(object_id, "network", network_id)
+            return True
+
+        if object_type == "host":
+            if parent_type != "network":
+                return False
+            host_id = self._new_id("hosts", next_ids)
+            rows["hosts"].append((
+                host_id, object_id, config_path, None, None,
+                HOST_STATUSES.get(record.get("status"), "active"), None, parent_key, record.get("ip_address"),
+            ))
+            return True
+
+        return False
+
+    def _default_block(self, record: dict, location_id: int, rows: Dict[str, list], next_ids: Dict[str, int]) -> int:
+        """Block that holds the networks attached directly to a datacenter, created on first use."""
+        default_id = f"{record['parent_id']}/default"
+        found = self._parents.get(default_id)
+        if found is not None:
+            # Keep it as recently used as its datacenter, or it could be evicted first
+            self._parents.move_to_end(default_id)
+            return found[1]
+        block_id = self._new_id("blocks", next_ids)
+        cidr = self._cidr(record.get("ip_address"), self.block_prefix)[0]
+        rows["blocks"].append((block_id, default_id, record.get("config_id") or "", cidr, "default", None, location_id))
+        self._cache(default_id, "sec_zone", block_id)
+        return block_id
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open ``path`` with the same pragmas as the API's pool, and create the schema."""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute(f"PRAGMA cache_size=-{PAGE_CACHE_KIB}")
+    conn.row_factory = sqlite3.Row
+    db.create_schema(conn)
+    conn.row_factory = None
+    return conn
+
+
+def main(args):
+    conn = connect(args.db)
+    loader = BulkLoader(conn, os.path.abspath(args.input), args.batch_size, args.cache_size,
+                        args.block_prefix, args.network_prefix)
+    done = loader.checkpoint()
+    if done:
+        print(f"Resuming {args.input} after {done:,} records")
+    loader.run(iter_records(args.input, skip=done))
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSON array or JSON-lines file from utils/fake_data_generator.py")
+    parser.add_argument("--db", default=db.SQLITE_PATH)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--block-prefix", type=int, default=16)
+    parser.add_argument("--network-prefix", type=int, default=24)
+    main(parser.parse_args())
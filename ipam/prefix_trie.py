@@ -0,0 +1,224 @@
+import ipaddress
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_NO_NODE = -1
+
+
+class PrefixTrie:
+    """
+    Path-compressed binary (Patricia) trie mapping prefixes of one address
+    family to values, for longest-prefix-match lookups.
+
+    Nodes live in parallel lists indexed by node number rather than as
+    objects, which keeps a million-prefix trie compact. Each node holds a
+    left-aligned key, its prefix length, two child links and an optional
+    value; a lookup follows at most one node per bit, so it is
+    O(prefix length) regardless of the number of prefixes.
+    """
+
+    def __init__(self, width: int):
+        """
+        Args:
+            width: Address width in bits (32 for IPv4, 128 for IPv6).
+        """
+        self.width = width
+        # Node 0 is the root: the zero-length prefix
+        self._key = [0]
+        self._len = [0]
+        self._child = [[_NO_NODE], [_NO_NODE]]
+        self._value: List[Any] = [None]
+        self._has_value = [False]
+        self._free: List[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _new_node(self, key: int, length: int) -> int:
+        if self._free:
+            node = self._free.pop()
+            self._key[node], self._len[node] = key, length
+            self._child[0][node] = self._child[1][node] = _NO_NODE
+            return node
+        self._key.append(key)
+        self._len.append(length)
+        self._child[0].append(_NO_NODE)
+        self._child[1].append(_NO_NODE)
+        self._value.append(None)
+        self._has_value.append(False)
+        return len(self._key) - 1
+
+    def _bit(self, key: int, position: int) -> int:
+        """Bit ``position`` of ``key``, counting from the most significant bit."""
+        return (key >> (self.width - 1 - position)) & 1
+
+    def _common_length(self, a: int, b: int, limit: int) -> int:
+        """Length of the common leading bits of ``a`` and ``b``, at most ``limit``."""
+        diff = (a ^ b) >> (self.width - limit) if limit else 0
+        return limit - diff.bit_length()
+
+    def insert(self, key: int, length: int, value: Any):
+        """Map the prefix ``key/length`` (host bits zero) to ``value``, replacing any previous value."""
+        width, keys, lens, has_value = self.width, self._key, self._len, self._has_value
+        node = 0
+        while True:
+            node_len = lens[node]
+            if node_len == length:
+                if not has_value[node]:
+                    self._size += 1
+                self._value[node], has_value[node] = value, True
+                return
+            links = self._child[(key >> (width - 1 - node_len)) & 1]
+            child = links[node]
+            if child == _NO_NODE:
+                leaf = self._new_node(key, length)
+                self._value[leaf], has_value[leaf] = value, True
+                links[node] = leaf
+                self._size += 1
+                return
+            child_len = lens[child]
+            # Both lengths exceed node_len >= 0, so limit >= 1
+            limit = child_len if child_len < length else length
+            common = limit - ((keys[child] ^ key) >> (width - limit)).bit_length()
+            if common == child_len:
+                node = child
+                continue
+            # The new prefix diverges inside the child's compressed edge: split it
+            split_key = key & ~((1 << (width - common)) - 1) if common else 0
+            split = self._new_node(split_key, common)
+            links[node] = split
+            self._child[self._bit(keys[child], common)][split] = child
+            if common == length:
+                self._value[split], has_value[split] = value, True
+            else:
+                leaf = self._new_node(key, length)
+                self._value[leaf], has_value[leaf] = value, True
+                self._child[self._bit(key, common)][split] = leaf
+            self._size += 1
+            return
+
+    def _find(self, key: int, length: int) -> Tuple[int, List[int]]:
+        """Return the node for exactly ``key/length`` (or _NO_NODE) and the path of ancestors."""
+        node, path = 0, []
+        while node != _NO_NODE:
+            node_len = self._len[node]
+            if node_len > length or self._common_length(self._key[node], key, node_len) != node_len:
+                break
+            if node_len == length:
+                return node, path
+            path.append(node)
+            node = self._child[self._bit(key, node_len)][node]
+        return _NO_NODE, path
+
+    def get(self, key: int, length: int, default: Any = None) -> Any:
+        node, _ = self._find(key, length)
+        if node == _NO_NODE or not self._has_value[node]:
+            return default
+        return self._value[node]
+
+    def delete(self, key: int, length: int) -> bool:
+        """Remove the prefix ``key/length``; returns False if it was not present."""
+        node, path = self._find(key, length)
+        if node == _NO_NODE or not self._has_value[node]:
+            return False
+        self._value[node], self._has_value[node] = None, False
+        self._size -= 1
+        # Drop or bypass nodes that no longer carry a value or a branch
+        while node != 0 and not self._has_value[node]:
+            children = [c for c in (self._child[0][node], self._child[1][node]) if c != _NO_NODE]
+            if len(children) == 2:
+                break
+            parent = path.pop()
+            side = 0 if self._child[0][parent] == node else 1
+            self._child[side][parent] = children[0] if children else _NO_NODE
+            self._free.append(node)
+            if children:
+                break
+            node = parent
+        return True
+
+    def longest_match(self, address: int) -> Any:
+        """Return the value of the longest prefix containing ``address``, or None."""
+        key, length, child0, child1 = self._key, self._len, self._child[0], self._child[1]
+        has_value, width = self._has_value, self.width
+        best = None
+        node = 0
+        while node != _NO_NODE:
+            node_len = length[node]
+            if node_len and (address ^ key[node]) >> (width - node_len):
+                break
+            if has_value[node]:
+                best = self._value[node]
+            if node_len == width:
+                break
+            node = child1[node] if (address >> (width - 1 - node_len)) & 1 else child0[node]
+        return best
+
+    def items(self) -> Iterator[Tuple[int, int, Any]]:
+        """Yield ``(key, length, value)`` for every stored prefix, in address order."""
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._has_value[node]:
+                yield self._key[node], self._len[node], self._value[node]
+            for child in (self._child[1][node], self._child[0][node]):
+                if child != _NO_NODE:
+                    stack.append(child)
+
+
+class PrefixIndex:
+    """
+    Longest-prefix-match index over IPAM block and network CIDRs, with one
+    trie per table and address family. Several records may share a CIDR;
+    each trie value is the list of records for that prefix.
+    """
+
+    TABLES = ("blocks", "networks")
+
+    def __init__(self):
+        self._tries: Dict[Tuple[str, int], PrefixTrie] = {
+            (table, version): PrefixTrie(32 if version == 4 else 128)
+            for table in self.TABLES for version in (4, 6)
+        }
+
+    def __len__(self) -> int:
+        return sum(len(trie) for trie in self._tries.values())
+
+    def clear(self):
+        self.__init__()
+
+    def _locate(self, table: str, cidr: str) -> Tuple[PrefixTrie, int, int]:
+        network = ipaddress.ip_network(cidr)
+        return self._tries[(table, network.version)], int(network.network_address), network.prefixlen
+
+    def add(self, table: str, record: dict):
+        trie, key, length = self._locate(table, record["cidr"])
+        bucket = trie.get(key, length)
+        if bucket is None:
+            trie.insert(key, length, [record])
+        else:
+            bucket.append(record)
+
+    def remove(self, table: str, record: dict):
+        trie, key, length = self._locate(table, record["cidr"])
+        bucket = trie.get(key, length)
+        if bucket is None:
+            return
+        bucket[:] = [r for r in bucket if r != record]
+        if not bucket:
+            trie.delete(key, length)
+
+    def lookup(self, ip: str) -> Dict[str, Optional[dict]]:
+        """
+        Return the most specific block and network containing ``ip``.
+
+        Raises:
+            ValueError: If ``ip`` is not a valid IPv4 or IPv6 address.
+        """
+        address = ipaddress.ip_address(ip)
+        value = int(address)
+        result = {}
+        for table in self.TABLES:
+            bucket = self._tries[(table, address.version)].longest_match(value)
+            result[table] = bucket[0] if bucket else None
+        return result
@@ -0,0 +1,72 @@
+import itertools
+import json
+from typing import Iterator
+
+READ_CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+def iter_records(path: str, chunk_size: int = READ_CHUNK_SIZE, skip: int = 0) -> Iterator[dict]:
+    """
+    Stream IPAM records from a JSON array file or a JSON-lines file.
+
+    The file is read in chunks and decoded one object at a time, so memory
+    stays bounded by the largest record rather than the file size.
+
+    Args:
+        path: Path to a ``.json`` (top-level array) or ``.jsonl`` file.
+        chunk_size: Bytes of text read per chunk.
+        skip: Number of leading records to pass over (JSON lines are skipped
+            without being decoded), e.g. to resume an interrupted load.
+
+    Yields:
+        dict: One record per object in the file.
+    """
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            # JSON lines: one object per line
+            pending = buffer
+            while True:
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    if skip:
+                        skip -= 1
+                        continue
+                    yield json.loads(line)
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                pending += chunk
+            if pending.strip() and not skip:
+                yield json.loads(pending)
+            return
+
+        yield from itertools.islice(_iter_array(f, buffer[1:], chunk_size), skip, None)
+
+
+def _iter_array(f, buffer: str, chunk_size: int) -> Iterator[dict]:
+    """Decode the elements of a JSON array whose opening bracket was consumed."""
+    pos = 0
+    eof = False
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            record, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield record
+        pos = end
@@ -0,0 +1,211 @@
+import math
+from typing import Dict, Optional
+
+from ipam.hierarchy import HierarchyIndex
+
+
+class Rollup:
+    """Aggregates over the descendants of one node (the node itself excluded)."""
+
+    __slots__ = ("count", "total", "maximum", "by_status", "by_type")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = -math.inf
+        self.by_status: Dict[str, int] = {}
+        self.by_type: Dict[str, int] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.maximum if self.count else None,
+            "by_status": dict(self.by_status),
+            "by_type": dict(self.by_type),
+        }
+
+
+def _utilization(record: dict) -> float:
+    return record.get("percent_utilized") or 0.0
+
+
+def _adjust(counts: Dict[str, int], deltas: Dict[str, int]):
+    for key, delta in deltas.items():
+        count = counts.get(key, 0) + delta
+        if count:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
+
+
+def _negated(counts: Dict[str, int]) -> Dict[str, int]:
+    return {key: -count for key, count in counts.items()}
+
+
+class RollupIndex:
+    """
+    Materialized utilization rollups for every interior node of a HierarchyIndex.
+
+    Each node with descendants keeps the count, sum and max of
+    ``percent_utilized`` over its subtree, and counts by ``status`` and
+    ``object_type``, so reading a datacenter's rollup costs the same as a
+    leaf's. A write updates only the ancestors of the node it touches: sums
+    and counts by applying the difference, the max by taking the new value,
+    or, when the old max itself went down or away, by re-reading the
+    children's maxima at each level. That is O(depth) per write, or
+    O(depth x fan-out) when the max has to be recomputed.
+
+    The hierarchy is not aware of the rollups; whoever changes it calls the
+    matching method here afterwards.
+    """
+
+    def __init__(self, hierarchy: HierarchyIndex):
+        self.hierarchy = hierarchy
+        self._rollups: Dict[str, Rollup] = {}
+
+    def clear(self):
+        self._rollups.clear()
+
+    def load(self):
+        """Rebuild every rollup from the hierarchy in one O(n) pass."""
+        self._rollups.clear()
+        for root in self.hierarchy.roots():
+            # Reversed preorder visits every node after all of its descendants
+            for record in reversed(self.hierarchy.subtree(root["object_id"])):
+                parent_id = self._parent_of(record)
+                if parent_id is None:
+                    continue
+                parent = self._rollups.get(parent_id)
+                if parent is None:
+                    parent = self._rollups[parent_id] = Rollup()
+                value = _utilization(record)
+                parent.count += 1
+                parent.total += value
+                parent.maximum = max(parent.maximum, value)
+                _adjust(parent.by_status, {record.get("status") or "": 1})
+                _adjust(parent.by_type, {record["object_type"]: 1})
+                below = self._rollups.get(record["object_id"])
+                if below is not None:
+                    parent.count += below.count
+                    parent.total += below.total
+                    parent.maximum = max(parent.maximum, below.maximum)
+                    _adjust(parent.by_status, below.by_status)
+                    _adjust(parent.by_type, below.by_type)
+
+    # ==================================================
+    # QUERIES
+    # ==================================================
+
+    def get(self, object_id: str) -> dict:
+        """
+        Rollup of ``object_id``'s descendants (all zero for a leaf).
+
+        Raises:
+            KeyError: If the node does not exist.
+        """
+        if object_id not in self.hierarchy:
+            raise KeyError(object_id)
+        return self._rollups.get(object_id, Rollup()).as_dict()
+
+    def recompute(self, object_id: str) -> dict:
+        """The same rollup computed from scratch by walking the subtree, O(subtree size)."""
+        rollup = Rollup()
+        for record in self.hierarchy.subtree(object_id, offset=1):
+            value = _utilization(record)
+            rollup.count += 1
+            rollup.total += value
+            rollup.maximum = max(rollup.maximum, value)
+            _adjust(rollup.by_status, {record.get("status") or "": 1})
+            _adjust(rollup.by_type, {record["object_type"]: 1})
+        return rollup.as_dict()
+
+    # ==================================================
+    # UPDATES
+    # ==================================================
+
+    def added(self, object_id: str):
+        """Account for a leaf just added to the hierarchy."""
+        record = self.hierarchy.get(object_id)
+        value = _utilization(record)
+        self._propagate(self._parent_of(record), 1, value, {record.get("status") or "": 1},
+                        {record["object_type"]: 1}, added_max=value)
+
+    def moved(self, object_id: str, old_parent_id: Optional[str]):
+        """Account for ``object_id``'s subtree having been moved from under ``old_parent_id``."""
+        record = self.hierarchy.get(object_id)
+        value = _utilization(record)
+        count, total, maximum = 1, value, value
+        by_status, by_type = {record.get("status") or "": 1}, {record["object_type"]: 1}
+        below = self._rollups.get(object_id)
+        if below is not None:
+            count, total, maximum = count + below.count, total + below.total, max(maximum, below.maximum)
+            _adjust(by_status, below.by_status)
+            _adjust(by_type, below.by_type)
+        if old_parent_id not in self.hierarchy:
+            old_parent_id = None
+        self._propagate(old_parent_id, -count, -total, _negated(by_status), _negated(by_type), removed_max=maximum)
+        self._propagate(self._parent_of(record), count, total, by_status, by_type, added_max=maximum)
+
+    def update(self, object_id: str, status: Optional[str] = None,
+               percent_utilized: Optional[float] = None) -> dict:
+        """
+        Change a node's status and/or utilization and update its ancestors' rollups.
+
+        Raises:
+            KeyError: If the node does not exist.
+        """
+        record = self.hierarchy.get(object_id)
+        if record is None:
+            raise KeyError(object_id)
+        old_status, old_value = record.get("status") or "", _utilization(record)
+        if status is not None:
+            record["status"] = status
+        if percent_utilized is not None:
+            record["percent_utilized"] = percent_utilized
+        new_status, new_value = record.get("status") or "", _utilization(record)
+        by_status = {} if new_status == old_status else {old_status: -1, new_status: 1}
+        if by_status or new_value != old_value:
+            self._propagate(self._parent_of(record), 0, new_value - old_value, by_status, {},
+                            added_max=new_value, removed_max=old_value)
+        return record
+
+    # ==================================================
+    # INTERNALS
+    # ==================================================
+
+    def _parent_of(self, record: dict) -> Optional[str]:
+        parent_id = record.get("parent_id")
+        return parent_id if parent_id in self.hierarchy else None
+
+    def _children_max(self, object_id: str) -> float:
+        maximum = -math.inf
+        for child_id in self.hierarchy.get(object_id)["immediate_children"]:
+            maximum = max(maximum, _utilization(self.hierarchy.get(child_id)))
+            below = self._rollups.get(child_id)
+            if below is not None:
+                maximum = max(maximum, below.maximum)
+        return maximum
+
+    def _propagate(self, node_id: Optional[str], count: int, total: float, by_status: Dict[str, int],
+                   by_type: Dict[str, int], added_max: float = -math.inf, removed_max: float = -math.inf):
+        """
+        Apply a change to the descendants of ``node_id`` to it and every ancestor,
+        bottom-up, so a level re-reading its children's maxima sees them updated.
+        """
+        while node_id is not None:
+            rollup = self._rollups.get(node_id)
+            if rollup is None:
+                rollup = self._rollups[node_id] = Rollup()
+            rollup.count += count
+            rollup.total += total
+            _adjust(rollup.by_status, by_status)
+            _adjust(rollup.by_type, by_type)
+            if not rollup.count:
+                del self._rollups[node_id]
+            elif added_max >= rollup.maximum:
+                rollup.maximum = added_max
+            elif removed_max >= rollup.maximum:
+                rollup.maximum = self._children_max(node_id)
+            node_id = self._parent_of(self.hierarchy.get(node_id))
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import os
+from typing import Optional, Tuple
+
+import db
+from ipam.allocator import AllocationIndex
+from ipam.hierarchy import HierarchyIndex
+from ipam.prefix_trie import PrefixIndex
+from ipam.records import iter_records
+from ipam.rollup import RollupIndex
+from ipam.tag_index import TAGGED_TABLES, TagIndex
+from repository import IPAM_PARENTS, IPAM_TABLES, ChangesTruncated
+
+logger = logging.getLogger("FastAPI_Boilerplate")
+
+# Optional JSON / JSON-lines file of IPAM records (e.g. from utils/fake_data_generator.py)
+IPAM_DATA_FILE = os.getenv("IPAM_DATA_FILE")
+# Seconds between reads of the IPAM change log for other workers' writes (0 disables it)
+IPAM_SYNC_INTERVAL = float(os.getenv("IPAM_SYNC_INTERVAL", "1"))
+# Change log entries read per query while catching up
+IPAM_SYNC_BATCH_SIZE = 1000
+
+hierarchy = HierarchyIndex()
+rollups = RollupIndex(hierarchy)
+prefixes = PrefixIndex()
+allocations = AllocationIndex()
+tags = TagIndex()
+
+
+# ==================================================
+# RECORDS
+# ==================================================
+
+def add_record(table: str, record: dict, reserve: bool = True):
+    """
+    Add a stored block, network or host to the prefix tries, allocators and
+    tag index. With ``reserve``, its range is marked used in its block's or
+    network's allocator; routes reserve before the insert and pass False.
+    """
+    if table == "blocks":
+        prefixes.add("blocks", record)
+        allocations.add_block(record)
+    elif table == "networks":
+        prefixes.add("networks", record)
+        if reserve:
+            try:
+                # Stored data may already overlap; the overlap is counted so releases stay exact
+                allocations.reserve_subnet(record["block_id"], record["cidr"], strict=False)
+            except ValueError:
+                pass
+        allocations.add_network(record)
+    elif reserve and record["ip_address"]:
+        try:
+            allocations.reserve_host(record["network_id"], record["ip_address"], strict=False)
+        except ValueError:
+            pass
+    tags.add_object(table, record[IPAM_TABLES[table][0]])
+
+
+def remove_record(table: str, record: dict, release: bool = True):
+    """Undo ``add_record`` for a deleted record; ``release`` frees its range in the parent's allocator."""
+    if table == "blocks":
+        prefixes.remove("blocks", record)
+        allocations.remove_block(record)
+    elif table == "networks":
+        prefixes.remove("networks", record)
+        allocations.remove_network(record, release)
+    elif release and record["ip_address"]:
+        allocations.release_host(record["network_id"], record["ip_address"])
+    tags.remove_object(table, record[IPAM_TABLES[table][0]])
+
+
+def apply_change(change: dict, rebuilt: Optional[Tuple[str, int]] = None):
+    """
+    Apply another worker's entry from ``db.ipam.changes``. Records already
+    (or no longer) indexed are left alone and tag links are sets, so entries
+    the initial load already saw are harmless. ``rebuilt`` names a
+    ``(table, id)`` parent whose allocator was rebuilt from storage after
+    this entry was written.
+    """
+    table, record = change["table"], change["record"]
+    if table == "tags":
+        if tags.get_tag(record["tag_id"]) is None:
+            tags.add_tag(record)
+        return
+    if change["op"] == "attach":
+        tags.attach(table, change["record_id"], change["tag_id"])
+        return
+    if change["op"] == "detach":
+        tags.detach(table, change["record_id"], change["tag_id"])
+        return
+    known = tags.has_object(table, change["record_id"])
+    parent = IPAM_PARENTS.get(table)
+    in_range = not (parent is not None and rebuilt == (parent[1], record[parent[0]]))
+    if change["op"] == "create" and not known:
+        add_record(table, record, reserve=in_range)
+    elif change["op"] == "delete" and known:
+        remove_record(table, record, release=in_range)
+
+
+async def load_indexes():
+    """Rebuild the prefix tries, allocators and tag index from storage."""
+    # Seq first: a write landing during the load is applied again later, which is harmless
+    index_sync.seq = await db.ipam.last_change_seq()
+    prefixes.clear()
+    allocations.clear()
+    tags.clear()
+    for table in ("blocks", "networks", "hosts"):
+        async for record in db.ipam.iter(table):
+            add_record(table, record)
+    for tag in await db.ipam.list_tags():
+        tags.add_tag(tag)
+    for table in TAGGED_TABLES:
+        async for links in db.ipam.iter_tag_links(table):
+            tags.attach_many(table, links)
+
+
+async def init_ipam(path: Optional[str] = IPAM_DATA_FILE):
+    """
+    Build the in-memory IPAM indexes: the object tree from ``path`` (if one is
+    configured) and its utilization rollups, the prefix tries and free-space allocators from the blocks,
+    networks and hosts tables, and the tag bitmaps from the tag junction tables.
+    """
+    if path:
+        hierarchy.load(iter_records(path))
+    rollups.load()
+    await load_indexes()
+
+
+# ==================================================
+# OTHER WORKERS' WRITES
+# ==================================================
+
+class IndexSync:
+    """
+    Applies the IPAM writes of other workers sharing the database.
+
+    Each worker indexes blocks, networks, hosts and tags in memory and
+    updates them on its own writes. The SQLite repository also logs every
+    write in ``ipam_changes`` with the writing process; a background task
+    reads the entries after ``seq`` every ``interval`` seconds and applies
+    the other processes' ones. If the log was trimmed past ``seq``, the
+    indexes are rebuilt instead. Catching up and ``reload_allocator`` run
+    under one lock, so entries are applied once and in order.
+    """
+
+    def __init__(self, interval: float = IPAM_SYNC_INTERVAL):
+        self.interval = interval
+        self.seq = 0
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.interval > 0:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def sync(self):
+        """Apply every change logged since the last sync."""
+        async with self._lock:
+            await self._catch_up()
+
+    async def reload_allocator(self, table: str, parent_id: int):
+        """
+        Rebuild the free space of one block (``table`` "blocks") or network from
+        its stored networks or hosts, after an insert found its range already taken.
+        """
+        async with self._lock:
+            await self._catch_up()
+            child_table = "networks" if table == "blocks" else "hosts"
+            seq, children = await db.ipam.list_children(child_table, parent_id)
+            # Entries up to seq are in ``children`` already: apply them without touching this allocator
+            await self._catch_up(seq, (table, parent_id))
+            if table == "blocks":
+                allocations.reload_block(parent_id, children)
+            else:
+                allocations.reload_network(parent_id, children)
+
+    async def _catch_up(self, until: Optional[int] = None, rebuilt: Optional[Tuple[str, int]] = None):
+        while until is None or self.seq < until:
+            try:
+                last, changes = await db.ipam.changes(self.seq, IPAM_SYNC_BATCH_SIZE)
+            except ChangesTruncated:
+                logger.warning("IPAM change log trimmed past seq %d, reloading the indexes", self.seq)
+                await load_indexes()
+                return
+            for change in changes:
+                if until is not None and change["seq"] > until:
+                    break
+                apply_change(change, rebuilt)
+            if last == self.seq:
+                return
+            self.seq = last if until is None else min(last, until)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception:
+                # e.g. the database is busy; the next sync reads the same entries
+                logger.warning("IPAM change sync failed", exc_info=True)
+
+
+index_sync = IndexSync()
+
+
+async def reload_allocator(table: str, parent_id: int):
+    """Rebuild one block's or network's allocator from storage (see ``IndexSync.reload_allocator``)."""
+    await index_sync.reload_allocator(table, parent_id)
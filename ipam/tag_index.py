@@ -0,0 +1,216 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ipam.bitmap import RoaringBitmap
+
+# Tables whose records can be tagged (see TAG_LINK_TABLES in repository.py)
+TAGGED_TABLES = ("blocks", "networks", "hosts")
+
+# Parentheses, "quoted names", or bare words
+_TOKEN = re.compile(r'\s*(?:([()])|"([^"]*)"|([^\s()"]+))')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    """
+    Split a tag expression into (kind, text) tokens, kind being "(", ")",
+    an operator or "TAG".
+
+    Raises:
+        ValueError: On an unterminated quote.
+    """
+    tokens, position, end = [], 0, len(expression.rstrip())
+    while position < end:
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"Unterminated quote at position {position}")
+        paren, quoted, word = match.groups()
+        if paren:
+            tokens.append((paren, paren))
+        elif quoted is not None:
+            tokens.append(("TAG", quoted))
+        elif word.upper() in _OPERATORS:
+            tokens.append((word.upper(), word))
+        else:
+            tokens.append(("TAG", word))
+        position = match.end()
+    return tokens
+
+
+class TagIndex:
+    """
+    Bitmap index of tag assignments for blocks, networks and hosts.
+
+    For every (table, tag) there is a RoaringBitmap of the primary keys of
+    the records carrying that tag, plus one bitmap per table of all existing
+    records (the universe for NOT). A boolean expression such as
+    ``Production AND "PCI Compliant" AND NOT DMZ`` is answered with bitmap
+    AND / OR / AND NOT instead of a join per tag, and attaching or detaching
+    a tag touches a single bit.
+
+    Tags are named by their name, or ``group:name`` where a name exists in
+    several groups; matching is case-insensitive and a name shared by several
+    groups matches any of them.
+    """
+
+    def __init__(self):
+        self._tags: Dict[int, dict] = {}
+        self._names: Dict[str, List[int]] = {}
+        self._bitmaps: Dict[Tuple[str, int], RoaringBitmap] = {}
+        self._objects: Dict[str, RoaringBitmap] = {table: RoaringBitmap() for table in TAGGED_TABLES}
+
+    def clear(self):
+        self._tags.clear()
+        self._names.clear()
+        self._bitmaps.clear()
+        self._objects = {table: RoaringBitmap() for table in TAGGED_TABLES}
+
+    # ==================================================
+    # UPDATES
+    # ==================================================
+
+    def add_tag(self, tag: dict):
+        self._tags[tag["tag_id"]] = tag
+        for name in (tag["name"], f"{tag['group']}:{tag['name']}"):
+            self._names.setdefault(name.lower(), []).append(tag["tag_id"])
+
+    def get_tag(self, tag_id: int) -> Optional[dict]:
+        return self._tags.get(tag_id)
+
+    def add_object(self, table: str, record_id: int):
+        self._objects[table].add(record_id)
+
+    def has_object(self, table: str, record_id: int) -> bool:
+        return record_id in self._objects[table]
+
+    def remove_object(self, table: str, record_id: int):
+        """Forget a deleted record along with all of its tags."""
+        self._objects[table].discard(record_id)
+        for tag_id in self._tags:
+            bitmap = self._bitmaps.get((table, tag_id))
+            if bitmap is not None:
+                bitmap.discard(record_id)
+
+    def attach(self, table: str, record_id: int, tag_id: int):
+        self._bitmap(table, tag_id).add(record_id)
+
+    def attach_many(self, table: str, links: Iterable[Tuple[int, int]]):
+        """Bulk-load (record_id, tag_id) pairs."""
+        by_tag: Dict[int, List[int]] = {}
+        for record_id, tag_id in links:
+            by_tag.setdefault(tag_id, []).append(record_id)
+        for tag_id, record_ids in by_tag.items():
+            self._bitmap(table, tag_id).update(record_ids)
+
+    def detach(self, table: str, record_id: int, tag_id: int):
+        bitmap = self._bitmaps.get((table, tag_id))
+        if bitmap is not None:
+            bitmap.discard(record_id)
+
+    def _bitmap(self, table: str, tag_id: int) -> RoaringBitmap:
+        bitmap = self._bitmaps.get((table, tag_id))
+        if bitmap is None:
+            bitmap = self._bitmaps[(table, tag_id)] = RoaringBitmap()
+        return bitmap
+
+    # ==================================================
+    # QUERIES
+    # ==================================================
+
+    def tags_of(self, table: str, record_id: int) -> List[dict]:
+        return [
+            tag for tag_id, tag in self._tags.items()
+            if record_id in self._bitmaps.get((table, tag_id), ())
+        ]
+
+    def search(self, table: str, expression: str) -> RoaringBitmap:
+        """
+        Primary keys of the ``table`` records matching ``expression``.
+
+        The grammar is the usual precedence of NOT over AND over OR, with
+        parentheses; adjacent tags without an operator are ANDed.
+
+        Raises:
+            ValueError: If the expression is malformed or names an unknown tag.
+        """
+        tokens = tokenize(expression)
+        if not tokens:
+            raise ValueError("Empty tag expression")
+        parser = _Evaluator(self, table, tokens)
+        result = parser.expression()
+        if parser.position != len(tokens):
+            raise ValueError(f"Unexpected {tokens[parser.position][1]!r}")
+        return result
+
+    def _lookup(self, table: str, name: str) -> RoaringBitmap:
+        tag_ids = self._names.get(name.lower())
+        if not tag_ids:
+            raise ValueError(f"Unknown tag {name!r}")
+        result = RoaringBitmap()
+        for tag_id in tag_ids:
+            result = result | self._bitmaps.get((table, tag_id), result)
+        return result
+
+
+class _Evaluator:
+    """Recursive-descent evaluation of a token list straight to bitmaps."""
+
+    def __init__(self, index: TagIndex, table: str, tokens: List[Tuple[str, str]]):
+        self.index = index
+        self.table = table
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _take(self) -> Tuple[str, str]:
+        if self.position == len(self.tokens):
+            raise ValueError("Unexpected end of expression")
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def expression(self) -> RoaringBitmap:
+        result = self.conjunction()
+        while self._peek() == "OR":
+            self._take()
+            result = result | self.conjunction()
+        return result
+
+    def conjunction(self) -> RoaringBitmap:
+        # Collect the operands first so AND runs smallest-first and NOT
+        # operands are subtracted rather than complemented
+        included, excluded = [], []
+        while True:
+            negated = False
+            while self._peek() == "NOT":
+                self._take()
+                negated = not negated
+            (excluded if negated else included).append(self.operand())
+            if self._peek() == "AND":
+                self._take()
+            elif self._peek() not in ("TAG", "(", "NOT"):
+                break
+        if included:
+            included.sort(key=len)
+            result = included[0]
+            for bitmap in included[1:]:
+                if not result:
+                    break
+                result = result & bitmap
+        else:
+            result = self.index._objects[self.table]
+        for bitmap in excluded:
+            result = result - bitmap
+        return result
+
+    def operand(self) -> RoaringBitmap:
+        kind, text = self._take()
+        if kind == "TAG":
+            return self.index._lookup(self.table, text)
+        if kind == "(":
+            result = self.expression()
+            if self._take()[0] != ")":
+                raise ValueError("Expected ')'")
+            return result
+        raise ValueError(f"Unexpected {text!r}")
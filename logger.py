@@ -1,31 +1,117 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
 
-def setup_logger(name, file_log_level=logging.INFO, console_log_level=logging.WARNING):
+# Standard LogRecord attributes, everything else on a record came from `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# The one listener thread of this process, installed by the first setup_logger call
+_listener = None
+_listener_running = False
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over untouched.
+
+    The stock handler formats the message in the caller's thread before
+    enqueueing; here formatting is left to the listener thread so the
+    event loop only pays for creating the record and a queue put.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logger(name, file_log_level=logging.INFO, console_log_level=logging.WARNING, json_format=True):
     """
     Set up a logger with the specified name and logging level.
-    
+
+    Records are put on an in-memory queue and written to the log file and
+    console by a background listener thread, so logging never does I/O on
+    the calling thread.
+
+    The queue handler and listener are installed once per process: later
+    calls (a reload, a test importing the app again) only set the level of
+    the named logger, instead of duplicating every line and leaking a thread.
+
     Args:
         name (str): The name of the logger.
-        level (int): The logging level (default is logging.INFO).
-    
+        file_log_level (int): The file logging level (default is logging.INFO).
+        console_log_level (int): The console logging level (default is logging.WARNING).
+        json_format (bool): Write the log file as JSON lines (default is True).
+
     Returns:
         logging.Logger: Configured logger instance.
     """
 
-    log_entry_format = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
-    
-    # Setup logging
-    logging.basicConfig(filename=f"{name}.log", format=log_entry_format)
+    global _listener
+
     logger = logging.getLogger(name)
     logger.setLevel(file_log_level)
+    with _listener_lock:
+        if _listener is not None:
+            start_listener()
+            return logger
+
+    log_entry_format = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+    # Writers, driven by the listener thread
+    fh = logging.FileHandler(f"{name}.log")
+    fh.setFormatter(JsonFormatter() if json_format else logging.Formatter(log_entry_format))
 
-    # Create console handler
     ch = logging.StreamHandler()
     ch.setLevel(console_log_level)
-    formatter = logging.Formatter(log_entry_format)
-    ch.setFormatter(formatter)
-    logger.addHandler(ch)
-    
-    logger.debug(f"logger setup with name: {name} and level: {logging.getLevelName(file_log_level)}")
-    
-    return logger
\ No newline at end of file
+    ch.addFilter(logging.Filter(name))
+    ch.setFormatter(logging.Formatter(log_entry_format))
+
+    log_queue = queue.SimpleQueue()
+    with _listener_lock:
+        _listener = logging.handlers.QueueListener(log_queue, fh, ch, respect_handler_level=True)
+        start_listener()
+        atexit.register(stop_listener)
+
+        # Setup logging
+        logging.getLogger().addHandler(DeferredQueueHandler(log_queue))
+
+    logger.debug("logger setup with name: %s and level: %s", name, logging.getLevelName(file_log_level))
+
+    return logger
+
+
+def start_listener():
+    """(Re)start the listener thread if setup_logger installed it and it is stopped."""
+    global _listener_running
+    if _listener is not None and not _listener_running:
+        _listener.start()
+        _listener_running = True
+
+
+def stop_listener():
+    """Write out every queued record and stop the listener thread; records logged later wait for start_listener."""
+    global _listener_running
+    if _listener is not None and _listener_running:
+        _listener.stop()
+        _listener_running = False
@@ -1,46 +1,107 @@
-from fastapi import FastAPI, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import adminRoutes, itemRoutes, userRoutes, authRoutes  # Import your routers
+from routers import adminRoutes, itemRoutes, userRoutes, authRoutes, ipamRoutes  # Import your routers
 
-from logger import setup_logger  # Assuming you have a logger setup in logger.py
+from logger import setup_logger, start_listener, stop_listener  # Assuming you have a logger setup in logger.py
 from logging import INFO, DEBUG, ERROR, WARNING, CRITICAL
 
 import datetime
-
-from auth import get_current_active_user
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+import compression
+import config
+import db
+import metrics
+import profiling
+import ratelimit
+from serialization import FastJSONResponse
+from ipam.service import index_sync, init_ipam
 
 # Configuration
 APP_VERSION = "0.0.4"
+# Fraction of successful (< 400) requests to log; errors are always logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
 
-logger = setup_logger("FastAPI_Boilerplate", file_log_level=DEBUG, console_log_level=WARNING)
+logger = setup_logger(
+    "FastAPI_Boilerplate",
+    file_log_level=config.current().get_int("log.level"),
+    console_log_level=config.parse_log_level(config.LOG_CONSOLE_LEVEL),
+)
+# log.level in app_configuration takes effect when the configuration is next reloaded
+config.settings.subscribe(lambda snapshot: logger.setLevel(snapshot.get_int("log.level")))
 logger.debug("Starting FastAPI application... Version: %s", APP_VERSION)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A no-op on first start; restarts the log listener if a previous lifespan stopped it
+    start_listener()
+    await db.init_storage()
+    logger.debug("Storage backend ready: %s", db.STORAGE_BACKEND)
+    await config.settings.start(db.app_config)
+    await init_ipam()
+    await index_sync.start()
+    yield
+    await index_sync.stop()
+    await config.settings.stop()
+    await db.close_storage()
+    # Last, so everything logged during shutdown is written
+    stop_listener()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="My FastAPI Boilerplate Service",
     description="A FastAPI backend service with authentication",
-    version=APP_VERSION
+    version=APP_VERSION,
+    lifespan=lifespan,
+    # Wrapped in Default() so routes with a response_model keep FastAPI's
+    # pydantic dump_json fast path; everything else is encoded with orjson
+    default_response_class=Default(FastJSONResponse),
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=config.CORS_ALLOW_ORIGINS,  # CORS_ALLOW_ORIGINS; configure appropriately for production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Response compression (gzip, or br/zstd when installed); bodies under COMPRESSION_MIN_SIZE go out as they are
+app.add_middleware(compression.CompressionMiddleware)
+
 # Logging Middleware
 @app.middleware("http")
 async def log_requests(request, call_next):
+    start = time.perf_counter()
     response = await call_next(request)
-    # Here you can log the request and response details
-    logger.info(f"Request: {request.method} {request.url} - Response: {response.status_code}")
+    duration = time.perf_counter() - start
+    metrics.observe_request(request.method, metrics.route_template(request.scope), response.status_code, duration)
+    # Nothing is built or formatted unless the record will actually be emitted;
+    # the queue handler defers message formatting to the listener thread
+    if logger.isEnabledFor(INFO) and (response.status_code >= 400 or random.random() < LOG_SAMPLE_RATE):
+        path = request.scope["path"]
+        logger.info(
+            "Request: %s %s - Response: %s", request.method, path, response.status_code,
+            extra={
+                "method": request.method,
+                "path": path,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3),
+            },
+        )
     return response
 
+# Profiling middleware, outermost so a profile covers everything else; a single
+# branch per request unless PROFILING_ENABLED or PROFILE_SAMPLE_RATE is set
+app.add_middleware(profiling.ProfilingMiddleware)
+
 # Custom exception handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
@@ -65,10 +126,16 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.datetime.now(datetime.UTC)}
 
-app.include_router(adminRoutes.router, prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_active_user)])
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+# Each router's dependencies authenticate and enforce its rate limits (auth sets its own per route)
+app.include_router(adminRoutes.router, prefix="/admin", tags=["admin"], dependencies=ratelimit.dependencies("admin"))
 app.include_router(authRoutes.router, prefix="/auth", tags=["auth"])
-app.include_router(itemRoutes.router, prefix="/items", tags=["items"], dependencies=[Depends(get_current_active_user)])
-app.include_router(userRoutes.router, prefix="/users", tags=["users"], dependencies=[Depends(get_current_active_user)])
+app.include_router(itemRoutes.router, prefix="/items", tags=["items"], dependencies=ratelimit.dependencies("items"))
+app.include_router(userRoutes.router, prefix="/users", tags=["users"], dependencies=ratelimit.dependencies("users"))
+app.include_router(ipamRoutes.router, prefix="/ipam", tags=["ipam"], dependencies=ratelimit.dependencies("ipam"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,321 @@
+import bisect
+import glob
+import json
+import mmap
+import os
+import time
+from array import array
+from typing import Dict, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (an implicit +Inf bucket is always appended)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests that matched no route, so raw URLs never become labels
+UNMATCHED_ROUTE = "<unmatched>"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ValueStore:
+    """
+    Flat array of float64 slots that every metric series writes into.
+
+    Without a directory the slots live in process memory. With one, each
+    worker process maps its own ``metrics_<pid>.db`` file and appends
+    ``[name, labels, offset]`` lines to ``metrics_<pid>.keys`` whenever it
+    allocates a series, so any worker can aggregate all of them on scrape.
+    All recording happens on the event-loop thread, so slots are updated
+    without locks.
+    """
+
+    def __init__(self, directory: Optional[str] = None, capacity: int = 65536):
+        self.directory = directory
+        self.capacity = capacity
+        self._pid = None
+        self._values = None
+        self._used = 0
+        self._keys_file = None
+
+    def _open(self):
+        self._pid = os.getpid()
+        self._used = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"metrics_{self._pid}")
+            with open(path + ".db", "w+b") as f:
+                f.truncate(self.capacity * 8)
+                self._mmap = mmap.mmap(f.fileno(), self.capacity * 8)
+            self._values = memoryview(self._mmap).cast("d")
+            self._keys_file = open(path + ".keys", "w")
+        else:
+            self._values = memoryview(bytearray(self.capacity * 8)).cast("d")
+
+    def allocate(self, name: str, labels: Tuple[str, ...], width: int) -> Tuple[memoryview, int]:
+        """Reserve ``width`` consecutive slots; returns the backing view and offset."""
+        if self._pid != os.getpid():
+            self._open()
+        if self._used + width > self.capacity:
+            # Out of shared slots: keep recording, but privately (not exported)
+            return memoryview(bytearray(width * 8)).cast("d"), 0
+        offset = self._used
+        self._used += width
+        if self._keys_file is not None:
+            self._keys_file.write(json.dumps([name, list(labels), offset]) + "\n")
+            self._keys_file.flush()
+        return self._values, offset
+
+    def snapshot(self) -> Dict[Tuple[str, Tuple[str, ...]], list]:
+        """Map ``(name, labels)`` to the ``(values, offset)`` of that series in every worker file."""
+        if self._pid != os.getpid():
+            self._open()
+        if not self.directory:
+            return {}
+        totals = {}
+        for keys_path in glob.glob(os.path.join(self.directory, "metrics_*.keys")):
+            db_path = keys_path[:-len(".keys")] + ".db"
+            try:
+                with open(keys_path) as f:
+                    entries = [json.loads(line) for line in f if line.endswith("\n")]
+                values = array("d")
+                with open(db_path, "rb") as f:
+                    values.frombytes(f.read())
+            except (OSError, ValueError):
+                continue
+            for name, labels, offset in entries:
+                totals.setdefault((name, tuple(labels)), []).append((values, offset))
+        return totals
+
+
+class _Metric:
+    type = ""
+    width = 1
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._children = {}
+
+    def labels(self, *values: str):
+        """Return the series for these label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            store_values, offset = self._registry.store.allocate(self.name, values, self.width)
+            child = self._children[values] = self._child_class(self, store_values, offset)
+        return child
+
+    def _series(self, shared):
+        """Yield ``(labels, slot values)`` for every series, aggregated if multi-process."""
+        if not self._registry.store.directory:
+            for labels, child in self._children.items():
+                yield labels, child._values[child._offset:child._offset + self.width]
+            return
+        for (name, labels), parts in shared.items():
+            if name == self.name:
+                yield labels, [sum(values[offset + i] for values, offset in parts) for i in range(self.width)]
+
+    def _label_str(self, labels, extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("_values", "_offset")
+
+    def __init__(self, metric, values, offset):
+        self._bind(values, offset)
+
+    def _bind(self, values, offset):
+        self._values = values
+        self._offset = offset
+
+    def inc(self, amount: float = 1.0):
+        self._values[self._offset] += amount
+
+
+class Counter(_Metric):
+    type = "counter"
+    _child_class = _CounterChild
+
+    def render(self, shared):
+        for labels, values in sorted(self._series(shared)):
+            yield f"{self.name}{self._label_str(labels)} {_fmt(values[0])}"
+
+
+class _HistogramChild:
+    __slots__ = ("_values", "_offset", "_buckets", "_sum")
+
+    def __init__(self, metric, values, offset):
+        self._buckets = metric.buckets
+        self._bind(values, offset)
+
+    def _bind(self, values, offset):
+        self._values = values
+        self._offset = offset
+        self._sum = offset + len(self._buckets)
+
+    def observe(self, value: float):
+        values = self._values
+        values[self._offset + bisect.bisect_left(self._buckets, value)] += 1
+        values[self._sum] += value
+
+
+class Histogram(_Metric):
+    """Histogram with fixed buckets; slots hold per-bucket counts then the sum."""
+    type = "histogram"
+    _child_class = _HistogramChild
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.width = len(self.buckets) + 1
+
+    def render(self, shared):
+        for labels, values in sorted(self._series(shared)):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_fmt(bound)}"'
+                yield f"{self.name}_bucket{self._label_str(labels, le)} {_fmt(cumulative)}"
+            yield f"{self.name}_sum{self._label_str(labels)} {_fmt(values[-1])}"
+            yield f"{self.name}_count{self._label_str(labels)} {_fmt(cumulative)}"
+
+
+class MetricsRegistry:
+    def __init__(self, directory: Optional[str] = None, capacity: int = 65536):
+        """
+        Args:
+            directory: Shared directory for multi-worker aggregation (None for
+                single-process, in-memory metrics).
+            capacity: Slots (float64 values) available per process.
+        """
+        self.store = _ValueStore(directory, capacity)
+        self._metrics = []
+        # Series created before a fork point at the parent's slots; move them in the child
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Rebound in place rather than dropped: callers holding a series (instrument's
+        # wrappers, observe_request's cache) then record into this process's own slots
+        for metric in self._metrics:
+            for labels, child in metric._children.items():
+                child._bind(*self.store.allocate(metric.name, labels, metric.width))
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        metric = Counter(self, name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        shared = self.store.snapshot()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render(shared))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) or abs(value) >= 1e15 else str(int(value))
+
+
+# ==================================================
+# APPLICATION METRICS
+# ==================================================
+
+REGISTRY = MetricsRegistry(
+    directory=os.getenv("METRICS_DIR") or None,
+    capacity=int(os.getenv("METRICS_SLOTS", "65536")),
+)
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by method, route template and status class.",
+    ("method", "route", "status"),
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.",
+    ("method", "route"),
+)
+BCRYPT_LATENCY = REGISTRY.histogram(
+    "auth_bcrypt_duration_seconds", "Time spent in bcrypt hash/verify calls.", ("operation",),
+)
+JWT_DECODE_LATENCY = REGISTRY.histogram(
+    "auth_jwt_decode_duration_seconds", "Time spent verifying and decoding JWTs.",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+STORE_LATENCY = REGISTRY.histogram(
+    "store_operation_duration_seconds", "Repository operation latency.", ("repository", "operation"),
+)
+
+_STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+# (method, route, status code) -> (REQUESTS series, REQUEST_LATENCY series); bounded by the route table
+_request_series: Dict[Tuple[str, str, int], tuple] = {}
+
+
+def route_template(scope) -> str:
+    """
+    Return the matched route's full path template, e.g. ``/items/{item_id}``.
+
+    Depending on the FastAPI version, the route in scope may carry only its
+    path within an included router, so the router prefix is recovered from
+    the request path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    template = route.path_format
+    path = scope["path"]
+    params = scope.get("path_params")
+    rendered = template.format(**params) if params else template
+    if path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + template
+    return template
+
+
+def observe_request(method: str, route: str, status_code: int, duration: float):
+    """Record one finished HTTP request."""
+    series = _request_series.get((method, route, status_code))
+    if series is None:
+        status = _STATUS_CLASSES[status_code // 100 - 1] if 100 <= status_code < 600 else "other"
+        series = _request_series[method, route, status_code] = (
+            REQUESTS.labels(method, route, status), REQUEST_LATENCY.labels(method, route),
+        )
+    series[0].inc()
+    series[1].observe(duration)
+
+
+def instrument(repository, name: str, operations: Sequence[str]):
+    """
+    Time the given coroutine methods of ``repository`` into STORE_LATENCY.
+
+    The wrappers are set as instance attributes, so calls through the base
+    class (e.g. ``iter`` paging via ``list``) are timed too. They hold their
+    series, which the registry moves to a forked worker's own slots.
+    """
+    for operation in operations:
+        method = getattr(repository, operation)
+        histogram = STORE_LATENCY.labels(name, operation)
+
+        async def timed(*args, _method=method, _histogram=histogram, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await _method(*args, **kwargs)
+            finally:
+                _histogram.observe(time.perf_counter() - start)
+
+        setattr(repository, operation, timed)
+    return repository
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, IPvAnyAddress, IPvAnyNetwork
+from typing import Any, Dict, List, Literal, Optional, Union
 
 # Pydantic models
 class User(BaseModel):
@@ -20,6 +20,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class Item(BaseModel):
     id: Optional[int] = None
@@ -27,3 +32,146 @@ class Item(BaseModel):
     description: Optional[str] = None
     price: float
     owner_id: int
+
+class ItemPatch(BaseModel):
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: int
+    id: Optional[int] = None
+    item: Optional[Item] = None
+    detail: Optional[str] = None
+
+class ItemChange(BaseModel):
+    seq: int
+    op: Literal["create", "update", "delete"]
+    id: int
+    item: Optional[Item] = None
+
+class ItemChanges(BaseModel):
+    last_seq: int
+    changes: List[ItemChange]
+
+class IpamNodeCreate(BaseModel):
+    object_id: Optional[str] = None
+    object_type: str
+    parent_id: Optional[str] = None
+    sec_zone: Optional[str] = None
+    config_id: Optional[str] = None
+    ip_address: Optional[str] = None
+    status: str = ""
+    percent_utilized: float = 0.0
+
+class IpamNode(IpamNodeCreate):
+    object_id: str
+    immediate_children: List[str] = []
+
+class IpamNodeMove(BaseModel):
+    parent_id: Optional[str] = None
+
+class IpamNodeUpdate(BaseModel):
+    status: Optional[str] = None
+    percent_utilized: Optional[float] = None
+
+class IpamRollup(BaseModel):
+    object_id: str
+    count: int
+    sum: float
+    mean: Optional[float] = None
+    max: Optional[float] = None
+    by_status: Dict[str, int] = {}
+    by_type: Dict[str, int] = {}
+
+class IpamWalkEntry(BaseModel):
+    depth: int
+    node: IpamNode
+
+class BlockCreate(BaseModel):
+    object_id: str
+    config_path: str
+    cidr: IPvAnyNetwork
+    name: Optional[str] = None
+    description: Optional[str] = None
+    location_id: int
+
+class Block(BlockCreate):
+    block_id: int
+
+class NetworkCreate(BaseModel):
+    object_id: str
+    config_path: str
+    cidr: IPvAnyNetwork
+    vlan_id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    block_id: int
+
+class Network(NetworkCreate):
+    network_id: int
+
+class NetworkAllocate(BaseModel):
+    prefixlen: int
+    object_id: Optional[str] = None
+    config_path: str
+    vlan_id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+class HostCreate(BaseModel):
+    object_id: str
+    config_path: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Literal["active", "pending_change", "deleted"] = "active"
+    pending_change: Optional[str] = None
+    network_id: int
+    ip_address: Optional[IPvAnyAddress] = None
+
+class Host(HostCreate):
+    host_id: int
+
+class HostAllocate(BaseModel):
+    object_id: Optional[str] = None
+    config_path: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Literal["active", "pending_change", "deleted"] = "active"
+
+class FreeSpace(BaseModel):
+    next_free: Optional[str] = None
+    free_addresses: int
+
+class LookupRequest(BaseModel):
+    ips: List[str]
+
+class LookupResult(BaseModel):
+    ip: str
+    block: Optional[Block] = None
+    network: Optional[Network] = None
+    detail: Optional[str] = None
+
+class TagCreate(BaseModel):
+    group: str
+    name: str
+
+class Tag(TagCreate):
+    tag_id: int
+    tag_group_id: int
+
+class TagSearchResult(BaseModel):
+    object_type: Literal["blocks", "networks", "hosts"]
+    count: int
+    results: List[Union[Block, Network, Host]]
+
+class ConfigEntryUpdate(BaseModel):
+    # Strings are stored as they are, anything else as JSON
+    value: Any = None
+    category: Optional[str] = None
+    description: Optional[str] = None
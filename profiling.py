@@ -0,0 +1,246 @@
+import cProfile
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from auth import get_current_user
+
+# PROFILING_ENABLED lets admins profile a request with an X-Profile header ("cprofile" or
+# "sample"); PROFILE_SAMPLE_RATE profiles that fraction of all requests with the sampler
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+# The sampler thread needs the GIL to take a sample, so while the event loop is busy
+# samples are effectively no closer than the interpreter's switch interval (5 ms)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+
+PROFILE_HEADER = b"x-profile"
+PROFILERS = ("cprofile", "sample")
+# Functions rows are reported for in each profile summary
+TOP_FUNCTIONS = 30
+
+# Request phases, as the functions whose inclusive time they are: (file suffix, function)
+PHASES = {
+    # Parameter parsing and every dependency: authentication and rate limits
+    "dependencies": (("fastapi/dependencies/utils.py", "solve_dependencies"),),
+    "auth": (("auth.py", "get_current_user"), ("auth.py", "get_current_active_user")),
+    # The route function; includes serialization it does itself through trusted_response
+    "handler": (("fastapi/routing.py", "run_endpoint_function"),),
+    "serialization": (
+        ("fastapi/routing.py", "serialize_response"),
+        ("serialization.py", "trusted_response"),
+        ("starlette/responses.py", "render"),
+        ("serialization.py", "render"),
+    ),
+}
+
+
+def _phase_of(filename: str, function: str) -> List[str]:
+    return [
+        phase for phase, functions in PHASES.items()
+        if any(function == name and filename.replace("\\", "/").endswith(suffix) for suffix, name in functions)
+    ]
+
+
+class Sampler(threading.Thread):
+    """
+    Statistical profiler: a daemon thread that records the stack of one
+    thread every ``interval`` seconds, as (filename, function) frames from
+    the outermost in.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _cprofile_summary(profile: cProfile.Profile) -> Tuple[Dict[str, float], List[dict], bytes]:
+    """Phase times, the top functions by cumulative time, and the raw stats in .prof format."""
+    stats = pstats.Stats(profile).stats
+    phases = {phase: 0.0 for phase in PHASES}
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.items():
+        for phase in _phase_of(filename, function):
+            phases[phase] += cumulative
+        rows.append({"function": f"{filename}:{line}({function})", "calls": calls,
+                     "total_ms": total * 1e3, "cumulative_ms": cumulative * 1e3})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return {phase: seconds * 1e3 for phase, seconds in phases.items()}, rows[:TOP_FUNCTIONS], marshal.dumps(stats)
+
+
+def _sample_summary(stacks: Counter, duration_ms: float) -> Tuple[Dict[str, float], List[dict], bytes]:
+    """Phase and function times estimated from the share of samples they appear in, and folded stacks."""
+    total = sum(stacks.values())
+    ms_per_sample = duration_ms / total if total else 0.0
+    phases = Counter()
+    inclusive, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        if stack:
+            own[stack[-1]] += count
+        for phase in {phase for filename, function in stack for phase in _phase_of(filename, function)}:
+            phases[phase] += count
+        for frame in set(stack):
+            inclusive[frame] += count
+    rows = [{"function": f"{frame[0]}({frame[1]})", "samples": count, "total_ms": own[frame] * ms_per_sample,
+             "cumulative_ms": count * ms_per_sample}
+            for frame, count in inclusive.most_common(TOP_FUNCTIONS)]
+    # One "outer;...;inner count" line per stack, the input format of flame graph tools
+    folded = "".join(
+        ";".join(f"{os.path.basename(filename)}:{function}" for filename, function in stack) + f" {count}\n"
+        for stack, count in stacks.most_common()
+    )
+    return ({phase: phases[phase] * ms_per_sample for phase in PHASES}, rows, folded.encode())
+
+
+class ProfileStore:
+    """The last ``max_size`` request profiles, oldest dropped first."""
+
+    def __init__(self, max_size: int = 50):
+        self._profiles: Deque[dict] = deque(maxlen=max_size)
+        self._ids = itertools.count(1)
+
+    def add(self, profile: dict) -> dict:
+        profile["id"] = next(self._ids)
+        self._profiles.append(profile)
+        return profile
+
+    def list(self) -> List[dict]:
+        """Summaries, newest first, without the top functions or raw data."""
+        return [
+            {key: value for key, value in profile.items() if key not in ("functions", "data")}
+            for profile in reversed(self._profiles)
+        ]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        for profile in self._profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+    def clear(self):
+        self._profiles.clear()
+
+
+profiles = ProfileStore(PROFILE_BUFFER_SIZE)
+
+
+async def _requested_profiler(scope) -> Optional[str]:
+    """The profiler named by an admin's X-Profile header, or None."""
+    headers = dict(scope["headers"])
+    profiler = headers.get(PROFILE_HEADER)
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if profiler is None or not authorization.lower().startswith("bearer "):
+        return None
+    profiler = profiler.decode("latin-1").strip().lower() or "cprofile"
+    if profiler not in PROFILERS:
+        return None
+    try:
+        user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=authorization[7:]))
+    except HTTPException:
+        return None
+    # In a real app, you'd check for an admin role here
+    return profiler if user.username == "admin" and user.is_active else None
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles single requests into ``profiles``.
+
+    A request is profiled when an admin sends ``X-Profile: cprofile`` (the
+    deterministic profiler) or ``X-Profile: sample`` (the statistical one),
+    or when it is picked at ``PROFILE_SAMPLE_RATE`` (statistical). The
+    profiled response carries ``X-Profile-Id``. One request is profiled at a
+    time; profilers see the whole event-loop thread, so work of other
+    requests interleaved with this one's awaits shows up too, while sync
+    routes and dependencies run in the threadpool are not seen. With neither
+    switch set, a request costs one branch.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILING_ENABLED, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 store: ProfileStore = profiles):
+        self.app = app
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.active = enabled or sample_rate > 0
+        self.store = store
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.active:
+            return await self.app(scope, receive, send)
+        if scope["type"] != "http" or self._busy:
+            return await self.app(scope, receive, send)
+
+        profiler, trigger = None, None
+        if self.enabled and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            profiler, trigger = await _requested_profiler(scope), "header"
+        if profiler is None and self.sample_rate and random.random() < self.sample_rate:
+            profiler, trigger = "sample", "sample_rate"
+        if profiler is None or self._busy:
+            return await self.app(scope, receive, send)
+        await self._profile(scope, receive, send, profiler, trigger)
+
+    async def _profile(self, scope, receive, send, profiler: str, trigger: str):
+        profile_id = self.store.add({
+            "method": scope["method"], "path": scope["path"], "profiler": profiler, "trigger": trigger,
+            "started_at": time.time(), "status": None, "duration_ms": None, "phases": {},
+        })["id"]
+        result = {"status": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", str(profile_id).encode())]}
+            await send(message)
+
+        self._busy = True
+        if profiler == "cprofile":
+            collector = cProfile.Profile()
+            collector.enable()
+        else:
+            collector = Sampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            collector.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1e3
+            if profiler == "cprofile":
+                collector.disable()
+                phases, functions, data = _cprofile_summary(collector)
+            else:
+                collector.stop()
+                phases, functions, data = _sample_summary(collector.stacks, duration_ms)
+            self._busy = False
+            profile = self.store.get(profile_id)
+            if profile is not None:
+                profile.update(status=result["status"], duration_ms=duration_ms, phases=phases,
+                               functions=functions, data=data)
@@ -0,0 +1,246 @@
+import fcntl
+import hashlib
+import ipaddress
+import math
+import mmap
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+
+import metrics
+from auth import get_current_active_user
+from models import User
+
+
+class Limit(NamedTuple):
+    rate: float   # tokens added per second
+    burst: float  # bucket capacity
+
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """Parse ``"<rate>/<burst>"`` (tokens per second / capacity); ``"off"`` disables the limit."""
+    if spec.strip().lower() in ("off", "none", "0", ""):
+        return None
+    rate, _, burst = spec.partition("/")
+    return Limit(float(rate), float(burst or rate))
+
+
+# Slots per bucket: key hash (uint64), tokens (float64), last update (float64, monotonic seconds)
+_SLOT_WIDTH = 3
+
+
+class BucketTable:
+    """
+    Token buckets in a fixed-size open-addressed hash table.
+
+    Each bucket is three 8-byte slots: a 64-bit hash of its key, the tokens
+    left and the time they were counted. Refill is computed lazily from the
+    elapsed time when the bucket is next used, so nothing runs in between.
+    The table is split into ``shards``; a key only ever probes up to
+    ``probes`` slots within its shard. When none of those is free or holds
+    the key, the bucket used least recently is reused. A bucket idle long
+    enough to have refilled is equivalent to a missing one, so that only
+    loses state for clients that have gone quiet.
+
+    Without a directory the table lives in process memory. With one, every
+    worker maps the same ``ratelimit_<slots>.db`` file, and a key's shard is
+    updated under an fcntl byte-range lock on that shard, so workers on one
+    host share the limits and contend only within a shard. The event loop
+    thread is the only caller in a process, so no thread locking is needed.
+    """
+
+    def __init__(self, directory: Optional[str] = None, slots: int = 65536, shards: int = 64, probes: int = 8):
+        """
+        Args:
+            directory: Directory for the table shared by worker processes
+                (None for a per-process table).
+            slots: Number of buckets.
+            shards: Number of independently locked ranges.
+            probes: Buckets examined per lookup.
+        """
+        self.directory = directory
+        self.shards = shards
+        self.per_shard = max(probes, slots // shards)
+        self.slots = self.per_shard * shards
+        self.probes = probes
+        self._pid = None
+        self._fd = None
+
+    def _open(self):
+        self._pid = os.getpid()
+        size = self.slots * _SLOT_WIDTH * 8
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._fd = os.open(os.path.join(self.directory, f"ratelimit_{self.slots}.db"), os.O_RDWR | os.O_CREAT, 0o600)
+            # Growing with ftruncate zero-fills; every worker asks for the same size
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            buffer = mmap.mmap(self._fd, size)
+        else:
+            self._fd = None
+            buffer = bytearray(size)
+        self._keys = memoryview(buffer).cast("Q")
+        self._values = memoryview(buffer).cast("d")
+
+    def take(self, key: str, limit: Limit) -> float:
+        """
+        Take one token from ``key``'s bucket.
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one will be available.
+        """
+        if self._pid != os.getpid():
+            self._open()
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") | 1
+        shard = digest % self.shards
+        base = shard * self.per_shard
+        start = (digest // self.shards) % self.per_shard
+        shared = self._fd is not None
+        if shared:
+            lock_start = base * _SLOT_WIDTH * 8
+            lock_length = self.per_shard * _SLOT_WIDTH * 8
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, lock_length, lock_start)
+        try:
+            return self._take(digest, base, start, limit, time.monotonic())
+        finally:
+            if shared:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, lock_length, lock_start)
+
+    def _take(self, digest: int, base: int, start: int, limit: Limit, now: float) -> float:
+        keys, values = self._keys, self._values
+        slot, victim, oldest = -1, -1, math.inf
+        for i in range(self.probes):
+            candidate = (base + (start + i) % self.per_shard) * _SLOT_WIDTH
+            found = keys[candidate]
+            if found == digest:
+                slot = candidate
+                break
+            if found == 0:
+                victim = candidate
+                break
+            updated = values[candidate + 2]
+            if updated < oldest:
+                oldest, victim = updated, candidate
+        if slot < 0:
+            slot = victim
+            keys[slot] = digest
+            tokens = limit.burst
+        else:
+            # max(0, ...) guards against a table left over from before a reboot
+            tokens = min(limit.burst, values[slot + 1] + max(0.0, now - values[slot + 2]) * limit.rate)
+        values[slot + 2] = now
+        if tokens >= 1.0:
+            values[slot + 1] = tokens - 1.0
+            return 0.0
+        values[slot + 1] = tokens
+        return (1.0 - tokens) / limit.rate
+
+
+# ==================================================
+# ROUTER LIMITS
+# ==================================================
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+# router -> (per-user limit, per-IP limit) as "<tokens per second>/<burst>"; override with
+# RATE_LIMIT_<ROUTER>_USER / RATE_LIMIT_<ROUTER>_IP. Auth routes have no user yet, so only IPs:
+# "auth" guards the password routes (login, register), "auth_token" refresh and logout, which
+# every client calls routinely and must not share the password routes' tight bucket
+DEFAULT_LIMITS = {
+    "auth": ("off", "1/10"),
+    "auth_token": ("off", "10/50"),
+    "items": ("50/200", "200/400"),
+    "admin": ("10/50", "50/100"),
+    "users": ("20/40", "200/400"),
+    "ipam": ("100/200", "200/400"),
+}
+
+LIMITS: Dict[str, Dict[str, Optional[Limit]]] = {
+    router: {
+        "user": parse_limit(os.getenv(f"RATE_LIMIT_{router.upper()}_USER", user)),
+        "ip": parse_limit(os.getenv(f"RATE_LIMIT_{router.upper()}_IP", ip)),
+    }
+    for router, (user, ip) in DEFAULT_LIMITS.items()
+}
+
+# Proxies whose X-Forwarded-For is believed, as addresses or CIDRs (comma-separated)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("TRUSTED_PROXIES", "").split(",") if entry.strip()
+]
+
+buckets = BucketTable(
+    directory=os.getenv("RATE_LIMIT_DIR") or None,
+    slots=int(os.getenv("RATE_LIMIT_SLOTS", "65536")),
+)
+
+RATE_LIMITED = metrics.REGISTRY.counter(
+    "http_rate_limited_total", "Requests rejected with 429 by router and bucket kind.", ("router", "kind"),
+)
+
+
+def _parse_ip(address: str):
+    try:
+        return ipaddress.ip_address(address)
+    except ValueError:
+        return None
+
+
+def _trusted(ip) -> bool:
+    return ip is not None and any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The client's address: the peer, or when the peer is a trusted proxy, the
+    rightmost X-Forwarded-For entry that is not one (entries further left are
+    whatever the client chose to send). A malformed entry falls back to the peer.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXIES or not _trusted(_parse_ip(peer)):
+        return peer
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+    for entry in reversed([entry.strip() for entry in forwarded.split(",") if entry.strip()]):
+        ip = _parse_ip(entry)
+        if ip is None:
+            return peer
+        if not _trusted(ip):
+            return str(ip)
+    return peer
+
+
+def _check(router: str, kind: str, identity: str):
+    limit = LIMITS[router][kind]
+    if limit is None:
+        return
+    wait = buckets.take(f"{router}:{kind}:{identity}", limit)
+    if wait:
+        RATE_LIMITED.labels(router, kind).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def dependencies(router: str, authenticated: bool = True) -> List:
+    """
+    Router dependencies enforcing ``router``'s limits: the client IP's
+    bucket before authentication, so floods are turned away before any JWT
+    work, then, for authenticated routers, the user's bucket.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return [Depends(get_current_active_user)] if authenticated else []
+
+    async def limit_ip(request: Request):
+        _check(router, "ip", client_ip(request))
+
+    async def limit_user(current_user: User = Depends(get_current_active_user)):
+        _check(router, "user", str(current_user.id))
+
+    result = [Depends(limit_ip)]
+    if authenticated:
+        result += [Depends(get_current_active_user), Depends(limit_user)]
+    return result
@@ -0,0 +1,1287 @@
+import bisect
+import datetime
+import ipaddress
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from sqlite_pool import SQLitePool
+from store import ItemStore
+from token_cache import RevocationStore
+
+
+class DuplicateKeyError(Exception):
+    """Raised when a create would violate a uniqueness constraint."""
+
+
+class ConstraintError(Exception):
+    """Raised when a write would break a reference between records (missing parent, child still present)."""
+
+
+class BulkConflict(Exception):
+    """Raised by a bulk operation that was not applied because some ids are missing or not owned."""
+
+    def __init__(self, missing: List[int], forbidden: List[int]):
+        super().__init__(f"missing ids: {missing}, not owned: {forbidden}")
+        self.missing = missing
+        self.forbidden = forbidden
+
+
+class OverlapError(Exception):
+    """Raised when a network overlaps one already stored in its block, or a host's address is already taken."""
+
+
+class ChangesTruncated(Exception):
+    """Raised when changes after the requested sequence number have already been dropped from the log."""
+
+
+# Page size used when streaming a listing batch by batch
+STREAM_BATCH_SIZE = 500
+
+
+async def _iter_pages(list_page: Callable, after_id: int, limit: Optional[int], key: str = "id") -> AsyncIterator[dict]:
+    """Walk a keyset-paginated ``list_page(after_id, limit)`` one batch at a time."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch_size = STREAM_BATCH_SIZE if remaining is None else min(remaining, STREAM_BATCH_SIZE)
+        page = await list_page(after_id, batch_size)
+        for record in page:
+            yield record
+        if len(page) < batch_size:
+            return
+        after_id = page[-1][key]
+        if remaining is not None:
+            remaining -= len(page)
+
+
+# ==================================================
+# INTERFACES
+# ==================================================
+
+class UserRepository(ABC):
+    """Storage interface for user records (plain dicts with ``hashed_password``)."""
+
+    def __init__(self):
+        self._listeners: List[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]):
+        """Call ``callback(username)`` after a user is changed."""
+        self._listeners.append(callback)
+
+    def _notify(self, username: str):
+        for callback in self._listeners:
+            callback(username)
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list(self, after_id: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Return users with ``id > after_id`` in id order, at most ``limit`` of them."""
+
+    def iter(self, after_id: int = 0, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """Stream users like ``list`` without materialising more than one batch."""
+        return _iter_pages(self.list, after_id, limit)
+
+    @abstractmethod
+    async def create(self, username: str, email: str, hashed_password: str) -> dict:
+        """Create an active user. Raises DuplicateKeyError if the username is taken."""
+
+    @abstractmethod
+    async def update(self, username: str, changes: dict) -> Optional[dict]:
+        """Apply ``changes`` (email, hashed_password, is_active) and return the user."""
+
+
+class ItemRepository(ABC):
+    """Storage interface for item records (plain dicts matching ``models.Item``)."""
+
+    def __init__(self):
+        self._listeners: List[Callable[[int], None]] = []
+
+    def subscribe(self, callback: Callable[[int], None]):
+        """Call ``callback(owner_id)`` after a write to the owner's items is committed."""
+        self._listeners.append(callback)
+
+    def _notify(self, owner_ids):
+        for owner_id in set(owner_ids):
+            for callback in self._listeners:
+                callback(owner_id)
+
+    @abstractmethod
+    async def get(self, item_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_by_owner(self, owner_id: int, after_id: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Return the owner's items with ``id > after_id`` in id order, at most ``limit`` of them."""
+
+    def iter_by_owner(self, owner_id: int, after_id: int = 0, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """Stream items like ``list_by_owner`` without materialising more than one batch."""
+        return _iter_pages(lambda after, size: self.list_by_owner(owner_id, after, size), after_id, limit)
+
+    @abstractmethod
+    async def owner_version(self, owner_id: int) -> int:
+        """
+        Counter that increases with every committed write to the owner's items,
+        bulk operations included. Equal versions mean the owner's items are unchanged.
+        """
+
+    # Every committed write is also appended to a bounded change log, numbered by a
+    # sequence shared by all owners: {"seq", "op", "id", "item"}, item None for a delete.
+
+    @abstractmethod
+    async def changes(self, owner_id: int, since: int, limit: Optional[int] = None) -> List[dict]:
+        """
+        The owner's changes with ``seq > since``, oldest first, at most ``limit`` of them.
+
+        Raises:
+            ChangesTruncated: If some of the owner's changes after ``since`` were dropped.
+        """
+
+    @abstractmethod
+    async def last_change_seq(self) -> int:
+        """Seq of the latest change of any owner (0 if there is none)."""
+
+    @abstractmethod
+    async def changed_owners(self, after_seq: int) -> Tuple[int, Set[int]]:
+        """Latest seq, and the owners with a change after ``after_seq``."""
+
+    @abstractmethod
+    async def create(self, item: dict) -> dict:
+        """Store a new item and return it with its assigned ``id``."""
+
+    @abstractmethod
+    async def update(self, item_id: int, changes: dict) -> Optional[dict]:
+        """Apply ``changes`` (``id`` and ``owner_id`` are ignored) and return the item."""
+
+    @abstractmethod
+    async def delete(self, item_id: int) -> Optional[dict]:
+        """Delete an item and return it, or None if it did not exist."""
+
+    # Bulk operations are all-or-nothing: either every entry is applied or none is.
+
+    @abstractmethod
+    async def create_many(self, items: List[dict]) -> List[dict]:
+        """Store several new items and return them, in order, with their ids."""
+
+    @abstractmethod
+    async def update_many(self, owner_id: int, updates: List[dict]) -> List[dict]:
+        """
+        Apply each ``{"id": ..., **changes}`` to items owned by ``owner_id``.
+
+        Raises:
+            BulkConflict: If any id is missing or owned by someone else.
+        """
+
+    @abstractmethod
+    async def delete_many(self, owner_id: int, item_ids: List[int]) -> List[dict]:
+        """
+        Delete items owned by ``owner_id`` and return them in order.
+
+        Raises:
+            BulkConflict: If any id is missing or owned by someone else.
+        """
+
+
+class RevokedTokenRepository(ABC):
+    """
+    Revoked token ids (refresh token ``jti``s, token families), each kept
+    until ``expires_at``, after which the token is rejected for expiry anyway.
+    """
+
+    @abstractmethod
+    async def consume(self, token_id: str, expires_at: float) -> bool:
+        """Revoke ``token_id`` and return True, or False if it was already revoked (atomically)."""
+
+    @abstractmethod
+    async def revoke(self, token_id: str, expires_at: float):
+        ...
+
+    @abstractmethod
+    async def is_revoked(self, token_id: str) -> bool:
+        ...
+
+
+class ConfigRepository(ABC):
+    """Rows of app_configuration: ``config_key`` -> ``config_value`` text (often JSON)."""
+
+    @abstractmethod
+    async def load(self) -> List[dict]:
+        """Every row: config_key, config_value, category, description, updated_at."""
+
+    @abstractmethod
+    async def version(self):
+        """
+        A value that changes whenever a row is added, changed or removed, or
+        None when that cannot be told yet (the caller should then reload).
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: Optional[str], category: Optional[str] = None,
+                  description: Optional[str] = None) -> dict:
+        """Insert or update ``key``; category and description are kept if not given."""
+
+
+# Primary key and writable columns of each IPAM table served by IpamRepository
+IPAM_TABLES = {
+    "blocks": ("block_id", ("object_id", "config_path", "cidr", "name", "description", "location_id")),
+    "networks": ("network_id", ("object_id", "config_path", "cidr", "vlan_id", "name", "description", "block_id")),
+    "hosts": ("host_id", (
+        "object_id", "config_path", "name", "description", "status", "pending_change", "network_id", "ip_address",
+    )),
+}
+# Reference column of a table and the IPAM table it points into
+IPAM_PARENTS = {"networks": ("block_id", "blocks"), "hosts": ("network_id", "networks")}
+# Junction table linking each taggable IPAM table to tags
+TAG_LINK_TABLES = {"blocks": "block_tags", "networks": "network_tags", "hosts": "host_tags"}
+
+
+def address_key(version: int, address: int) -> str:
+    """
+    Sortable text form of an address, stored in ``networks.range_key`` for each
+    network's first address: the version, then fixed-width hex.
+    """
+    return f"{version}:{address:0{8 if version == 4 else 32}x}"
+
+
+class IpamRepository(ABC):
+    """
+    Storage interface for IPAM tables (see IPAM_TABLES). Records are plain dicts
+    keyed by column name, including the table's primary key.
+    """
+
+    @abstractmethod
+    async def get(self, table: str, record_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list(self, table: str, after_id: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Return records with a primary key above ``after_id`` in key order, at most ``limit`` of them."""
+
+    def iter(self, table: str, after_id: int = 0, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """Stream a table like ``list`` without materialising more than one batch."""
+        return _iter_pages(lambda after, size: self.list(table, after, size), after_id, limit, IPAM_TABLES[table][0])
+
+    @abstractmethod
+    async def create(self, table: str, record: dict) -> dict:
+        """
+        Store a new record and return it with its assigned primary key.
+
+        Raises:
+            DuplicateKeyError: If the object_id is already taken.
+            ConstraintError: If the referenced parent record does not exist.
+            OverlapError: If a network overlaps another network of its block, or
+                a host's ip_address is already stored in its network.
+        """
+
+    @abstractmethod
+    async def delete(self, table: str, record_id: int) -> Optional[dict]:
+        """
+        Delete a record and return it, or None if it did not exist. Its tag
+        links are deleted with it.
+
+        Raises:
+            ConstraintError: If other records still reference it.
+        """
+
+    @abstractmethod
+    async def get_many(self, table: str, record_ids: List[int]) -> List[dict]:
+        """Return the records with the given primary keys that exist, in key order."""
+
+    @abstractmethod
+    async def list_children(self, table: str, parent_id: int) -> Tuple[int, List[dict]]:
+        """
+        Return the records of ``table`` (networks or hosts) under one block or
+        network, in key order, and the last change seq they reflect.
+        """
+
+    @abstractmethod
+    async def changes(self, after_seq: int, limit: Optional[int] = None) -> Tuple[int, List[dict]]:
+        """
+        Return the last seq read and the writes made by other processes after
+        ``after_seq``, in seq order, as ``{seq, table, op, record_id, tag_id, record}``.
+        Op is "create" or "delete" of a record (tables blocks, networks, hosts
+        and tags), or "attach" or "detach" of ``tag_id`` to a record, which
+        carry no ``record``. At most ``limit`` log entries are read.
+
+        Raises:
+            ChangesTruncated: If some changes after ``after_seq`` were dropped.
+        """
+
+    @abstractmethod
+    async def last_change_seq(self) -> int:
+        """Return the seq of the latest change; start ``changes`` from it before loading the tables."""
+
+    @abstractmethod
+    async def list_tags(self) -> List[dict]:
+        """Return every tag as ``{tag_id, name, tag_group_id, group}``, in tag_id order."""
+
+    @abstractmethod
+    async def create_tag(self, group: str, name: str) -> dict:
+        """
+        Create a tag, and its group if that does not exist yet.
+
+        Raises:
+            DuplicateKeyError: If the group already has a tag with this name.
+        """
+
+    @abstractmethod
+    async def list_tag_links(
+        self, table: str, after: Tuple[int, int] = (0, 0), limit: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """Return ``(record_id, tag_id)`` pairs of ``table`` above ``after``, in that order."""
+
+    async def iter_tag_links(self, table: str) -> AsyncIterator[List[Tuple[int, int]]]:
+        """Stream all tag links of ``table`` one batch at a time."""
+        after = (0, 0)
+        while True:
+            page = await self.list_tag_links(table, after, STREAM_BATCH_SIZE)
+            if page:
+                yield page
+            if len(page) < STREAM_BATCH_SIZE:
+                return
+            after = page[-1]
+
+    @abstractmethod
+    async def attach_tag(self, table: str, record_id: int, tag_id: int) -> bool:
+        """
+        Tag a record; False if it already had the tag.
+
+        Raises:
+            ConstraintError: If the record or the tag does not exist.
+        """
+
+    @abstractmethod
+    async def detach_tag(self, table: str, record_id: int, tag_id: int) -> bool:
+        """Untag a record; False if it did not have the tag."""
+
+
+def _check_ownership(found: Dict[int, int], owner_id: int, item_ids: List[int]):
+    """Raise BulkConflict unless every id in ``item_ids`` maps to ``owner_id`` in ``found``."""
+    missing = [i for i in item_ids if i not in found]
+    forbidden = [i for i in item_ids if i in found and found[i] != owner_id]
+    if missing or forbidden:
+        raise BulkConflict(missing, forbidden)
+
+
+# ==================================================
+# IN-MEMORY BACKEND
+# ==================================================
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self, users: Dict[str, dict]):
+        super().__init__()
+        self._users = users
+
+    async def get_by_username(self, username):
+        return self._users.get(username)
+
+    async def list(self, after_id=0, limit=None):
+        users = sorted((u for u in self._users.values() if u["id"] > after_id), key=lambda u: u["id"])
+        return users if limit is None else users[:limit]
+
+    async def create(self, username, email, hashed_password):
+        if username in self._users:
+            raise DuplicateKeyError(username)
+        user = {
+            "id": max((u["id"] for u in self._users.values()), default=0) + 1,
+            "username": username,
+            "email": email,
+            "hashed_password": hashed_password,
+            "is_active": True
+        }
+        self._users[username] = user
+        return user
+
+    async def update(self, username, changes):
+        user = self._users.get(username)
+        if user is None:
+            return None
+        user.update({k: v for k, v in changes.items() if k not in ("id", "username")})
+        self._notify(username)
+        return user
+
+
+class MemoryItemRepository(ItemRepository):
+    def __init__(self, store: ItemStore):
+        super().__init__()
+        self._store = store
+
+    async def get(self, item_id):
+        return self._store.get(item_id)
+
+    async def list_by_owner(self, owner_id, after_id=0, limit=None):
+        return self._store.list_by_owner(owner_id, after_id, limit)
+
+    async def owner_version(self, owner_id):
+        return self._store.version(owner_id)
+
+    async def changes(self, owner_id, since, limit=None):
+        if since < self._store.changes.trimmed_through(owner_id):
+            raise ChangesTruncated(since)
+        return self._store.changes.since(owner_id, since, limit)
+
+    async def last_change_seq(self):
+        return self._store.changes.last_seq
+
+    async def changed_owners(self, after_seq):
+        return self._store.changes.last_seq, self._store.changes.changed_owners(after_seq)
+
+    async def create(self, item):
+        item = self._store.add(item)
+        self._notify([item["owner_id"]])
+        return item
+
+    async def update(self, item_id, changes):
+        # The store records a write only when a value changed; a no-op wakes nobody
+        last_seq = self._store.changes.last_seq
+        item = self._store.update(item_id, changes)
+        if self._store.changes.last_seq != last_seq:
+            self._notify([item["owner_id"]])
+        return item
+
+    async def delete(self, item_id):
+        item = self._store.delete(item_id)
+        if item is not None:
+            self._notify([item["owner_id"]])
+        return item
+
+    # Nothing below awaits, so each bulk call runs to completion without interleaving
+
+    async def create_many(self, items):
+        items = [self._store.add(item) for item in items]
+        self._notify(item["owner_id"] for item in items)
+        return items
+
+    async def update_many(self, owner_id, updates):
+        item_ids = [update["id"] for update in updates]
+        _check_ownership(self._owners(item_ids), owner_id, item_ids)
+        last_seq = self._store.changes.last_seq
+        items = [self._store.update(update["id"], update) for update in updates]
+        if self._store.changes.last_seq != last_seq:
+            self._notify([owner_id])
+        return items
+
+    async def delete_many(self, owner_id, item_ids):
+        _check_ownership(self._owners(item_ids), owner_id, item_ids)
+        items = [self._store.delete(item_id) for item_id in item_ids]
+        self._notify([owner_id])
+        return items
+
+    def _owners(self, item_ids):
+        owners = {}
+        for item_id in item_ids:
+            item = self._store.get(item_id)
+            if item is not None:
+                owners[item_id] = item["owner_id"]
+        return owners
+
+
+class MemoryRevokedTokenRepository(RevokedTokenRepository):
+    def __init__(self):
+        self._revoked = RevocationStore()
+
+    async def consume(self, token_id, expires_at):
+        return self._revoked.add(token_id, expires_at)
+
+    async def revoke(self, token_id, expires_at):
+        self._revoked.add(token_id, expires_at)
+
+    async def is_revoked(self, token_id):
+        return token_id in self._revoked
+
+
+class MemoryConfigRepository(ConfigRepository):
+    def __init__(self):
+        self._rows: Dict[str, dict] = {}
+        self._version = 0
+
+    async def load(self):
+        return [dict(row) for row in self._rows.values()]
+
+    async def version(self):
+        return self._version
+
+    async def set(self, key, value, category=None, description=None):
+        row = self._rows.get(key) or {"config_key": key, "category": None, "description": None}
+        row.update(config_value=value, updated_at=datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d %H:%M:%S"))
+        if category is not None:
+            row["category"] = category
+        if description is not None:
+            row["description"] = description
+        self._rows[key] = row
+        self._version += 1
+        return dict(row)
+
+
+class MemoryIpamRepository(IpamRepository):
+    def __init__(self):
+        self._tables: Dict[str, Dict[int, dict]] = {table: {} for table in IPAM_TABLES}
+        self._ids: Dict[str, List[int]] = {table: [] for table in IPAM_TABLES}
+        self._last_id: Dict[str, int] = {table: 0 for table in IPAM_TABLES}
+        self._object_ids: Dict[str, set] = {table: set() for table in IPAM_TABLES}
+        # (table, id) -> number of records referencing it
+        self._references: Dict[tuple, int] = {}
+        # block_id -> {network_id: network}, and (network_id, ip_address) of stored hosts
+        self._block_networks: Dict[int, Dict[int, Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]] = {}
+        self._host_addresses: Set[Tuple[int, str]] = set()
+        self._tag_groups: Dict[str, int] = {}
+        self._tags: Dict[int, dict] = {}
+        # Sorted (record_id, tag_id) pairs per table
+        self._links: Dict[str, List[Tuple[int, int]]] = {table: [] for table in TAG_LINK_TABLES}
+
+    async def get(self, table, record_id):
+        return self._tables[table].get(record_id)
+
+    async def list(self, table, after_id=0, limit=None):
+        ids = self._ids[table]
+        start = bisect.bisect_right(ids, after_id)
+        end = len(ids) if limit is None else start + limit
+        return [self._tables[table][record_id] for record_id in ids[start:end]]
+
+    async def create(self, table, record):
+        key, columns = IPAM_TABLES[table]
+        if record["object_id"] in self._object_ids[table]:
+            raise DuplicateKeyError(record["object_id"])
+        parent = IPAM_PARENTS.get(table)
+        if parent is not None and record.get(parent[0]) not in self._tables[parent[1]]:
+            raise ConstraintError(f"{parent[1]} {record.get(parent[0])} does not exist")
+        network = None
+        if table == "networks":
+            network = ipaddress.ip_network(record["cidr"])
+            if any(network.overlaps(other) for other in self._block_networks.get(record["block_id"], {}).values()):
+                raise OverlapError(f"{network} overlaps a network in block {record['block_id']}")
+        elif table == "hosts" and (record["network_id"], record.get("ip_address")) in self._host_addresses:
+            raise OverlapError(f"{record['ip_address']} is already taken in network {record['network_id']}")
+        self._last_id[table] += 1
+        stored = {key: self._last_id[table], **{column: record.get(column) for column in columns}}
+        self._tables[table][stored[key]] = stored
+        self._ids[table].append(stored[key])
+        self._object_ids[table].add(stored["object_id"])
+        if parent is not None:
+            ref = (parent[1], stored[parent[0]])
+            self._references[ref] = self._references.get(ref, 0) + 1
+        if network is not None:
+            self._block_networks.setdefault(stored["block_id"], {})[stored["network_id"]] = network
+        elif table == "hosts" and stored["ip_address"] is not None:
+            self._host_addresses.add((stored["network_id"], stored["ip_address"]))
+        return stored
+
+    async def delete(self, table, record_id):
+        record = self._tables[table].get(record_id)
+        if record is None:
+            return None
+        if self._references.get((table, record_id)):
+            raise ConstraintError(f"{table} {record_id} is still referenced")
+        del self._tables[table][record_id]
+        ids = self._ids[table]
+        del ids[bisect.bisect_left(ids, record_id)]
+        self._object_ids[table].discard(record["object_id"])
+        parent = IPAM_PARENTS.get(table)
+        if parent is not None:
+            self._references[(parent[1], record[parent[0]])] -= 1
+        if table == "networks":
+            del self._block_networks[record["block_id"]][record_id]
+        elif table == "hosts":
+            self._host_addresses.discard((record["network_id"], record["ip_address"]))
+        links = self._links.get(table)
+        if links is not None:
+            del links[bisect.bisect_left(links, (record_id, 0)):bisect.bisect_left(links, (record_id + 1, 0))]
+        return record
+
+    async def get_many(self, table, record_ids):
+        rows = self._tables[table]
+        return [rows[record_id] for record_id in sorted(set(record_ids)) if record_id in rows]
+
+    async def list_children(self, table, parent_id):
+        column = IPAM_PARENTS[table][0]
+        return 0, [self._tables[table][record_id] for record_id in self._ids[table]
+                   if self._tables[table][record_id][column] == parent_id]
+
+    async def changes(self, after_seq, limit=None):
+        # Only this process writes to memory
+        return after_seq, []
+
+    async def last_change_seq(self):
+        return 0
+
+    async def list_tags(self):
+        return list(self._tags.values())
+
+    async def create_tag(self, group, name):
+        group_id = self._tag_groups.setdefault(group, len(self._tag_groups) + 1)
+        if any(tag["tag_group_id"] == group_id and tag["name"] == name for tag in self._tags.values()):
+            raise DuplicateKeyError(f"{group}:{name}")
+        tag = {"tag_id": len(self._tags) + 1, "name": name, "tag_group_id": group_id, "group": group}
+        self._tags[tag["tag_id"]] = tag
+        return tag
+
+    async def list_tag_links(self, table, after=(0, 0), limit=None):
+        links = self._links[table]
+        start = bisect.bisect_right(links, tuple(after))
+        return links[start:] if limit is None else links[start:start + limit]
+
+    async def attach_tag(self, table, record_id, tag_id):
+        if record_id not in self._tables[table]:
+            raise ConstraintError(f"{table} {record_id} does not exist")
+        if tag_id not in self._tags:
+            raise ConstraintError(f"tag {tag_id} does not exist")
+        links = self._links[table]
+        i = bisect.bisect_left(links, (record_id, tag_id))
+        if i < len(links) and links[i] == (record_id, tag_id):
+            return False
+        links.insert(i, (record_id, tag_id))
+        return True
+
+    async def detach_tag(self, table, record_id, tag_id):
+        links = self._links[table]
+        i = bisect.bisect_left(links, (record_id, tag_id))
+        if i < len(links) and links[i] == (record_id, tag_id):
+            del links[i]
+            return True
+        return False
+
+
+# ==================================================
+# SQLITE BACKEND
+# ==================================================
+
+USER_COLUMNS = "id, username, email, hashed_password, is_active"
+ITEM_COLUMNS = "id, name, description, price, owner_id"
+USER_UPDATABLE = ("email", "hashed_password", "is_active")
+ITEM_UPDATABLE = ("name", "description", "price")
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+SQLITE_MAX_PARAMS = 500
+
+
+def _user_from_row(row) -> Optional[dict]:
+    if row is None:
+        return None
+    user = dict(row)
+    user["is_active"] = bool(user["is_active"])
+    return user
+
+
+def _item_from_row(row) -> Optional[dict]:
+    return None if row is None else dict(row)
+
+
+def _change_from_row(row) -> dict:
+    change = dict(row)
+    item = {key: change.pop(key) for key in ("id", "name", "description", "price", "owner_id")}
+    change["id"] = item["id"]
+    change["item"] = None if change["op"] == "delete" else item
+    return change
+
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, pool: SQLitePool):
+        super().__init__()
+        self._pool = pool
+
+    async def get_by_username(self, username):
+        def _get(conn):
+            row = conn.execute(
+                f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,)
+            ).fetchone()
+            return _user_from_row(row)
+        return await self._pool.run(_get)
+
+    async def list(self, after_id=0, limit=None):
+        def _list(conn):
+            rows = conn.execute(
+                f"SELECT {USER_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, -1 if limit is None else limit),
+            ).fetchall()
+            return [_user_from_row(row) for row in rows]
+        return await self._pool.run(_list)
+
+    async def create(self, username, email, hashed_password):
+        def _create(conn):
+            try:
+                row = conn.execute(
+                    f"INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?) "
+                    f"RETURNING {USER_COLUMNS}",
+                    (username, email, hashed_password),
+                ).fetchone()
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(username) from e
+            return _user_from_row(row)
+        return await self._pool.transaction(_create)
+
+    async def update(self, username, changes):
+        fields = [k for k in USER_UPDATABLE if k in changes]
+
+        def _update(conn):
+            if not fields:
+                row = conn.execute(
+                    f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,)
+                ).fetchone()
+                return _user_from_row(row)
+            assignments = ", ".join(f"{k} = ?" for k in fields)
+            row = conn.execute(
+                f"UPDATE users SET {assignments} WHERE username = ? RETURNING {USER_COLUMNS}",
+                (*(changes[k] for k in fields), username),
+            ).fetchone()
+            return _user_from_row(row)
+        user = await self._pool.transaction(_update)
+        if fields:
+            self._notify(username)
+        return user
+
+
+class SQLiteItemRepository(ItemRepository):
+    """
+    Items in SQLite. Triggers on ``items`` keep the owner versions and the
+    change log in the writing transaction; the log is trimmed to about
+    ``change_log_size`` entries by writers, at most once a minute.
+    """
+
+    TRIM_INTERVAL = 60.0
+
+    def __init__(self, pool: SQLitePool, change_log_size: int = 100000):
+        super().__init__()
+        self._pool = pool
+        self.change_log_size = change_log_size
+        self._next_trim = 0.0
+
+    async def get(self, item_id):
+        def _get(conn):
+            row = conn.execute(f"SELECT {ITEM_COLUMNS} FROM items WHERE id = ?", (item_id,)).fetchone()
+            return _item_from_row(row)
+        return await self._pool.run(_get)
+
+    async def list_by_owner(self, owner_id, after_id=0, limit=None):
+        def _list(conn):
+            rows = conn.execute(
+                f"SELECT {ITEM_COLUMNS} FROM items WHERE owner_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (owner_id, after_id, -1 if limit is None else limit),
+            ).fetchall()
+            return [_item_from_row(row) for row in rows]
+        return await self._pool.run(_list)
+
+    async def owner_version(self, owner_id):
+        # Maintained by triggers on items, in the same transaction as the write
+        def _version(conn):
+            row = conn.execute("SELECT version FROM item_versions WHERE owner_id = ?", (owner_id,)).fetchone()
+            return 0 if row is None else row["version"]
+        return await self._pool.run(_version)
+
+    async def changes(self, owner_id, since, limit=None):
+        def _changes(conn):
+            # One read transaction, so the trim horizon and the rows agree
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute(
+                    "SELECT trimmed_seq FROM item_change_trims WHERE owner_id = ?", (owner_id,)
+                ).fetchone()
+                if row is not None and since < row["trimmed_seq"]:
+                    raise ChangesTruncated(since)
+                rows = conn.execute(
+                    "SELECT seq, op, item_id AS id, name, description, price, owner_id FROM item_changes "
+                    "WHERE owner_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (owner_id, since, -1 if limit is None else limit),
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+            return [_change_from_row(row) for row in rows]
+        return await self._pool.run(_changes)
+
+    async def last_change_seq(self):
+        def _last(conn):
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM item_changes").fetchone()[0]
+        return await self._pool.run(_last)
+
+    async def changed_owners(self, after_seq):
+        def _changed(conn):
+            rows = conn.execute(
+                "SELECT owner_id, MAX(seq) AS seq FROM item_changes WHERE seq > ? GROUP BY owner_id", (after_seq,)
+            ).fetchall()
+            return max((row["seq"] for row in rows), default=after_seq), {row["owner_id"] for row in rows}
+        return await self._pool.run(_changed)
+
+    def _trim(self, conn):
+        now = time.monotonic()
+        if now < self._next_trim:
+            return
+        self._next_trim = now + self.TRIM_INTERVAL
+        cutoff = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM item_changes").fetchone()[0] - self.change_log_size
+        if cutoff <= 0:
+            return
+        conn.execute(
+            "INSERT INTO item_change_trims (owner_id, trimmed_seq) "
+            "SELECT owner_id, MAX(seq) FROM item_changes WHERE seq <= ? GROUP BY owner_id "
+            "ON CONFLICT (owner_id) DO UPDATE SET trimmed_seq = excluded.trimmed_seq",
+            (cutoff,),
+        )
+        conn.execute("DELETE FROM item_changes WHERE seq <= ?", (cutoff,))
+
+    async def create(self, item):
+        def _create(conn):
+            self._trim(conn)
+            row = conn.execute(
+                f"INSERT INTO items (name, description, price, owner_id) VALUES (?, ?, ?, ?) "
+                f"RETURNING {ITEM_COLUMNS}",
+                (item["name"], item.get("description"), item["price"], item["owner_id"]),
+            ).fetchone()
+            return _item_from_row(row)
+        item = await self._pool.transaction(_create)
+        self._notify([item["owner_id"]])
+        return item
+
+    async def update(self, item_id, changes):
+        def _update(conn):
+            self._trim(conn)
+            return _update_item(conn, item_id, changes)
+        item, changed = await self._pool.transaction(_update)
+        if changed:
+            self._notify([item["owner_id"]])
+        return item
+
+    async def delete(self, item_id):
+        def _delete(conn):
+            self._trim(conn)
+            row = conn.execute(f"DELETE FROM items WHERE id = ? RETURNING {ITEM_COLUMNS}", (item_id,)).fetchone()
+            return _item_from_row(row)
+        item = await self._pool.transaction(_delete)
+        if item is not None:
+            self._notify([item["owner_id"]])
+        return item
+
+    async def create_many(self, items):
+        def _create_many(conn):
+            self._trim(conn)
+            return [
+                _item_from_row(conn.execute(
+                    f"INSERT INTO items (name, description, price, owner_id) VALUES (?, ?, ?, ?) "
+                    f"RETURNING {ITEM_COLUMNS}",
+                    (item["name"], item.get("description"), item["price"], item["owner_id"]),
+                ).fetchone())
+                for item in items
+            ]
+        items = await self._pool.transaction(_create_many)
+        self._notify(item["owner_id"] for item in items)
+        return items
+
+    async def update_many(self, owner_id, updates):
+        item_ids = [update["id"] for update in updates]
+
+        def _update_many(conn):
+            _check_ownership(_owners(conn, item_ids), owner_id, item_ids)
+            self._trim(conn)
+            return [_update_item(conn, update["id"], update) for update in updates]
+        results = await self._pool.transaction(_update_many)
+        if any(changed for _, changed in results):
+            self._notify([owner_id])
+        return [item for item, _ in results]
+
+    async def delete_many(self, owner_id, item_ids):
+        def _delete_many(conn):
+            _check_ownership(_owners(conn, item_ids), owner_id, item_ids)
+            self._trim(conn)
+            return [
+                _item_from_row(conn.execute(
+                    f"DELETE FROM items WHERE id = ? RETURNING {ITEM_COLUMNS}", (item_id,)
+                ).fetchone())
+                for item_id in item_ids
+            ]
+        items = await self._pool.transaction(_delete_many)
+        self._notify([owner_id])
+        return items
+
+
+def _update_item(conn, item_id: int, changes: dict) -> Tuple[Optional[dict], bool]:
+    """
+    Apply ``changes`` to an item; (the item or None if it does not exist, whether a value changed).
+
+    Rows whose values already match are not written, so a no-op update fires
+    no trigger: updated_at, the owner's version and the change log stay as they are.
+    """
+    fields = [k for k in ITEM_UPDATABLE if k in changes]
+    if fields:
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        differs = " OR ".join(f"{k} IS NOT ?" for k in fields)
+        values = [changes[k] for k in fields]
+        row = conn.execute(
+            f"UPDATE items SET {assignments} WHERE id = ? AND ({differs}) RETURNING {ITEM_COLUMNS}",
+            (*values, item_id, *values),
+        ).fetchone()
+        if row is not None:
+            return _item_from_row(row), True
+    row = conn.execute(f"SELECT {ITEM_COLUMNS} FROM items WHERE id = ?", (item_id,)).fetchone()
+    return _item_from_row(row), False
+
+
+def _owners(conn, item_ids: List[int]) -> Dict[int, int]:
+    """Map each existing id in ``item_ids`` to its owner_id."""
+    owners = {}
+    unique_ids = list(set(item_ids))
+    for start in range(0, len(unique_ids), SQLITE_MAX_PARAMS):
+        chunk = unique_ids[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ", ".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT id, owner_id FROM items WHERE id IN ({placeholders})", chunk):
+            owners[row["id"]] = row["owner_id"]
+    return owners
+
+
+class SQLiteRevokedTokenRepository(RevokedTokenRepository):
+    """Revocations shared by every worker on the database; expired rows are purged at most once a minute."""
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, pool: SQLitePool):
+        self._pool = pool
+        self._next_purge = 0.0
+
+    async def consume(self, token_id, expires_at):
+        def _consume(conn):
+            self._purge(conn)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (token_id, expires_at) VALUES (?, ?)", (token_id, expires_at)
+            )
+            return cursor.rowcount == 1
+        return await self._pool.transaction(_consume)
+
+    async def revoke(self, token_id, expires_at):
+        def _revoke(conn):
+            self._purge(conn)
+            conn.execute(
+                "INSERT INTO revoked_tokens (token_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (token_id) DO UPDATE SET expires_at = MAX(expires_at, excluded.expires_at)",
+                (token_id, expires_at),
+            )
+        await self._pool.transaction(_revoke)
+
+    async def is_revoked(self, token_id):
+        def _is_revoked(conn):
+            row = conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE token_id = ? AND expires_at > ?", (token_id, time.time())
+            ).fetchone()
+            return row is not None
+        return await self._pool.run(_is_revoked)
+
+    def _purge(self, conn):
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + self.PURGE_INTERVAL
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+
+
+class SQLiteConfigRepository(ConfigRepository):
+    """
+    The version is the newest ``updated_at`` and the row count. ``updated_at``
+    has one-second resolution, so while the newest change is less than a
+    second old another write in the same second could leave it unchanged:
+    the version is then None and the caller keeps reloading until it settles.
+    """
+
+    def __init__(self, pool: SQLitePool):
+        self._pool = pool
+
+    async def load(self):
+        def _load(conn):
+            return [dict(row) for row in conn.execute(
+                "SELECT config_key, config_value, category, description, updated_at FROM app_configuration"
+            )]
+        return await self._pool.run(_load)
+
+    async def version(self):
+        def _version(conn):
+            return conn.execute(
+                "SELECT MAX(updated_at) AS updated_at, COUNT(*) AS count, "
+                "MAX(updated_at) >= datetime('now', '-1 second') AS recent FROM app_configuration"
+            ).fetchone()
+        row = await self._pool.run(_version)
+        return None if row["recent"] else (row["updated_at"], row["count"])
+
+    async def set(self, key, value, category=None, description=None):
+        def _set(conn):
+            return conn.execute(
+                "INSERT INTO app_configuration (config_key, config_value, category, description) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (config_key) DO UPDATE SET config_value = excluded.config_value, "
+                "category = COALESCE(excluded.category, category), "
+                "description = COALESCE(excluded.description, description), updated_at = CURRENT_TIMESTAMP "
+                "RETURNING config_key, config_value, category, description, updated_at",
+                (key, value, category, description),
+            ).fetchone()
+        return dict(await self._pool.transaction(_set))
+
+
+def _overlapping_network(conn, record: dict) -> bool:
+    """
+    Whether a stored network in the record's block overlaps its CIDR: one that
+    starts inside it (through networks.range_key), or one of its supernets.
+    """
+    network = ipaddress.ip_network(record["cidr"])
+    version = network.version
+    if conn.execute(
+        "SELECT 1 FROM networks WHERE block_id = ? AND range_key BETWEEN ? AND ? LIMIT 1",
+        (record["block_id"], address_key(version, int(network.network_address)),
+         address_key(version, int(network.broadcast_address))),
+    ).fetchone() is not None:
+        return True
+    supernets = [str(network.supernet(new_prefix=prefixlen)) for prefixlen in range(network.prefixlen)]
+    return bool(supernets) and conn.execute(
+        f"SELECT 1 FROM networks WHERE block_id = ? AND cidr IN ({', '.join('?' * len(supernets))}) LIMIT 1",
+        (record["block_id"], *supernets),
+    ).fetchone() is not None
+
+
+def _check_range(conn, table: str, record: dict):
+    """Raise OverlapError if the address space of a new network or host is already stored."""
+    if table == "networks" and _overlapping_network(conn, record):
+        raise OverlapError(f"{record['cidr']} overlaps a network in block {record['block_id']}")
+    if table == "hosts" and record.get("ip_address") is not None and conn.execute(
+        "SELECT 1 FROM hosts WHERE network_id = ? AND ip_address = ?", (record["network_id"], record["ip_address"])
+    ).fetchone() is not None:
+        raise OverlapError(f"{record['ip_address']} is already taken in network {record['network_id']}")
+
+
+def _ipam_change_from_row(row) -> dict:
+    return {
+        "seq": row["seq"], "table": row["table_name"], "op": row["op"], "record_id": row["record_id"],
+        "tag_id": row["tag_id"], "record": None if row["record"] is None else json.loads(row["record"]),
+    }
+
+
+class SQLiteIpamRepository(IpamRepository):
+    """
+    IPAM tables in SQLite. Every block, network, host and tag write appends
+    to ``ipam_changes`` in its transaction, tagged with the writing process,
+    so other workers can apply it to their in-memory indexes. The log is
+    trimmed to about ``change_log_size`` entries, like item_changes.
+    """
+
+    TRIM_INTERVAL = 60.0
+
+    def __init__(self, pool: SQLitePool, change_log_size: int = 100000):
+        self._pool = pool
+        self.change_log_size = change_log_size
+        self._next_trim = 0.0
+        self._origin: Tuple[Optional[int], str] = (None, "")
+
+    @property
+    def origin(self) -> str:
+        """Tag of this process's changes; a forked worker gets its own."""
+        pid = os.getpid()
+        if self._origin[0] != pid:
+            self._origin = (pid, uuid.uuid4().hex)
+        return self._origin[1]
+
+    def _log(self, conn, table: str, op: str, record_id: int, record: Optional[dict] = None,
+             tag_id: Optional[int] = None):
+        self._trim(conn)
+        conn.execute(
+            "INSERT INTO ipam_changes (origin, table_name, op, record_id, tag_id, record) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.origin, table, op, record_id, tag_id, None if record is None else json.dumps(record)),
+        )
+
+    def _trim(self, conn):
+        now = time.monotonic()
+        if now < self._next_trim:
+            return
+        self._next_trim = now + self.TRIM_INTERVAL
+        cutoff = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ipam_changes").fetchone()[0] - self.change_log_size
+        if cutoff <= 0:
+            return
+        conn.execute(
+            "INSERT INTO ipam_change_trims (trim_id, trimmed_seq) VALUES (1, ?) "
+            "ON CONFLICT (trim_id) DO UPDATE SET trimmed_seq = excluded.trimmed_seq",
+            (cutoff,),
+        )
+        conn.execute("DELETE FROM ipam_changes WHERE seq <= ?", (cutoff,))
+
+    async def get(self, table, record_id):
+        key, columns = IPAM_TABLES[table]
+
+        def _get(conn):
+            row = conn.execute(
+                f"SELECT {key}, {', '.join(columns)} FROM {table} WHERE {key} = ?", (record_id,)
+            ).fetchone()
+            return _item_from_row(row)
+        return await self._pool.run(_get)
+
+    async def list(self, table, after_id=0, limit=None):
+        key, columns = IPAM_TABLES[table]
+
+        def _list(conn):
+            rows = conn.execute(
+                f"SELECT {key}, {', '.join(columns)} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                (after_id, -1 if limit is None else limit),
+            ).fetchall()
+            return [_item_from_row(row) for row in rows]
+        return await self._pool.run(_list)
+
+    async def create(self, table, record):
+        key, columns = IPAM_TABLES[table]
+        names, values = list(columns), [record.get(column) for column in columns]
+        if table == "networks":
+            network = ipaddress.ip_network(record["cidr"])
+            names.append("range_key")
+            values.append(address_key(network.version, int(network.network_address)))
+
+        def _create(conn):
+            # Another worker may have used the range since this one's allocator last saw it
+            _check_range(conn, table, record)
+            try:
+                row = conn.execute(
+                    f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                    f"RETURNING {key}, {', '.join(columns)}",
+                    values,
+                ).fetchone()
+            except sqlite3.IntegrityError as e:
+                if f"{table}.object_id" in str(e):
+                    raise DuplicateKeyError(record["object_id"]) from e
+                if "UNIQUE" in str(e):
+                    raise OverlapError(str(e)) from e
+                raise ConstraintError(str(e)) from e
+            created = _item_from_row(row)
+            self._log(conn, table, "create", created[IPAM_TABLES[table][0]], created)
+            return created
+        return await self._pool.transaction(_create)
+
+    async def delete(self, table, record_id):
+        key, columns = IPAM_TABLES[table]
+
+        def _delete(conn):
+            try:
+                row = conn.execute(
+                    f"DELETE FROM {table} WHERE {key} = ? RETURNING {key}, {', '.join(columns)}", (record_id,)
+                ).fetchone()
+            except sqlite3.IntegrityError as e:
+                raise ConstraintError(str(e)) from e
+            deleted = _item_from_row(row)
+            if deleted is not None:
+                self._log(conn, table, "delete", record_id, deleted)
+            return deleted
+        return await self._pool.transaction(_delete)
+
+    async def get_many(self, table, record_ids):
+        key, columns = IPAM_TABLES[table]
+        unique_ids = sorted(set(record_ids))
+
+        def _get_many(conn):
+            records = []
+            for start in range(0, len(unique_ids), SQLITE_MAX_PARAMS):
+                chunk = unique_ids[start:start + SQLITE_MAX_PARAMS]
+                rows = conn.execute(
+                    f"SELECT {key}, {', '.join(columns)} FROM {table} "
+                    f"WHERE {key} IN ({', '.join('?' * len(chunk))}) ORDER BY {key}",
+                    chunk,
+                ).fetchall()
+                records.extend(_item_from_row(row) for row in rows)
+            return records
+        return await self._pool.run(_get_many)
+
+    async def list_children(self, table, parent_id):
+        key, columns = IPAM_TABLES[table]
+
+        def _list_children(conn):
+            # One read transaction, so the seq and the rows agree
+            conn.execute("BEGIN")
+            try:
+                seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ipam_changes").fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT {key}, {', '.join(columns)} FROM {table} "
+                    f"WHERE {IPAM_PARENTS[table][0]} = ? ORDER BY {key}",
+                    (parent_id,),
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+            return seq, [_item_from_row(row) for row in rows]
+        return await self._pool.run(_list_children)
+
+    async def changes(self, after_seq, limit=None):
+        origin = self.origin
+
+        def _changes(conn):
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute("SELECT trimmed_seq FROM ipam_change_trims").fetchone()
+                if row is not None and after_seq < row["trimmed_seq"]:
+                    raise ChangesTruncated(after_seq)
+                rows = conn.execute(
+                    "SELECT seq, origin, table_name, op, record_id, tag_id, record FROM ipam_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (after_seq, -1 if limit is None else limit),
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+            last = rows[-1]["seq"] if rows else after_seq
+            return last, [_ipam_change_from_row(row) for row in rows if row["origin"] != origin]
+        return await self._pool.run(_changes)
+
+    async def last_change_seq(self):
+        def _last(conn):
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ipam_changes").fetchone()[0]
+        return await self._pool.run(_last)
+
+    async def list_tags(self):
+        def _list_tags(conn):
+            rows = conn.execute(
+                "SELECT t.tag_id, t.name, t.tag_group_id, g.name AS \"group\" FROM tags t "
+                "JOIN tag_groups g ON g.tag_group_id = t.tag_group_id ORDER BY t.tag_id"
+            ).fetchall()
+            return [_item_from_row(row) for row in rows]
+        return await self._pool.run(_list_tags)
+
+    async def create_tag(self, group, name):
+        def _create_tag(conn):
+            conn.execute("INSERT OR IGNORE INTO tag_groups (name) VALUES (?)", (group,))
+            group_id = conn.execute("SELECT tag_group_id FROM tag_groups WHERE name = ?", (group,)).fetchone()[0]
+            try:
+                row = conn.execute(
+                    "INSERT INTO tags (name, tag_group_id) VALUES (?, ?) RETURNING tag_id, name, tag_group_id",
+                    (name, group_id),
+                ).fetchone()
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(f"{group}:{name}") from e
+            created = {**_item_from_row(row), "group": group}
+            self._log(conn, "tags", "create", created["tag_id"], created)
+            return created
+        return await self._pool.transaction(_create_tag)
+
+    async def list_tag_links(self, table, after=(0, 0), limit=None):
+        key = IPAM_TABLES[table][0]
+        link_table = TAG_LINK_TABLES[table]
+
+        def _list_tag_links(conn):
+            return [tuple(row) for row in conn.execute(
+                f"SELECT {key}, tag_id FROM {link_table} WHERE ({key}, tag_id) > (?, ?) "
+                f"ORDER BY {key}, tag_id LIMIT ?",
+                (*after, -1 if limit is None else limit),
+            )]
+        return await self._pool.run(_list_tag_links)
+
+    async def attach_tag(self, table, record_id, tag_id):
+        key = IPAM_TABLES[table][0]
+        link_table = TAG_LINK_TABLES[table]
+
+        def _attach(conn):
+            try:
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO {link_table} ({key}, tag_id) VALUES (?, ?)", (record_id, tag_id)
+                )
+            except sqlite3.IntegrityError as e:
+                raise ConstraintError(str(e)) from e
+            if cursor.rowcount != 1:
+                return False
+            self._log(conn, table, "attach", record_id, tag_id=tag_id)
+            return True
+        return await self._pool.transaction(_attach)
+
+    async def detach_tag(self, table, record_id, tag_id):
+        key = IPAM_TABLES[table][0]
+        link_table = TAG_LINK_TABLES[table]
+
+        def _detach(conn):
+            cursor = conn.execute(f"DELETE FROM {link_table} WHERE {key} = ? AND tag_id = ?", (record_id, tag_id))
+            if cursor.rowcount != 1:
+                return False
+            self._log(conn, table, "detach", record_id, tag_id=tag_id)
+            return True
+        return await self._pool.transaction(_detach)
@@ -0,0 +1,129 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Headers of a cached response that are replayed on a hit (Content-Type/Length are recomputed)
+REPLAYED_HEADERS = ("x-next-after-id",)
+
+
+class CachedBody(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    headers: Dict[str, str]
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body: a digest of its exact bytes."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches ``etag``.
+
+    If-None-Match uses the weak comparison (RFC 9110 13.1.2), so a ``W/``
+    prefix on the client's tags is ignored; ``*`` matches anything.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized response bodies, scoped per user.
+
+    Entries are keyed by ``(user_id, key)`` and stamped with the version of
+    the user's data they were rendered from. A lookup passes the current
+    version and an entry with any other version is dropped as stale, so a
+    write invalidates every cached view of that user's data at once, without
+    a scan, and a body is never served after the write that changed it.
+    Least-recently-used entries are dropped once ``max_size`` entries or
+    ``max_bytes`` of bodies are held.
+    """
+
+    def __init__(self, max_size: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_size: Maximum number of cached bodies.
+            max_bytes: Maximum total size of cached bodies, in bytes.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, CachedBody]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, key: Hashable, version: int) -> Optional[CachedBody]:
+        """Return the entry for ``(user_id, key)`` if it was rendered at ``version``, else None."""
+        entry = self._entries.get((user_id, key))
+        if entry is None or entry.version != version:
+            if entry is not None:
+                self._remove((user_id, key))
+            self.misses += 1
+            return None
+        self._entries.move_to_end((user_id, key))
+        self.hits += 1
+        return entry
+
+    def put(self, user_id: int, key: Hashable, version: int, body: bytes,
+            headers: Optional[Dict[str, str]] = None) -> CachedBody:
+        """
+        Cache ``body`` as rendered from the user's data at ``version``.
+
+        The version must be read before the data the body was rendered from;
+        a write in between then only makes the entry unreachable, never stale.
+        Bodies larger than ``max_bytes`` are returned but not kept.
+        """
+        entry = CachedBody(version, make_etag(body), body, headers or {})
+        if (user_id, key) in self._entries:
+            self._remove((user_id, key))
+        if len(body) > self.max_bytes:
+            return entry
+        self._entries[(user_id, key)] = entry
+        self._bytes += len(body)
+        while len(self._entries) > self.max_size or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: tuple):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def conditional_response(request: Request, entry: CachedBody, media_type: str = "application/json") -> Response:
+    """
+    Serve a cached body: 304 Not Modified if the client's If-None-Match
+    already names it, the body otherwise, with its ETag either way.
+
+    ``Cache-Control: private, no-cache`` lets the client keep the body but
+    makes it revalidate on every use, and keeps shared caches from storing
+    one user's data.
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type=media_type, headers={**entry.headers, **headers})
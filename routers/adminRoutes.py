@@ -1,16 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from models import User
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from typing import List, Optional
+from models import ConfigEntryUpdate, User
+import config
 import db
-from auth import get_current_active_user
+import profiling
+from auth import get_current_active_user, principal_cache
+from routers.itemRoutes import item_cache
+from serialization import trusted_response
+from streaming import MAX_PAGE_SIZE, ndjson_response, set_next_cursor, wants_ndjson
 
 router = APIRouter()
 
 # Admin route (example of role-based access)
 @router.get("/users", response_model=List[User])
-async def get_all_users(current_user: User = Depends(get_current_active_user)):
+async def get_all_users(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user)
+):
     # In a real app, you'd check for admin role here
     if current_user.username != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    return [User(**user) for user in db.fake_users_db.values()]
\ No newline at end of file
+    if wants_ndjson(request):
+        return ndjson_response(db.users.iter(after_id, limit), User)
+
+    users = await db.users.list(after_id, limit)
+    # The User projection drops hashed_password
+    response = trusted_response(users, User)
+    set_next_cursor(response, users, limit)
+    return response
+
+@router.get("/auth-cache", response_model=dict)
+async def get_auth_cache_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return principal_cache.stats()
+
+@router.get("/item-cache", response_model=dict)
+async def get_item_cache_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return item_cache.stats()
+
+@router.get("/profiles", response_model=List[dict])
+async def list_profiles(current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return profiling.profiles.list()
+
+@router.get("/profiles/{profile_id}", response_model=dict)
+async def get_profile(profile_id: int, current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    profile = profiling.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {key: value for key, value in profile.items() if key != "data"}
+
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: int, current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    profile = profiling.profiles.get(profile_id)
+    if profile is None or profile.get("data") is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    # cProfile data loads with pstats.Stats / snakeviz; sampled stacks are folded for flame graph tools
+    if profile["profiler"] == "cprofile":
+        filename, media_type = f"profile-{profile_id}.prof", "application/octet-stream"
+    else:
+        filename, media_type = f"profile-{profile_id}.folded", "text/plain"
+    return Response(profile["data"], media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/config", response_model=dict)
+async def get_config(current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return config.current().as_dict()
+
+@router.put("/config/{key}", response_model=dict)
+async def set_config(key: str, update: ConfigEntryUpdate, current_user: User = Depends(get_current_active_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    value = None if update.value is None else config.encode_value(update.value)
+    setting = config.SETTINGS.get(key)
+    if setting is not None:
+        try:
+            setting.parse(config.decode_value(value))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Invalid value for {key}")
+    entry = await db.app_config.set(key, value, update.category, update.description)
+    # Apply here at once; other workers pick the change up on their next check
+    await config.settings.reload()
+    return entry
@@ -1,42 +1,74 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 import datetime
-from models import UserCreate, UserLogin, Token
+from typing import Optional
+from models import UserCreate, UserLogin, Token, RefreshRequest
 import db
-from auth import verify_password, get_password_hash, create_access_token
+from repository import DuplicateKeyError
+from auth import (
+    create_access_token, create_refresh_token, decode_refresh_token, get_password_hash_async,
+    verify_and_update_async,
+)
+import config
 import logging
-import os
+import ratelimit
+import time
 
 logger = logging.getLogger("FastAPI_Boilerplate")
 router = APIRouter()
 
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Per route rather than on the router: refresh and logout get their own, looser IP bucket
+password_limits = ratelimit.dependencies("auth", authenticated=False)
+token_limits = ratelimit.dependencies("auth_token", authenticated=False)
+
+def _issue_tokens(username: str, family: Optional[str] = None) -> dict:
+    expire_minutes = config.current().get_int("auth.access.token.expire.minutes")
+    access_token = create_access_token(
+        data={"sub": username}, expires_delta=datetime.timedelta(minutes=expire_minutes)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(username, family),
+        "expires_in": expire_minutes * 60,
+    }
+
+def _refresh_token_lifetime() -> int:
+    return config.current().get_int("auth.refresh.token.expire.days") * 86400
+
+def _refresh_denied(detail: str = "Invalid refresh token"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 # Authentication routes
-@router.post("/register", response_model=dict)
+@router.post("/register", response_model=dict, dependencies=password_limits)
 async def register(user: UserCreate):
-    if user.username in db.fake_users_db:
+    if await db.users.get_by_username(user.username) is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    hashed_password = get_password_hash(user.password)
-    db.fake_users_db[user.username] = {
-        "id": len(db.fake_users_db) + 1,
-        "username": user.username,
-        "email": user.email,
-        "hashed_password": hashed_password,
-        "is_active": True
-    }
+    hashed_password = await get_password_hash_async(user.password)
+    try:
+        await db.users.create(user.username, user.email, hashed_password)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
     
     return {"message": "User created successfully"}
 
-@router.post("/login", response_model=Token,)
+@router.post("/login", response_model=Token, dependencies=password_limits)
 async def login(user: UserLogin):
-    db_user = db.fake_users_db.get(user.username)
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    db_user = await db.users.get_by_username(user.username)
+    valid, new_hash = (False, None)
+    if db_user:
+        valid, new_hash = await verify_and_update_async(user.password, db_user["hashed_password"])
+    if not valid:
         logger.warning(f"Failed login attempt for user: {user.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,8 +76,39 @@ async def login(user: UserLogin):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    # The stored hash used another bcrypt cost (BCRYPT_ROUNDS changed): store it at the current one
+    if new_hash is not None:
+        await db.users.update(user.username, {"hashed_password": new_hash})
+    
+    return _issue_tokens(user.username)
+
+@router.post("/refresh", response_model=Token, dependencies=token_limits)
+async def refresh(request: RefreshRequest):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Refresh tokens are single use. Presenting one a second time means it
+    leaked or was replayed, so the whole chain rotated from that login is
+    revoked and the client has to log in again.
+    """
+    payload = decode_refresh_token(request.refresh_token)
+    family = f"family:{payload['fam']}"
+    if await db.revoked_tokens.is_revoked(family):
+        raise _refresh_denied()
+    if not await db.revoked_tokens.consume(f"refresh:{payload['jti']}", payload["exp"]):
+        logger.warning(f"Refresh token reuse for user: {payload['sub']}; revoking its token family")
+        await db.revoked_tokens.revoke(family, time.time() + _refresh_token_lifetime())
+        raise _refresh_denied()
+    
+    db_user = await db.users.get_by_username(payload["sub"])
+    if db_user is None or not db_user["is_active"]:
+        raise _refresh_denied("User not found or inactive")
+    
+    return _issue_tokens(payload["sub"], payload["fam"])
+
+@router.post("/logout", response_model=dict, dependencies=token_limits)
+async def logout(request: RefreshRequest):
+    """Revoke the refresh token's whole chain; access tokens already issued run until they expire."""
+    payload = decode_refresh_token(request.refresh_token)
+    await db.revoked_tokens.revoke(f"family:{payload['fam']}", time.time() + _refresh_token_lifetime())
+    return {"message": "Logged out"}
\ No newline at end of file
@@ -0,0 +1,439 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Callable, Dict, List, Literal, Optional
+import ipaddress
+import uuid
+from models import (
+    IpamNode, IpamNodeCreate, IpamNodeMove, IpamNodeUpdate, IpamRollup, IpamWalkEntry,
+    Block, BlockCreate, Network, NetworkCreate, NetworkAllocate, Host, HostCreate, HostAllocate,
+    FreeSpace, LookupRequest, LookupResult, Tag, TagCreate, TagSearchResult,
+)
+import db
+from repository import IPAM_TABLES, ConstraintError, DuplicateKeyError, OverlapError
+from ipam.allocator import AddressSpaceFull, PrefixAllocator
+from ipam.service import add_record, allocations, hierarchy, index_sync, prefixes, reload_allocator, remove_record, rollups, tags
+from streaming import MAX_PAGE_SIZE, ndjson_response, set_next_cursor, wants_ndjson
+
+router = APIRouter()
+
+# Deepest walk allowed in one request (the generated topology is 4 levels deep)
+MAX_WALK_DEPTH = 16
+# Largest batch accepted by POST /lookup
+MAX_LOOKUP_BATCH = 10000
+# Page size of /search when no limit is given
+DEFAULT_SEARCH_LIMIT = 100
+# Tries at creating a network or host when storage finds its range taken by another worker
+ALLOCATION_ATTEMPTS = 3
+
+TaggedTable = Literal["blocks", "networks", "hosts"]
+
+def _require_node(object_id: str) -> dict:
+    node = hierarchy.get(object_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return node
+
+@router.get("/nodes", response_model=List[IpamNode])
+async def get_roots():
+    return hierarchy.roots()
+
+@router.post("/nodes", response_model=IpamNode)
+async def create_node(node: IpamNodeCreate):
+    record = node.model_dump()
+    record["object_id"] = record["object_id"] or str(uuid.uuid4())
+    try:
+        record = hierarchy.add(record)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Parent node not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    rollups.added(record["object_id"])
+    return record
+
+@router.get("/nodes/{object_id}", response_model=IpamNode)
+async def get_node(object_id: str):
+    return _require_node(object_id)
+
+@router.patch("/nodes/{object_id}", response_model=IpamNode)
+async def update_node(object_id: str, changes: IpamNodeUpdate):
+    _require_node(object_id)
+    return rollups.update(object_id, changes.status, changes.percent_utilized)
+
+@router.put("/nodes/{object_id}/parent", response_model=IpamNode)
+async def move_node(object_id: str, move: IpamNodeMove):
+    old_parent_id = _require_node(object_id).get("parent_id")
+    try:
+        record = hierarchy.move(object_id, move.parent_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Parent node not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rollups.moved(object_id, old_parent_id)
+    return record
+
+@router.get("/nodes/{object_id}/subtree", response_model=List[IpamNode])
+async def get_subtree(
+    object_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)
+):
+    _require_node(object_id)
+    return hierarchy.subtree(object_id, offset, limit)
+
+@router.get("/nodes/{object_id}/ancestors", response_model=List[IpamNode])
+async def get_ancestors(object_id: str):
+    _require_node(object_id)
+    return hierarchy.ancestors(object_id)
+
+@router.get("/nodes/{object_id}/descendant-counts", response_model=Dict[str, int])
+async def get_descendant_counts(object_id: str):
+    _require_node(object_id)
+    return hierarchy.descendant_counts(object_id)
+
+@router.get("/nodes/{object_id}/rollup", response_model=IpamRollup)
+async def get_rollup(object_id: str):
+    """
+    Utilization over the node's descendants: sum, mean and max of
+    ``percent_utilized``, and counts by status and object_type.
+    """
+    _require_node(object_id)
+    return {"object_id": object_id, **rollups.get(object_id)}
+
+@router.get("/nodes/{object_id}/walk", response_model=List[IpamWalkEntry])
+async def walk_node(object_id: str, max_depth: int = Query(1, ge=1, le=MAX_WALK_DEPTH)):
+    _require_node(object_id)
+    return [{"depth": depth, "node": node} for depth, node in hierarchy.walk(object_id, max_depth)]
+
+# ==================================================
+# BLOCKS, NETWORKS AND HOSTS
+# ==================================================
+
+# Writes keep the prefix tries, free-space allocators and tag index in step with storage.
+# Address space is reserved (without awaiting) before the insert and handed back if it fails;
+# if storage finds it taken by another worker, the allocator is reloaded and the pick retried.
+
+async def _create_record(table: str, record: dict, rollback: Optional[Callable[[], None]] = None) -> dict:
+    try:
+        try:
+            return await db.ipam.create(table, record)
+        except BaseException:
+            if rollback is not None:
+                rollback()
+            raise
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="object_id already exists")
+    except ConstraintError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _create_in_range(table: str, record: dict, parent_table: str, parent_id: int,
+                           reserve: Callable[[], Optional[Callable[[], None]]]) -> dict:
+    """
+    Create a network or host after ``reserve()`` marked its range in the allocator
+    (filling it into ``record`` if it picked one) and returned how to hand it back.
+    """
+    for _ in range(ALLOCATION_ATTEMPTS):
+        rollback = reserve()
+        try:
+            return await _create_record(table, record, rollback)
+        except OverlapError as e:
+            if rollback is None:
+                # No allocator here to bring up to date
+                raise HTTPException(status_code=409, detail=str(e))
+            await reload_allocator(parent_table, parent_id)
+    raise HTTPException(status_code=409, detail="Address space is being changed by other requests, try again")
+
+async def _delete_record(table: str, record_id: int) -> dict:
+    try:
+        record = await db.ipam.delete(table, record_id)
+    except ConstraintError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return record
+
+async def _require(table: str, record_id: int, name: str) -> dict:
+    record = await db.ipam.get(table, record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+    return record
+
+def _free_space(allocator: PrefixAllocator, prefixlen: int) -> dict:
+    try:
+        next_free = allocator.next_free(prefixlen)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"next_free": next_free and str(next_free), "free_addresses": allocator.free_addresses}
+
+@router.get("/blocks", response_model=List[Block])
+async def get_blocks(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0)
+):
+    if wants_ndjson(request):
+        return ndjson_response(db.ipam.iter("blocks", after_id, limit), Block)
+
+    blocks = await db.ipam.list("blocks", after_id, limit)
+    set_next_cursor(response, blocks, limit, "block_id")
+    return blocks
+
+@router.post("/blocks", response_model=Block)
+async def create_block(block: BlockCreate):
+    record = await _create_record("blocks", block.model_dump(mode="json"))
+    add_record("blocks", record)
+    return record
+
+@router.get("/blocks/{block_id}", response_model=Block)
+async def get_block(block_id: int):
+    return await _require("blocks", block_id, "Block")
+
+@router.delete("/blocks/{block_id}", response_model=Block)
+async def delete_block(block_id: int):
+    record = await _delete_record("blocks", block_id)
+    remove_record("blocks", record)
+    return record
+
+@router.get("/blocks/{block_id}/free", response_model=FreeSpace)
+async def get_block_free_space(block_id: int, prefixlen: int = Query(..., ge=0, le=128)):
+    await _require("blocks", block_id, "Block")
+    allocator = allocations.blocks.get(block_id)
+    if allocator is None:
+        raise HTTPException(status_code=404, detail="Block not loaded")
+    return _free_space(allocator, prefixlen)
+
+@router.post("/blocks/{block_id}/allocate", response_model=Network)
+async def allocate_network(block_id: int, request: NetworkAllocate):
+    await _require("blocks", block_id, "Block")
+    record = request.model_dump(exclude={"prefixlen"})
+    record.update(object_id=request.object_id or str(uuid.uuid4()), block_id=block_id)
+
+    def reserve():
+        allocator = allocations.blocks.get(block_id)
+        if allocator is None:
+            raise HTTPException(status_code=404, detail="Block not loaded")
+        try:
+            network = allocator.allocate(request.prefixlen)
+        except AddressSpaceFull as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        record["cidr"] = str(network)
+        return lambda: allocator.release(network)
+
+    record = await _create_in_range("networks", record, "blocks", block_id, reserve)
+    add_record("networks", record, reserve=False)
+    return record
+
+@router.get("/networks", response_model=List[Network])
+async def get_networks(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0)
+):
+    if wants_ndjson(request):
+        return ndjson_response(db.ipam.iter("networks", after_id, limit), Network)
+
+    networks = await db.ipam.list("networks", after_id, limit)
+    set_next_cursor(response, networks, limit, "network_id")
+    return networks
+
+@router.post("/networks", response_model=Network)
+async def create_network(network: NetworkCreate):
+    block = await _require("blocks", network.block_id, "Block")
+    block_cidr = ipaddress.ip_network(block["cidr"])
+    if network.cidr.version != block_cidr.version or not network.cidr.subnet_of(block_cidr):
+        raise HTTPException(status_code=400, detail=f"Network must lie within block {block['cidr']}")
+
+    def reserve():
+        allocator = allocations.blocks.get(network.block_id)
+        if allocator is None:
+            return None
+        if not allocator.reserve(network.cidr):
+            raise HTTPException(status_code=409, detail="Network overlaps an existing network")
+        return lambda: allocator.release(network.cidr)
+
+    record = await _create_in_range("networks", network.model_dump(mode="json"), "blocks", network.block_id, reserve)
+    add_record("networks", record, reserve=False)
+    return record
+
+@router.get("/networks/{network_id}", response_model=Network)
+async def get_network(network_id: int):
+    return await _require("networks", network_id, "Network")
+
+@router.delete("/networks/{network_id}", response_model=Network)
+async def delete_network(network_id: int):
+    record = await _delete_record("networks", network_id)
+    remove_record("networks", record)
+    return record
+
+@router.get("/networks/{network_id}/free", response_model=FreeSpace)
+async def get_network_free_space(network_id: int):
+    await _require("networks", network_id, "Network")
+    allocator = allocations.networks.get(network_id)
+    if allocator is None:
+        raise HTTPException(status_code=404, detail="Network not loaded")
+    return _free_space(allocator, allocator.width)
+
+@router.post("/networks/{network_id}/allocate", response_model=Host)
+async def allocate_host(network_id: int, request: HostAllocate):
+    await _require("networks", network_id, "Network")
+    record = request.model_dump()
+    record.update(object_id=request.object_id or str(uuid.uuid4()), network_id=network_id)
+
+    def reserve():
+        allocator = allocations.networks.get(network_id)
+        if allocator is None:
+            raise HTTPException(status_code=404, detail="Network not loaded")
+        try:
+            address = allocator.allocate(allocator.width)
+        except AddressSpaceFull as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        record["ip_address"] = str(address.network_address)
+        return lambda: allocator.release(address)
+
+    record = await _create_in_range("hosts", record, "networks", network_id, reserve)
+    add_record("hosts", record, reserve=False)
+    return record
+
+@router.get("/hosts", response_model=List[Host])
+async def get_hosts(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0)
+):
+    if wants_ndjson(request):
+        return ndjson_response(db.ipam.iter("hosts", after_id, limit), Host)
+
+    hosts = await db.ipam.list("hosts", after_id, limit)
+    set_next_cursor(response, hosts, limit, "host_id")
+    return hosts
+
+@router.post("/hosts", response_model=Host)
+async def create_host(host: HostCreate):
+    network = await _require("networks", host.network_id, "Network")
+    record = host.model_dump(mode="json")
+    if record["ip_address"] is None:
+        record = await _create_record("hosts", record)
+    else:
+        if host.ip_address not in ipaddress.ip_network(network["cidr"]):
+            raise HTTPException(status_code=400, detail=f"Address must lie within network {network['cidr']}")
+        address = ipaddress.ip_network(host.ip_address)
+
+        def reserve():
+            allocator = allocations.networks.get(host.network_id)
+            if allocator is None:
+                return None
+            if not allocator.reserve(address):
+                raise HTTPException(status_code=409, detail="Address is already in use or reserved")
+            return lambda: allocator.release(address)
+
+        record = await _create_in_range("hosts", record, "networks", host.network_id, reserve)
+    add_record("hosts", record, reserve=False)
+    return record
+
+@router.get("/hosts/{host_id}", response_model=Host)
+async def get_host(host_id: int):
+    return await _require("hosts", host_id, "Host")
+
+@router.delete("/hosts/{host_id}", response_model=Host)
+async def delete_host(host_id: int):
+    record = await _delete_record("hosts", host_id)
+    remove_record("hosts", record)
+    return record
+
+# ==================================================
+# LONGEST-PREFIX-MATCH LOOKUP
+# ==================================================
+
+def _lookup(ip: str) -> dict:
+    try:
+        found = prefixes.lookup(ip)
+    except ValueError:
+        return {"ip": ip, "detail": "Invalid IP address"}
+    return {"ip": ip, "block": found["blocks"], "network": found["networks"]}
+
+@router.get("/lookup", response_model=LookupResult)
+async def lookup_ip(ip: str):
+    result = _lookup(ip)
+    if "detail" in result:
+        raise HTTPException(status_code=400, detail=result["detail"])
+    return result
+
+@router.post("/lookup", response_model=List[LookupResult])
+async def lookup_ips(lookup: LookupRequest):
+    if len(lookup.ips) > MAX_LOOKUP_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_LOOKUP_BATCH} addresses per request")
+    return [_lookup(ip) for ip in lookup.ips]
+
+# ==================================================
+# TAGS AND TAG SEARCH
+# ==================================================
+
+# Attach/detach write the junction table first, then flip the bit in the tag index.
+
+@router.get("/tags", response_model=List[Tag])
+async def get_tags():
+    return await db.ipam.list_tags()
+
+@router.post("/tags", response_model=Tag)
+async def create_tag(tag: TagCreate):
+    try:
+        record = await db.ipam.create_tag(tag.group, tag.name)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Tag already exists in this group")
+    tags.add_tag(record)
+    return record
+
+@router.get("/search", response_model=TagSearchResult)
+async def search_by_tags(
+    response: Response,
+    tags_expression: str = Query(..., alias="tags", min_length=1),
+    object_type: TaggedTable = Query("hosts", alias="type"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0)
+):
+    """
+    Records of one type matching a boolean tag expression, e.g.
+    ``Production AND "PCI Compliant" AND NOT DMZ``. ``count`` is the total
+    number of matches; results are paged by primary key with ``after_id``.
+    """
+    try:
+        matches = tags.search(object_type, tags_expression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    record_ids = []
+    for record_id in matches.iter_from(after_id + 1):
+        record_ids.append(record_id)
+        if len(record_ids) == limit:
+            break
+    results = await db.ipam.get_many(object_type, record_ids)
+    set_next_cursor(response, results, limit, IPAM_TABLES[object_type][0])
+    return {"object_type": object_type, "count": len(matches), "results": results}
+
+@router.get("/{object_type}/{record_id}/tags", response_model=List[Tag])
+async def get_record_tags(object_type: TaggedTable, record_id: int):
+    await _require(object_type, record_id, "Record")
+    return tags.tags_of(object_type, record_id)
+
+@router.put("/{object_type}/{record_id}/tags/{tag_id}", response_model=List[Tag])
+async def attach_tag(object_type: TaggedTable, record_id: int, tag_id: int):
+    if tags.get_tag(tag_id) is None:
+        # Perhaps created through another worker since the last sync
+        await index_sync.sync()
+    if tags.get_tag(tag_id) is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    try:
+        await db.ipam.attach_tag(object_type, record_id, tag_id)
+    except ConstraintError:
+        raise HTTPException(status_code=404, detail="Record not found")
+    tags.attach(object_type, record_id, tag_id)
+    return tags.tags_of(object_type, record_id)
+
+@router.delete("/{object_type}/{record_id}/tags/{tag_id}", response_model=List[Tag])
+async def detach_tag(object_type: TaggedTable, record_id: int, tag_id: int):
+    if not await db.ipam.detach_tag(object_type, record_id, tag_id):
+        raise HTTPException(status_code=404, detail="Tag not attached")
+    tags.detach(object_type, record_id, tag_id)
+    return tags.tags_of(object_type, record_id)
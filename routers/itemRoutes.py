@@ -1,55 +1,255 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from models import User, Item
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import os
+from models import User, Item, ItemPatch, BulkDelete, BulkItemResult, ItemChange, ItemChanges
 import db
+from repository import BulkConflict, ChangesTruncated
 from auth import get_current_active_user
+from change_feed import SSE_MEDIA_TYPE, ChangeNotifier, sse_event, wants_event_stream
+from response_cache import REPLAYED_HEADERS, ResponseCache, conditional_response
+from serialization import projector, trusted_response
+from streaming import MAX_PAGE_SIZE, ndjson_response, set_next_cursor, wants_ndjson
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Item])
-async def get_items(current_user: User = Depends(get_current_active_user)):
-    user_items = [item for item in db.fake_items_db if item["owner_id"] == current_user.id]
-    return user_items
+# Largest batch accepted by the /bulk endpoints
+MAX_BULK_ITEMS = 10000
+
+# Serialized item reads, per user; validated against the owner's item version
+item_cache = ResponseCache(
+    max_size=int(os.getenv("ITEM_CACHE_SIZE", "10000")),
+    max_bytes=int(os.getenv("ITEM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+NOT_MODIFIED = {304: {"description": "Not Modified (the If-None-Match ETag is current)"}}
+
+# Longest a long-poll on /changes may wait, and the idle time between SSE keep-alive comments
+MAX_CHANGES_WAIT = 60
+SSE_KEEPALIVE_SECONDS = 15
+# Other workers' writes are only seen by polling the shared database; one in-process store needs none
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "1.0" if db.STORAGE_BACKEND == "sqlite" else "0"))
+change_notifier = ChangeNotifier(db.items.changed_owners, poll_interval=CHANGES_POLL_INTERVAL)
+db.items.subscribe(change_notifier.publish)
+CHANGES_TRUNCATED = {410: {"description": "Changes after `since` were dropped from the log; re-read the items"}}
+
+# Records read back from the repository are trusted: handlers return them through
+# trusted_response instead of rebuilding models that FastAPI would validate again.
+
+async def _cached_read(request: Request, owner_id: int, key: tuple, render: Callable[[], Awaitable]):
+    """
+    Serve a read of the owner's items from ``item_cache``, or ``render()``
+    and cache it, with ETag / If-None-Match handling.
+
+    The version is read before rendering, so a write that lands in between
+    leaves an entry that can no longer match rather than a stale one.
+    HTTPExceptions from ``render`` propagate and nothing is cached.
+    """
+    version = await db.items.owner_version(owner_id)
+    entry = item_cache.get(owner_id, key, version)
+    if entry is None:
+        response = await render()
+        headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        entry = item_cache.put(owner_id, key, version, response.body, headers)
+    return conditional_response(request, entry)
+
+@router.get("/", response_model=List[Item], responses=NOT_MODIFIED)
+async def get_items(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Accept: application/x-ndjson streams every matching item instead of one page
+    if wants_ndjson(request):
+        return ndjson_response(db.items.iter_by_owner(current_user.id, after_id, limit), Item)
+
+    async def render():
+        user_items = await db.items.list_by_owner(current_user.id, after_id, limit)
+        response = trusted_response(user_items, Item)
+        set_next_cursor(response, user_items, limit)
+        return response
+    return await _cached_read(request, current_user.id, ("list", after_id, limit), render)
 
 @router.post("/", response_model=Item)
 async def create_item(item: Item, current_user: User = Depends(get_current_active_user)):
     item_dict = item.dict()
-    item_dict["id"] = len(db.fake_items_db) + 1
     item_dict["owner_id"] = current_user.id
-    db.fake_items_db.append(item_dict)
-    return Item(**item_dict)
+    item_dict = await db.items.create(item_dict)
+    return trusted_response(item_dict, Item)
 
-@router.get("/{item_id}", response_model=Item)
-async def get_item(item_id: int, current_user: User = Depends(get_current_active_user)):
-    item = next((item for item in db.fake_items_db if item["id"] == item_id), None)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
+# Bulk routes must be registered before /{item_id} so "bulk" is not parsed as an id
+def _check_batch(item_ids: List[int]):
+    if len(item_ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    if len(set(item_ids)) != len(item_ids):
+        raise HTTPException(status_code=400, detail="Duplicate item ids in batch")
+
+def _bulk_conflict_response(item_ids: List[int], conflict: BulkConflict):
+    # Nothing was applied: report why each entry failed, or that it was skipped
+    missing, forbidden = set(conflict.missing), set(conflict.forbidden)
+    results = []
+    for index, item_id in enumerate(item_ids):
+        if item_id in missing:
+            result = BulkItemResult(index=index, id=item_id, status=404, detail="Item not found")
+        elif item_id in forbidden:
+            result = BulkItemResult(index=index, id=item_id, status=403, detail="Not authorized to modify this item")
+        else:
+            result = BulkItemResult(index=index, id=item_id, status=409, detail="Not applied, batch rejected")
+        results.append(result.model_dump())
+    return JSONResponse(status_code=409, content=results)
+
+def _patch_changes(patch: ItemPatch):
+    # Only fields the client sent; name and price cannot be cleared
+    changes = patch.dict(exclude_unset=True)
+    for field in ("name", "price"):
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=422, detail=f"Item {patch.id}: {field} cannot be null")
+    return changes
+
+def _bulk_results(items: List[dict]):
+    results = [{"index": index, "id": item["id"], "status": 200, "item": item} for index, item in enumerate(items)]
+    return trusted_response(results, BulkItemResult)
+
+@router.post("/bulk", response_model=List[BulkItemResult])
+async def create_items_bulk(items: List[Item], current_user: User = Depends(get_current_active_user)):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
     
-    if item["owner_id"] != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to access this item")
+    item_dicts = []
+    for item in items:
+        item_dict = item.dict()
+        item_dict["owner_id"] = current_user.id
+        item_dicts.append(item_dict)
+    return _bulk_results(await db.items.create_many(item_dicts))
+
+@router.patch("/bulk", response_model=List[BulkItemResult], responses={409: {"model": List[BulkItemResult]}})
+async def update_items_bulk(patches: List[ItemPatch], current_user: User = Depends(get_current_active_user)):
+    item_ids = [patch.id for patch in patches]
+    _check_batch(item_ids)
+    
+    try:
+        updated = await db.items.update_many(current_user.id, [_patch_changes(patch) for patch in patches])
+    except BulkConflict as e:
+        return _bulk_conflict_response(item_ids, e)
+    return _bulk_results(updated)
+
+@router.delete("/bulk", response_model=List[BulkItemResult], responses={409: {"model": List[BulkItemResult]}})
+async def delete_items_bulk(request: BulkDelete, current_user: User = Depends(get_current_active_user)):
+    _check_batch(request.ids)
     
-    return Item(**item)
+    try:
+        deleted = await db.items.delete_many(current_user.id, request.ids)
+    except BulkConflict as e:
+        return _bulk_conflict_response(request.ids, e)
+    return _bulk_results(deleted)
+
+# ==================================================
+# CHANGE FEED
+# ==================================================
+
+CHANGES_TRUNCATED_DETAIL = "Changes after since are no longer available; re-read the items and resume from a new cursor"
+
+def _change_stream(owner_id: int, since: int, limit: int) -> StreamingResponse:
+    """
+    Server-Sent Events: one ``create`` / ``update`` / ``delete`` event per
+    change, with the seq as its id, for as long as the client stays
+    connected. A ``reset`` event ends the stream if the client fell behind
+    the log.
+    """
+    project = projector(ItemChange)
+
+    async def body():
+        cursor = since
+        while True:
+            generation = change_notifier.generation(owner_id)
+            try:
+                changes = await db.items.changes(owner_id, cursor, limit)
+            except ChangesTruncated:
+                yield sse_event({"detail": CHANGES_TRUNCATED_DETAIL}, event="reset")
+                return
+            for change in changes:
+                yield sse_event(project(change), event=change["op"], event_id=change["seq"])
+                cursor = change["seq"]
+            if len(changes) == limit:
+                continue
+            if not await change_notifier.wait(owner_id, generation, cursor, SSE_KEEPALIVE_SECONDS):
+                yield b": keep-alive\n\n"
+
+    return StreamingResponse(
+        body(), media_type=SSE_MEDIA_TYPE, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/changes", response_model=ItemChanges, responses=CHANGES_TRUNCATED)
+async def get_item_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Changes to the user's items with a sequence number above ``since``,
+    oldest first; ``last_seq`` is the cursor to pass as ``since`` next.
+    Without ``since`` the feed starts at the latest change. With ``wait``
+    the request is held until a change arrives or ``wait`` seconds pass.
+    ``Accept: text/event-stream`` streams the changes as Server-Sent Events
+    instead (resuming from ``Last-Event-ID`` if sent).
+    """
+    if since is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        since = int(last_event_id) if last_event_id.isdigit() else await db.items.last_change_seq()
+    if wants_event_stream(request):
+        return _change_stream(current_user.id, since, limit)
+
+    deadline = asyncio.get_running_loop().time() + wait
+    while True:
+        generation = change_notifier.generation(current_user.id)
+        try:
+            changes = await db.items.changes(current_user.id, since, limit)
+        except ChangesTruncated:
+            raise HTTPException(status_code=410, detail=CHANGES_TRUNCATED_DETAIL)
+        remaining = deadline - asyncio.get_running_loop().time()
+        if changes or remaining <= 0 or not await change_notifier.wait(current_user.id, generation, since, remaining):
+            break
+    last_seq = changes[-1]["seq"] if changes else since
+    return trusted_response({"last_seq": last_seq, "changes": changes}, ItemChanges)
+
+@router.get("/{item_id}", response_model=Item, responses=NOT_MODIFIED)
+async def get_item(item_id: int, request: Request, current_user: User = Depends(get_current_active_user)):
+    # Only the user's own items are ever cached, and owners never change, so
+    # the user's version covers every cached item entry
+    async def render():
+        item = await db.items.get(item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        if item["owner_id"] != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to access this item")
+        
+        return trusted_response(item, Item)
+    return await _cached_read(request, current_user.id, ("item", item_id), render)
 
 @router.put("/{item_id}", response_model=Item)
 async def update_item(item_id: int, item_update: Item, current_user: User = Depends(get_current_active_user)):
-    item_index = next((i for i, item in enumerate(db.fake_items_db) if item["id"] == item_id), None)
-    if item_index is None:
+    item = await db.items.get(item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    if db.fake_items_db[item_index]["owner_id"] != current_user.id:
+    if item["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this item")
     
-    db.fake_items_db[item_index].update(item_update.dict(exclude={"id", "owner_id"}))
-    return Item(**db.fake_items_db[item_index])
+    item = await db.items.update(item_id, item_update.dict(exclude={"id", "owner_id"}))
+    return trusted_response(item, Item)
 
 @router.delete("/{item_id}")
 async def delete_item(item_id: int, current_user: User = Depends(get_current_active_user)):
-    item_index = next((i for i, item in enumerate(db.fake_items_db) if item["id"] == item_id), None)
-    if item_index is None:
+    item = await db.items.get(item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    if db.fake_items_db[item_index]["owner_id"] != current_user.id:
+    if item["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this item")
     
-    del db.fake_items_db[item_index]
-    return {"message": "Item deleted successfully"}
\ No newline at end of file
+    await db.items.delete(item_id)
+    return {"message": "Item deleted successfully"}
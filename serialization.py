@@ -0,0 +1,115 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Type, Union, get_args, get_origin
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` to compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (same bytes as the stdlib encoder for API payloads)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ==================================================
+# PRECOMPILED PROJECTORS FOR TRUSTED RECORDS
+# ==================================================
+
+_projectors: Dict[type, Callable[[dict], dict]] = {}
+
+
+def projector(model: Type[BaseModel]) -> Callable[[dict], dict]:
+    """
+    Function that turns a trusted record dict into ``model``'s JSON shape.
+
+    It copies exactly the model's fields, in declaration order and under
+    their serialization aliases, fills in defaults for missing optional
+    fields and projects nested models the same way. Extra keys, such as
+    ``hashed_password`` on user records, are dropped. Nothing is validated:
+    use it only for records that came out of our own repositories, whose
+    values already have the model's types. The function is generated once
+    per model and cached.
+    """
+    project = _projectors.get(model)
+    if project is None:
+        project = _projectors[model] = _compile(model)
+    return project
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _nested_model(annotation: Any):
+    """("one" | "many", model) if the annotation is a model, Optional[model] or List[model]."""
+    annotation = _unwrap_optional(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return "one", annotation
+    if get_origin(annotation) in (list, List):
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return "many", args[0]
+    return None
+
+
+def _compile(model: Type[BaseModel]) -> Callable[[dict], dict]:
+    namespace: Dict[str, Any] = {}
+    entries = []
+    for i, (name, field) in enumerate(model.model_fields.items()):
+        key = field.serialization_alias or field.alias or name
+        if field.is_required():
+            value = f"record[{name!r}]"
+        elif field.default_factory is not None:
+            namespace[f"factory_{i}"] = field.default_factory
+            value = f"(record[{name!r}] if {name!r} in record else factory_{i}())"
+        else:
+            namespace[f"default_{i}"] = field.default
+            value = f"record.get({name!r}, default_{i})"
+        nested = _nested_model(field.annotation)
+        if _unwrap_optional(field.annotation) is float:
+            # SQLite returns whole REAL values as int; pydantic would emit 3.0
+            value = f"(None if (v := {value}) is None else float(v))"
+        elif nested is not None:
+            kind, nested_model = nested
+            namespace[f"project_{i}"] = projector(nested_model)
+            if kind == "one":
+                value = f"(None if (v := {value}) is None else project_{i}(v))"
+            else:
+                value = f"(None if (v := {value}) is None else [project_{i}(x) for x in v])"
+        entries.append(f"{key!r}: {value}")
+    source = f"def project(record):\n    return {{{', '.join(entries)}}}\n"
+    exec(compile(source, f"<projector {model.__name__}>", "exec"), namespace)
+    return namespace["project"]
+
+
+def trusted_response(data: Union[dict, List[dict]], model: Type[BaseModel], status_code: int = 200,
+                     headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """
+    Serialize a trusted record, or list of records, as ``model`` without a
+    pydantic round trip.
+
+    Returning a Response skips FastAPI's response_model validation and
+    serialization; the route keeps its ``response_model`` so the OpenAPI
+    schema is unchanged. Headers must be set on the returned response, not
+    on an injected ``Response`` parameter.
+    """
+    project = projector(model)
+    content = [project(record) for record in data] if isinstance(data, list) else project(data)
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,113 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+
+class SQLitePool:
+    """
+    Bounded pool of SQLite connections driven from asyncio.
+
+    sqlite3 is blocking, so every statement runs on a private thread pool with
+    one thread per connection; the event loop only awaits the result. Each
+    connection is opened in WAL mode so readers never block the single writer,
+    and keeps a per-connection statement cache: callers pass constant SQL
+    strings with ``?`` parameters and sqlite3 reuses the prepared statements.
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout_ms: int = 5000,
+                 cached_statements: int = 256):
+        """
+        Args:
+            path: Database file path (``:memory:`` is not shareable across
+                connections, use a file).
+            size: Maximum number of open connections.
+            busy_timeout_ms: How long a writer waits for the write lock.
+            cached_statements: Prepared statements cached per connection.
+        """
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite")
+        self._idle: Optional[asyncio.Queue] = None
+        self._opened = 0
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,  # explicit BEGIN/COMMIT in transaction()
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    async def _call(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection, opening a new one only while under ``size``."""
+        if self._closed:
+            raise RuntimeError("SQLitePool is closed")
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        if self._idle.empty() and self._opened < self.size:
+            self._opened += 1
+            try:
+                conn = await self._call(self._connect)
+            except BaseException:
+                self._opened -= 1
+                raise
+        else:
+            conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run ``func(conn, *args)`` on a pooled connection in autocommit mode."""
+        async with self.connection() as conn:
+            return await self._call(func, conn, *args)
+
+    async def transaction(self, func: Callable, *args) -> Any:
+        """
+        Run ``func(conn, *args)`` inside ``BEGIN IMMEDIATE ... COMMIT``.
+
+        IMMEDIATE takes the write lock up front, which avoids the deadlock-prone
+        read-to-write upgrade of a deferred transaction under WAL.
+        """
+        def _in_transaction(conn, *args):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn, *args)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        async with self.connection() as conn:
+            return await self._call(_in_transaction, conn, *args)
+
+    async def executescript(self, script: str):
+        """Run a multi-statement SQL script (used for schema creation)."""
+        await self.run(lambda conn: conn.executescript(script))
+
+    async def close(self):
+        """Close idle connections and stop the worker threads."""
+        self._closed = True
+        if self._idle is not None:
+            while not self._idle.empty():
+                conn = self._idle.get_nowait()
+                await self._call(conn.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,185 @@
+import bisect
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class ChangeLog:
+    """
+    Bounded, append-only log of item writes, numbered by a global sequence.
+
+    Each change is ``{"seq", "op", "id", "item"}``, where ``op`` is
+    "create", "update" or "delete" and ``item`` is a copy of the item after
+    the write (None for a delete). Changes are indexed by owner, so reading
+    an owner's changes after a sequence number costs O(number returned).
+    Once ``max_size`` changes are held, the oldest are dropped. The seq of
+    the last change dropped for each owner is kept, so a reader whose
+    cursor is older than that can be told to resynchronise.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.last_seq = 0
+        self._order: Deque[Tuple[int, int]] = deque()
+        self._by_owner: Dict[int, Deque[dict]] = {}
+        self._trimmed: Dict[int, int] = {}
+
+    def append(self, op: str, item: dict) -> dict:
+        self.last_seq += 1
+        owner_id = item["owner_id"]
+        change = {"seq": self.last_seq, "op": op, "id": item["id"], "item": None if op == "delete" else dict(item)}
+        self._order.append((self.last_seq, owner_id))
+        self._by_owner.setdefault(owner_id, deque()).append(change)
+        while len(self._order) > self.max_size:
+            seq, owner_id = self._order.popleft()
+            changes = self._by_owner[owner_id]
+            changes.popleft()
+            self._trimmed[owner_id] = seq
+            if not changes:
+                del self._by_owner[owner_id]
+        return change
+
+    def trimmed_through(self, owner_id: int) -> int:
+        """Seq of the last change of the owner's that was dropped (0 if none was)."""
+        return self._trimmed.get(owner_id, 0)
+
+    def since(self, owner_id: int, since: int, limit: Optional[int] = None) -> List[dict]:
+        """The owner's changes with ``seq > since``, oldest first, at most ``limit`` of them."""
+        changes = []
+        for change in reversed(self._by_owner.get(owner_id, ())):
+            if change["seq"] <= since:
+                break
+            changes.append(change)
+        changes.reverse()
+        return changes if limit is None else changes[:limit]
+
+    def changed_owners(self, after_seq: int) -> Set[int]:
+        """Owners with a change after ``after_seq``."""
+        owners = set()
+        for seq, owner_id in reversed(self._order):
+            if seq <= after_seq:
+                break
+            owners.add(owner_id)
+        return owners
+
+
+class ItemStore:
+    """
+    In-memory item store indexed by item id and by owner.
+
+    Items are kept as plain dicts in a primary ``id -> item`` map. A secondary
+    ``owner_id -> [ids]`` index keeps each owner's ids sorted, so per-owner
+    listing is O(k) and never touches other owners' items. Ids come from a
+    monotonic allocator and are never reused after a delete. Every write bumps
+    a per-owner version counter, which read caches use to tell whether an
+    owner's items may have changed, and is appended to ``changes``.
+    """
+
+    def __init__(self, change_log_size: int = 100000):
+        self._items: Dict[int, dict] = {}
+        self._by_owner: Dict[int, List[int]] = {}
+        self._versions: Dict[int, int] = {}
+        self._last_id = 0
+        self.changes = ChangeLog(change_log_size)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._items
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._items.values())
+
+    def version(self, owner_id: int) -> int:
+        """Return the owner's version; it changes whenever one of their items is written."""
+        return self._versions.get(owner_id, 0)
+
+    def _record(self, op: str, item: dict):
+        owner_id = item["owner_id"]
+        self._versions[owner_id] = self._versions.get(owner_id, 0) + 1
+        self.changes.append(op, item)
+
+    def allocate_id(self) -> int:
+        """Reserve and return the next item id."""
+        self._last_id += 1
+        return self._last_id
+
+    def add(self, item: dict) -> dict:
+        """
+        Insert an item, assigning it a fresh id.
+
+        Args:
+            item: Item fields; must contain ``owner_id``. Any ``id`` is replaced.
+
+        Returns:
+            The stored item dict.
+        """
+        item["id"] = self.allocate_id()
+        self._items[item["id"]] = item
+        # Ids are monotonic, so appending keeps the owner's list sorted
+        self._by_owner.setdefault(item["owner_id"], []).append(item["id"])
+        self._record("create", item)
+        return item
+
+    def get(self, item_id: int) -> Optional[dict]:
+        """Return the item with the given id, or None."""
+        return self._items.get(item_id)
+
+    def list_by_owner(self, owner_id: int, after_id: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """
+        Return items owned by ``owner_id`` in id order.
+
+        Args:
+            owner_id: Owner to list.
+            after_id: Keyset cursor; only items with ``id > after_id`` are returned.
+            limit: Maximum number of items to return (None for all).
+
+        Returns:
+            Up to ``limit`` item dicts, found in O(log k + limit).
+        """
+        items = self._items
+        owner_ids = self._by_owner.get(owner_id, ())
+        start = bisect.bisect_right(owner_ids, after_id) if after_id else 0
+        end = len(owner_ids) if limit is None else start + limit
+        return [items[item_id] for item_id in owner_ids[start:end]]
+
+    def update(self, item_id: int, changes: dict) -> Optional[dict]:
+        """
+        Apply ``changes`` to an item in place. ``id`` and ``owner_id`` are immutable.
+        Changes that leave every value as it was are not recorded as a write.
+
+        Returns:
+            The updated item, or None if it does not exist.
+        """
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        changes = {k: v for k, v in changes.items() if k not in ("id", "owner_id")}
+        if any(k not in item or item[k] != v for k, v in changes.items()):
+            item.update(changes)
+            self._record("update", item)
+        return item
+
+    def delete(self, item_id: int) -> Optional[dict]:
+        """
+        Remove an item.
+
+        Returns:
+            The removed item, or None if it does not exist.
+        """
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return None
+        owner_ids = self._by_owner[item["owner_id"]]
+        del owner_ids[bisect.bisect_left(owner_ids, item_id)]
+        if not owner_ids:
+            del self._by_owner[item["owner_id"]]
+        self._record("delete", item)
+        return item
+
+    def clear(self):
+        """Remove every item, recording a delete for each. The id allocator and version counters are not reset."""
+        for item in self._items.values():
+            self._record("delete", item)
+        self._items.clear()
+        self._by_owner.clear()
@@ -0,0 +1,41 @@
+from typing import AsyncIterator, Optional, Type
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from serialization import dumps, projector
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Largest page a client may request from a paginated list endpoint
+MAX_PAGE_SIZE = 1000
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True if the client opted into streaming with ``Accept: application/x-ndjson``."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(records: AsyncIterator[dict], model: Type[BaseModel]) -> StreamingResponse:
+    """
+    Stream ``records`` as newline-delimited JSON, one ``model`` per line.
+
+    Records are pulled from the iterator as the client reads, so memory use
+    stays at one repository batch however large the result set is. They come
+    straight from a repository, so each line is a precompiled projection
+    rather than a model built and validated per record.
+    """
+    project = projector(model)
+
+    async def body():
+        async for record in records:
+            yield dumps(project(record)) + b"\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def set_next_cursor(response: Response, page: list, limit: Optional[int], key: str = "id"):
+    """Advertise the ``after_id`` for the next page when this page was full."""
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-After-Id"] = str(page[-1][key])
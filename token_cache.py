@@ -0,0 +1,146 @@
+import hashlib
+import heapq
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of verified bearer tokens -> authenticated principal.
+
+    Entries are keyed by a digest of the token (the raw token is never kept)
+    and expire at the token's ``exp`` claim, capped at ``max_ttl`` seconds so a
+    change made by another worker process is picked up within that window.
+    Least-recently-used entries are dropped once ``max_size`` is reached, and
+    every entry for a user can be dropped at once with ``invalidate_user``.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 60.0):
+        """
+        Args:
+            max_size: Maximum number of cached tokens.
+            max_ttl: Upper bound on how long an entry lives, in seconds.
+        """
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        # digest -> (expires_at, username, principal)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._by_user: Dict[str, Set[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        """Return the cached principal for ``token``, or None on a miss."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, token: str, username: str, principal: Any, exp: float):
+        """
+        Cache ``principal`` for ``token``.
+
+        Args:
+            token: The raw bearer token.
+            username: Owner of the token, used for invalidation.
+            principal: Object returned on later hits.
+            exp: The token's expiry as a unix timestamp.
+        """
+        key = self._key(token)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (min(exp, time.time() + self.max_ttl), username, principal)
+        self._by_user.setdefault(username, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, username: str):
+        """Drop every cached token belonging to ``username``."""
+        for key in self._by_user.pop(username, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key: bytes):
+        _, username, _ = self._entries.pop(key)
+        keys = self._by_user.get(username)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[username]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class RevocationStore:
+    """
+    Set of revoked token ids, each kept only until the token it names expires.
+
+    Ids are stored as 16-byte digests with their expiry, so an entry has
+    the same small size whatever the id's length. A min-heap by expiry lets
+    every call evict what has expired in O(log n) per entry, so the store
+    holds live revocations only and never needs a sweep.
+    """
+
+    def __init__(self):
+        self._expires: Dict[bytes, float] = {}
+        self._heap: List[Tuple[float, bytes]] = []
+
+    @staticmethod
+    def _key(token_id: str) -> bytes:
+        return hashlib.blake2b(token_id.encode(), digest_size=16).digest()
+
+    def add(self, token_id: str, expires_at: float) -> bool:
+        """
+        Revoke ``token_id`` until ``expires_at`` (a unix timestamp).
+
+        Returns:
+            True if it was not already revoked. Checking and adding is one
+            step, so a single-use token can be consumed exactly once.
+        """
+        self._evict(time.time())
+        key = self._key(token_id)
+        current = self._expires.get(key)
+        if current is not None and current >= expires_at:
+            return False
+        self._expires[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        return current is None
+
+    def __contains__(self, token_id: str) -> bool:
+        self._evict(time.time())
+        return self._key(token_id) in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _evict(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            # Superseded heap entries (the expiry was extended) are skipped
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
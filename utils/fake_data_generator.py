@@ -1,7 +1,7 @@
 import random
 import uuid
 from faker import Faker
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional
 import json
 
 class HierarchicalDataGenerator:
@@ -166,6 +166,120 @@ class HierarchicalDataGenerator:
             if object_id in parent_to_children:
                 record['immediate_children'] = parent_to_children[object_id]
     
+    def generate_hierarchical_stream(self, num_root_objects: int = 3, max_depth: int = 4,
+                                     max_children_per_node: int = 5, seed: Optional[int] = None,
+                                     batch_size: int = 65536) -> Iterator[Dict]:
+        """
+        Generate hierarchical data as a stream of records, level by level.
+
+        Same record layout and shape parameters as generate_hierarchical_data,
+        but built for multi-million-node topologies: each level is generated
+        with vectorized NumPy draws (ids, IPs, utilization, ...) instead of
+        per-record Faker calls, and only compact arrays for the current and
+        next level are held in memory. Because a level's children are drawn
+        before the level is emitted, immediate_children is filled in directly.
+
+        Args:
+            num_root_objects: Number of root-level objects
+            max_depth: Maximum depth of hierarchy
+            max_children_per_node: Maximum children per parent
+            seed: Seed for reproducible output (independent of the Faker seed)
+            batch_size: Records materialised per vectorized batch
+
+        Yields:
+            Record dictionaries, parents always before their children
+        """
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("generate_hierarchical_stream requires numpy (pip install numpy)") from e
+
+        # One stream for the tree structure and one per attribute, so output
+        # depends only on the seed and shape parameters, not on batch_size
+        rng, ip_rng, config_rng, zone_rng, status_rng, util_rng = (
+            np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(6))
+        type_names = list(self.object_types)
+        host_type = type_names.index('host')
+
+        # Child type lookup table: row = parent type, columns = its typical children
+        max_options = max(len(t['typical_children']) for t in self.object_types.values()) or 1
+        child_options = np.zeros((len(type_names), max_options), dtype=np.int8)
+        option_counts = np.zeros(len(type_names), dtype=np.int64)
+        for i, name in enumerate(type_names):
+            children = self.object_types[name]['typical_children'] if self.object_types[name]['can_have_children'] else []
+            option_counts[i] = len(children)
+            for j, child in enumerate(children):
+                child_options[i, j] = type_names.index(child)
+
+        def new_ids(n):
+            ids = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+            ids[:, 6] = (ids[:, 6] & 0x0F) | 0x40  # UUID version 4
+            ids[:, 8] = (ids[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+            return ids
+
+        def format_ids(ids):
+            hex_ids = ids.tobytes().hex()
+            return [f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+                    for h in (hex_ids[i:i + 32] for i in range(0, len(hex_ids), 32))]
+
+        types = np.zeros(num_root_objects, dtype=np.int8)  # roots are datacenters
+        ids = new_ids(num_root_objects)
+        # Index of each node's parent within the previous level's ids (None for roots)
+        parent_index, parent_level_ids = None, None
+
+        for depth in range(max_depth):
+            n = len(types)
+            if n == 0:
+                return
+
+            # Draw the next level first so this level's immediate_children is known
+            if depth < max_depth - 1:
+                counts = rng.integers(0, max_children_per_node + 1, size=n)
+                counts[option_counts[types] == 0] = 0
+            else:
+                counts = np.zeros(n, dtype=np.int64)
+            child_parent = np.repeat(np.arange(n), counts)
+            parent_types = types[child_parent]
+            picks = (rng.random(len(child_parent)) * option_counts[parent_types]).astype(np.int64)
+            child_types = child_options[parent_types, picks]
+            child_ids = new_ids(len(child_parent))
+            child_offsets = np.concatenate(([0], np.cumsum(counts)))
+
+            for start in range(0, n, batch_size):
+                end = min(n, start + batch_size)
+                batch_types = types[start:end]
+                object_ids = format_ids(ids[start:end])
+                children = format_ids(child_ids[child_offsets[start]:child_offsets[end]])
+                offsets = child_offsets[start:end + 1] - child_offsets[start]
+                if parent_index is None:
+                    parents = [None] * (end - start)
+                else:
+                    parents = format_ids(parent_level_ids[parent_index[start:end]])
+                octets = ip_rng.integers(0, 256, size=(end - start, 4)).tolist()
+                config_ids = config_rng.integers(10000, 100000, size=end - start).tolist()
+                zones = zone_rng.integers(0, len(self.security_zones), size=end - start).tolist()
+                statuses = status_rng.integers(0, len(self.statuses), size=end - start).tolist()
+                utilization = np.round(util_rng.uniform(0.0, 100.0, size=end - start), 2).tolist()
+                is_host = (batch_types == host_type).tolist()
+                type_list = batch_types.tolist()
+                offsets = offsets.tolist()
+
+                for i in range(end - start):
+                    yield {
+                        'object_id': object_ids[i],
+                        'sec_zone': self.security_zones[zones[i]],
+                        'config_id': f"CFG-{config_ids[i]}",
+                        'parent_id': parents[i],
+                        'ip_address': "%d.%d.%d.%d" % tuple(octets[i]),
+                        'object_type': type_names[type_list[i]],
+                        'status': self.statuses[statuses[i]] if not is_host[i] else "",
+                        'percent_utilized': utilization[i] if not is_host[i] else 0.0,
+                        'immediate_children': children[offsets[i]:offsets[i + 1]]
+                    }
+
+            parent_index, parent_level_ids = child_parent, ids
+            types, ids = child_types, child_ids
+
     # def generate_flat_data(self, num_records: int = 50) -> List[Dict]:
     #     """
     #     Generate flat data with some random relationships.
@@ -212,6 +326,26 @@ class HierarchicalDataGenerator:
             json.dump(data, f, indent=2)
         print(f"Data saved to {filename}")
     
+    def save_to_jsonl(self, records: Iterable[Dict], filename: str = "generated_data.jsonl") -> int:
+        """
+        Write records to a JSON Lines file as they are produced.
+
+        Args:
+            records: Any iterable of records, e.g. generate_hierarchical_stream()
+            filename: Output filename
+
+        Returns:
+            Number of records written
+        """
+        count = 0
+        with open(filename, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')))
+                f.write('\n')
+                count += 1
+        print(f"Data saved to {filename}")
+        return count
+
     def print_hierarchy(self, data: List[Dict]):
         """
         Print the hierarchical structure of the data.
@@ -219,35 +353,71 @@ class HierarchicalDataGenerator:
         Args:
             data: List of dictionaries to print
         """
-        # Find root objects (no parent)
-        root_objects = [record for record in data if record['parent_id'] is None]
+        # Index children by parent once instead of rescanning the data at every node
+        children_by_parent: Dict[Optional[str], List[Dict]] = {}
+        for record in data:
+            children_by_parent.setdefault(record['parent_id'], []).append(record)
         
         print("Hierarchical Structure:")
         print("=" * 50)
         
-        for root in root_objects:
-            self._print_object_recursive(root, data, 0)
+        for root in children_by_parent.get(None, []):
+            self._print_object_recursive(root, children_by_parent, 0)
     
-    def _print_object_recursive(self, obj: Dict, all_data: List[Dict], depth: int):
+    def _print_object_recursive(self, obj: Dict, children_by_parent: Dict[Optional[str], List[Dict]], depth: int):
         """
         Recursively print object hierarchy.
         
         Args:
             obj: Current object to print
-            all_data: All data records
+            children_by_parent: Records grouped by their parent_id
             depth: Current depth for indentation
         """
         indent = "  " * depth
         print(f"{indent}{obj['object_type']} ({obj['object_id'][:8]}...) - {obj['status']} - {obj['percent_utilized']}%")
         
         # Print children
-        children = [record for record in all_data if record['parent_id'] == obj['object_id']]
-        for child in children:
-            self._print_object_recursive(child, all_data, depth + 1)
+        for child in children_by_parent.get(obj['object_id'], []):
+            self._print_object_recursive(child, children_by_parent, depth + 1)
+
+def _stream_to_jsonl(args):
+    """Generate a topology in streaming mode and report records/sec and peak RSS."""
+    import resource
+    import time
+
+    generator = HierarchicalDataGenerator()
+    start = time.perf_counter()
+    count = generator.save_to_jsonl(
+        generator.generate_hierarchical_stream(
+            num_root_objects=args.roots,
+            max_depth=args.depth,
+            max_children_per_node=args.max_children,
+            seed=args.seed
+        ),
+        args.output
+    )
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{count} records in {elapsed:.1f}s ({count / elapsed:,.0f} records/sec), peak RSS {peak_rss_mb:,.0f} MiB")
 
 
 # Example usage
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate hierarchical IPAM test data.")
+    parser.add_argument("--stream", action="store_true", help="streaming JSONL mode for large topologies")
+    parser.add_argument("--roots", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--max-children", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="hierarchical_data.jsonl")
+    args = parser.parse_args()
+
+    if args.stream:
+        _stream_to_jsonl(args)
+        raise SystemExit
+
     # Initialize generator
     generator = HierarchicalDataGenerator(seed=42)  # Use seed for reproducible results
     
@@ -57,6 +57,7 @@ CREATE TABLE hosts (
     status NVARCHAR(50) NOT NULL CHECK (status IN ('active', 'pending_change', 'deleted')),
     pending_change NVARCHAR(1000) NULL,
     network_id INT NOT NULL,
+    ip_address NVARCHAR(45) NULL,
     created_at DATETIME2 NOT NULL DEFAULT GETDATE(),
     updated_at DATETIME2 NOT NULL DEFAULT GETDATE(),
     FOREIGN KEY (network_id) REFERENCES networks(network_id)
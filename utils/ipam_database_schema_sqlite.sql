@@ -0,0 +1,460 @@
+-- IPAM Abstraction Platform Database Schema
+-- SQLite Implementation (translated from ipam_database_schema.sql)
+--
+-- Differences from the SQL Server version:
+--   * IDENTITY(1,1) columns are INTEGER PRIMARY KEY AUTOINCREMENT
+--   * NVARCHAR/DATETIME2 are TEXT, GETDATE() is CURRENT_TIMESTAMP
+--   * updated_at triggers are row-level AFTER UPDATE triggers
+--   * every statement is idempotent so the script can run on each startup
+--   * users and items tables back the API's auth and item routes
+--   * bulk_load_checkpoints records the progress of ipam/loader.py
+--   * item_versions counts writes per item owner, maintained by triggers on items
+--   * revoked_tokens holds consumed refresh tokens and revoked token families
+--   * item_changes is a bounded log of item writes, appended by triggers on items
+--   * ipam_changes is a bounded log of IPAM writes, appended by the repository with each write
+--   * indexes on networks.range_key and the unique (block_id, cidr) / (network_id, ip_address)
+--     ones are created by db.py, after adding columns older files lack
+
+-- ==================================================
+-- CORE ENTITY TABLES
+-- ==================================================
+
+-- Locations Table (flat structure from underlying systems)
+CREATE TABLE IF NOT EXISTS locations (
+    location_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location_code TEXT NOT NULL UNIQUE,
+    location_name TEXT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Blocks Table (highest level network containers)
+CREATE TABLE IF NOT EXISTS blocks (
+    block_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_id TEXT NOT NULL UNIQUE,
+    config_path TEXT NOT NULL,
+    cidr TEXT NOT NULL,
+    name TEXT NULL,
+    description TEXT NULL,
+    location_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (location_id) REFERENCES locations(location_id)
+);
+
+-- Networks Table (contained within blocks)
+CREATE TABLE IF NOT EXISTS networks (
+    network_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_id TEXT NOT NULL UNIQUE,
+    config_path TEXT NOT NULL,
+    cidr TEXT NOT NULL,
+    vlan_id INTEGER NULL,
+    name TEXT NULL,
+    description TEXT NULL,
+    block_id INTEGER NOT NULL,
+    range_key TEXT NULL, -- first address as "<version>:<fixed-width hex>", for overlap checks
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (block_id) REFERENCES blocks(block_id)
+);
+
+-- Hosts Table (contained within networks)
+CREATE TABLE IF NOT EXISTS hosts (
+    host_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_id TEXT NOT NULL UNIQUE,
+    config_path TEXT NOT NULL,
+    name TEXT NULL,
+    description TEXT NULL,
+    status TEXT NOT NULL CHECK (status IN ('active', 'pending_change', 'deleted')),
+    pending_change TEXT NULL,
+    network_id INTEGER NOT NULL,
+    ip_address TEXT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (network_id) REFERENCES networks(network_id)
+);
+
+-- ==================================================
+-- TAGGING SYSTEM TABLES
+-- ==================================================
+
+-- Tag Groups Table (logical collections of similar tags)
+CREATE TABLE IF NOT EXISTS tag_groups (
+    tag_group_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tags Table (individual tags belonging to groups)
+CREATE TABLE IF NOT EXISTS tags (
+    tag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    tag_group_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (tag_group_id) REFERENCES tag_groups(tag_group_id),
+    UNIQUE (name, tag_group_id) -- Tag names must be unique within a group
+);
+
+-- ==================================================
+-- MANY-TO-MANY JUNCTION TABLES FOR TAGGING
+-- ==================================================
+
+-- Block Tags Junction Table
+CREATE TABLE IF NOT EXISTS block_tags (
+    block_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (block_id, tag_id),
+    FOREIGN KEY (block_id) REFERENCES blocks(block_id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
+);
+
+-- Network Tags Junction Table
+CREATE TABLE IF NOT EXISTS network_tags (
+    network_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (network_id, tag_id),
+    FOREIGN KEY (network_id) REFERENCES networks(network_id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
+);
+
+-- Host Tags Junction Table
+CREATE TABLE IF NOT EXISTS host_tags (
+    host_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (host_id, tag_id),
+    FOREIGN KEY (host_id) REFERENCES hosts(host_id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
+);
+
+-- ==================================================
+-- CONFIGURATION TABLE
+-- ==================================================
+
+-- Application Configuration Table
+CREATE TABLE IF NOT EXISTS app_configuration (
+    config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_key TEXT NOT NULL UNIQUE,
+    config_value TEXT NULL, -- Supports JSON, arrays, complex data types
+    category TEXT NULL,
+    description TEXT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ==================================================
+-- API TABLES
+-- ==================================================
+
+-- Users Table (backs auth and the user/admin routes)
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL,
+    hashed_password TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Items Table (AUTOINCREMENT so ids are never reused after deletes)
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT NULL,
+    price REAL NOT NULL,
+    owner_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (owner_id) REFERENCES users(id)
+);
+
+-- Item Versions Table (per-owner write counter kept by triggers; validates cached item reads)
+CREATE TABLE IF NOT EXISTS item_versions (
+    owner_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+-- Item Changes Table (bounded log of item writes for the change feed; AUTOINCREMENT so seq never repeats)
+CREATE TABLE IF NOT EXISTS item_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('create', 'update', 'delete')),
+    name TEXT NULL,
+    description TEXT NULL,
+    price REAL NULL
+);
+
+-- Item Change Trims Table (per owner, the seq of the last change trimmed from item_changes)
+CREATE TABLE IF NOT EXISTS item_change_trims (
+    owner_id INTEGER PRIMARY KEY,
+    trimmed_seq INTEGER NOT NULL
+);
+
+-- IPAM Changes Table (bounded log of block, network, host and tag writes, which every worker applies to its indexes)
+CREATE TABLE IF NOT EXISTS ipam_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL, -- the writing process, which skips its own changes
+    table_name TEXT NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('create', 'delete', 'attach', 'detach')),
+    record_id INTEGER NOT NULL,
+    tag_id INTEGER NULL, -- the tag attached or detached
+    record TEXT NULL -- the created or deleted record as JSON
+);
+
+-- IPAM Change Trims Table (single row: the seq of the last change trimmed from ipam_changes)
+CREATE TABLE IF NOT EXISTS ipam_change_trims (
+    trim_id INTEGER PRIMARY KEY CHECK (trim_id = 1),
+    trimmed_seq INTEGER NOT NULL
+);
+
+-- Revoked Tokens Table (used refresh token ids and revoked token families, kept until they expire)
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    token_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Bulk Load Checkpoints Table (progress of ipam/loader.py per source file, for resuming)
+CREATE TABLE IF NOT EXISTS bulk_load_checkpoints (
+    source TEXT PRIMARY KEY,
+    records_done INTEGER NOT NULL,
+    rows_inserted INTEGER NOT NULL,
+    records_skipped INTEGER NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ==================================================
+-- INDEXES FOR PERFORMANCE
+-- ==================================================
+
+-- Index on foreign key relationships
+CREATE INDEX IF NOT EXISTS IX_blocks_location_id ON blocks(location_id);
+CREATE INDEX IF NOT EXISTS IX_networks_block_id ON networks(block_id);
+CREATE INDEX IF NOT EXISTS IX_hosts_network_id ON hosts(network_id);
+CREATE INDEX IF NOT EXISTS IX_tags_tag_group_id ON tags(tag_group_id);
+CREATE INDEX IF NOT EXISTS IX_items_owner_id ON items(owner_id, id);
+CREATE INDEX IF NOT EXISTS IX_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS IX_item_changes_owner_id ON item_changes(owner_id, seq);
+
+-- Index on frequently queried fields
+CREATE INDEX IF NOT EXISTS IX_blocks_config_path ON blocks(config_path);
+CREATE INDEX IF NOT EXISTS IX_networks_config_path ON networks(config_path);
+CREATE INDEX IF NOT EXISTS IX_hosts_config_path ON hosts(config_path);
+CREATE INDEX IF NOT EXISTS IX_hosts_status ON hosts(status);
+CREATE INDEX IF NOT EXISTS IX_app_configuration_category ON app_configuration(category);
+
+-- Index on CIDR fields for network queries
+CREATE INDEX IF NOT EXISTS IX_blocks_cidr ON blocks(cidr);
+CREATE INDEX IF NOT EXISTS IX_networks_cidr ON networks(cidr);
+
+-- ==================================================
+-- TRIGGERS FOR AUTOMATIC TIMESTAMP UPDATES
+-- ==================================================
+
+CREATE TRIGGER IF NOT EXISTS tr_locations_updated_at
+AFTER UPDATE ON locations FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE locations SET updated_at = CURRENT_TIMESTAMP WHERE location_id = NEW.location_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_blocks_updated_at
+AFTER UPDATE ON blocks FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE blocks SET updated_at = CURRENT_TIMESTAMP WHERE block_id = NEW.block_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_networks_updated_at
+AFTER UPDATE ON networks FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE networks SET updated_at = CURRENT_TIMESTAMP WHERE network_id = NEW.network_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_hosts_updated_at
+AFTER UPDATE ON hosts FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE hosts SET updated_at = CURRENT_TIMESTAMP WHERE host_id = NEW.host_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_tag_groups_updated_at
+AFTER UPDATE ON tag_groups FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE tag_groups SET updated_at = CURRENT_TIMESTAMP WHERE tag_group_id = NEW.tag_group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_tags_updated_at
+AFTER UPDATE ON tags FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE tags SET updated_at = CURRENT_TIMESTAMP WHERE tag_id = NEW.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_app_configuration_updated_at
+AFTER UPDATE ON app_configuration FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE app_configuration SET updated_at = CURRENT_TIMESTAMP WHERE config_id = NEW.config_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_users_updated_at
+AFTER UPDATE ON users FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_items_updated_at
+AFTER UPDATE ON items FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE items SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+-- Any write to an item bumps its owner's version, in the writing transaction
+CREATE TRIGGER IF NOT EXISTS tr_items_version_insert
+AFTER INSERT ON items FOR EACH ROW
+BEGIN
+    INSERT INTO item_versions (owner_id, version) VALUES (NEW.owner_id, 1)
+    ON CONFLICT (owner_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Updates that change nothing (including tr_items_updated_at's) keep the version. Databases
+-- created with the earlier, unguarded definition get this one from db.py's create_schema
+CREATE TRIGGER IF NOT EXISTS tr_items_version_update
+AFTER UPDATE ON items FOR EACH ROW
+WHEN NEW.name IS NOT OLD.name OR NEW.description IS NOT OLD.description OR NEW.price IS NOT OLD.price
+    OR NEW.owner_id != OLD.owner_id
+BEGIN
+    INSERT INTO item_versions (owner_id, version) VALUES (OLD.owner_id, 1)
+    ON CONFLICT (owner_id) DO UPDATE SET version = version + 1;
+    INSERT INTO item_versions (owner_id, version) SELECT NEW.owner_id, 1 WHERE NEW.owner_id != OLD.owner_id
+    ON CONFLICT (owner_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_items_version_delete
+AFTER DELETE ON items FOR EACH ROW
+BEGIN
+    INSERT INTO item_versions (owner_id, version) VALUES (OLD.owner_id, 1)
+    ON CONFLICT (owner_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Any write that changes an item is logged to item_changes, in the writing transaction
+-- (the nested update made by tr_items_updated_at only touches updated_at and is not logged)
+CREATE TRIGGER IF NOT EXISTS tr_items_change_insert
+AFTER INSERT ON items FOR EACH ROW
+BEGIN
+    INSERT INTO item_changes (owner_id, item_id, op, name, description, price)
+    VALUES (NEW.owner_id, NEW.id, 'create', NEW.name, NEW.description, NEW.price);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_items_change_update
+AFTER UPDATE ON items FOR EACH ROW
+WHEN NEW.name IS NOT OLD.name OR NEW.description IS NOT OLD.description OR NEW.price IS NOT OLD.price
+    OR NEW.owner_id != OLD.owner_id
+BEGIN
+    INSERT INTO item_changes (owner_id, item_id, op)
+    SELECT OLD.owner_id, OLD.id, 'delete' WHERE NEW.owner_id != OLD.owner_id;
+    INSERT INTO item_changes (owner_id, item_id, op, name, description, price)
+    VALUES (NEW.owner_id, NEW.id, CASE WHEN NEW.owner_id = OLD.owner_id THEN 'update' ELSE 'create' END,
+            NEW.name, NEW.description, NEW.price);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_items_change_delete
+AFTER DELETE ON items FOR EACH ROW
+BEGIN
+    INSERT INTO item_changes (owner_id, item_id, op) VALUES (OLD.owner_id, OLD.id, 'delete');
+END;
+
+-- ==================================================
+-- SAMPLE DATA INSERTION (Optional)
+-- ==================================================
+
+-- Sample locations
+INSERT OR IGNORE INTO locations (location_code, location_name) VALUES
+('NYC-DC1', 'New York Data Center 1'),
+('LAX-DC1', 'Los Angeles Data Center 1'),
+('CHI-DC1', 'Chicago Data Center 1');
+
+-- Sample tag groups
+INSERT OR IGNORE INTO tag_groups (name) VALUES
+('Security Zones'),
+('Environment'),
+('Function'),
+('Compliance');
+
+-- Sample tags
+INSERT OR IGNORE INTO tags (name, tag_group_id) VALUES
+('DMZ', 1),
+('Internal', 1),
+('External', 1),
+('Production', 2),
+('Staging', 2),
+('Development', 2),
+('Web Server', 3),
+('Database', 3),
+('Load Balancer', 3),
+('PCI Compliant', 4),
+('HIPAA Compliant', 4);
+
+-- Sample configuration entries
+INSERT OR IGNORE INTO app_configuration (config_key, config_value, category, description) VALUES
+('ipam.sync.interval', '300', 'sync', 'Sync interval in seconds for IPAM data refresh'),
+('ui.default.page.size', '50', 'ui', 'Default number of items per page in UI lists'),
+('security.zones.inherit', 'true', 'security', 'Whether security zone tags inherit to child objects'),
+('notification.email.enabled', 'true', 'notifications', 'Enable email notifications for system events'),
+('api.rate.limit.requests', '1000', 'api', 'Maximum API requests per hour per client'),
+('ui.theme.options', '["light", "dark", "auto"]', 'ui', 'Available theme options for the UI');
+
+-- ==================================================
+-- VIEWS FOR COMMON QUERIES (Optional)
+-- ==================================================
+
+-- View for hosts with inherited tags from parent network and block
+CREATE VIEW IF NOT EXISTS vw_hosts_with_inherited_tags AS
+SELECT
+    h.host_id, h.object_id, h.name AS host_name, h.status,
+    n.name AS network_name, n.cidr AS network_cidr,
+    b.name AS block_name, b.cidr AS block_cidr,
+    l.location_name, t.name AS tag_name, tg.name AS tag_group_name,
+    'host' AS tag_source
+FROM hosts h
+JOIN networks n ON h.network_id = n.network_id
+JOIN blocks b ON n.block_id = b.block_id
+JOIN locations l ON b.location_id = l.location_id
+LEFT JOIN host_tags ht ON h.host_id = ht.host_id
+LEFT JOIN tags t ON ht.tag_id = t.tag_id
+LEFT JOIN tag_groups tg ON t.tag_group_id = tg.tag_group_id
+
+UNION ALL
+
+-- Inherited network tags
+SELECT
+    h.host_id, h.object_id, h.name AS host_name, h.status,
+    n.name AS network_name, n.cidr AS network_cidr,
+    b.name AS block_name, b.cidr AS block_cidr,
+    l.location_name, t.name AS tag_name, tg.name AS tag_group_name,
+    'network' AS tag_source
+FROM hosts h
+JOIN networks n ON h.network_id = n.network_id
+JOIN blocks b ON n.block_id = b.block_id
+JOIN locations l ON b.location_id = l.location_id
+LEFT JOIN network_tags nt ON n.network_id = nt.network_id
+LEFT JOIN tags t ON nt.tag_id = t.tag_id
+LEFT JOIN tag_groups tg ON t.tag_group_id = tg.tag_group_id
+
+UNION ALL
+
+-- Inherited block tags
+SELECT
+    h.host_id, h.object_id, h.name AS host_name, h.status,
+    n.name AS network_name, n.cidr AS network_cidr,
+    b.name AS block_name, b.cidr AS block_cidr,
+    l.location_name, t.name AS tag_name, tg.name AS tag_group_name,
+    'block' AS tag_source
+FROM hosts h
+JOIN networks n ON h.network_id = n.network_id
+JOIN blocks b ON n.block_id = b.block_id
+JOIN locations l ON b.location_id = l.location_id
+LEFT JOIN block_tags bt ON b.block_id = bt.block_id
+LEFT JOIN tags t ON bt.tag_id = t.tag_id
+LEFT JOIN tag_groups tg ON t.tag_group_id = tg.tag_group_id;